@@ -35,5 +35,4 @@ def register():
     room_designer.register()
 
 def unregister():
-    pass
-#     room_designer.unregister()
\ No newline at end of file
+    room_designer.unregister()
\ No newline at end of file
@@ -5,6 +5,15 @@ This module defines the basic classes needed for assemblies.
 
 import bpy
 import bmesh
+import numpy
+from bpy.app.handlers import persistent
+from . import utils
+
+#BASE POINT POINTER -> (BASE POINT NAME, (X DIMENSION, Y DIMENSION, Z DIMENSION))
+dimension_cache = {}
+
+#NUMBER OF OBJECTS WHEN THE DIMENSION CACHE WAS FILLED
+dimension_cache_object_count = 0
 
 def hook_vertex_group_to_object(obj_mesh,vertex_group,obj_hook):
     """ This function adds a hook modifier to the verties 
@@ -106,32 +115,80 @@ class Assembly:
         bpy.context.scene.objects.link(self.obj_z)
         self.obj_z.parent = self.obj_bp
         
+    def add_driver(self,obj,data_path,array_index,expression,expression_vars):
+        """
+        Adds a driver to one of the assembly objects. The expression is
+        rewritten with utils.set_driver_expression so blender can evaluate
+        it without python when possible.
+        
+        **Parameters:**
+        
+        * **obj** (bpy.types.Object)
+        * **data_path** (string)
+        * **array_index** (int)
+        * **expression** (string)
+        * **expression_vars** (list) - Variables with var_name, var_type, obj and data_path
+        
+        **Returns:** bpy.types.FCurve
+        """
+        driver = obj.driver_add(data_path,array_index)
+        utils.add_variables_to_driver(driver,expression_vars)
+        utils.set_driver_expression(driver,expression)
+        return driver
+        
     def x_loc(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.location.x = value
+        if expression:
+            self.add_driver(self.obj_bp,'location',0,expression,expression_vars)
+        else:
+            self.obj_bp.location.x = value
         
     def y_loc(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.location.y = value
+        if expression:
+            self.add_driver(self.obj_bp,'location',1,expression,expression_vars)
+        else:
+            self.obj_bp.location.y = value
         
     def z_loc(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.location.z = value           
+        if expression:
+            self.add_driver(self.obj_bp,'location',2,expression,expression_vars)
+        else:
+            self.obj_bp.location.z = value           
         
     def x_rot(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.rotation_euler.x = value
+        if expression:
+            self.add_driver(self.obj_bp,'rotation_euler',0,expression,expression_vars)
+        else:
+            self.obj_bp.rotation_euler.x = value
         
     def y_rot(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.rotation_euler.y = value
+        if expression:
+            self.add_driver(self.obj_bp,'rotation_euler',1,expression,expression_vars)
+        else:
+            self.obj_bp.rotation_euler.y = value
         
     def z_rot(self,expression="",expression_vars=[],value=0):
-        self.obj_bp.rotation_euler.z = value          
+        if expression:
+            self.add_driver(self.obj_bp,'rotation_euler',2,expression,expression_vars)
+        else:
+            self.obj_bp.rotation_euler.z = value          
         
     def x_dim(self,expression="",expression_vars=[],value=0):
-        self.obj_x.location.x = value
+        if expression:
+            self.add_driver(self.obj_x,'location',0,expression,expression_vars)
+        else:
+            self.obj_x.location.x = value
         
     def y_dim(self,expression="",expression_vars=[],value=0):
-        self.obj_y.location.y = value
+        if expression:
+            self.add_driver(self.obj_y,'location',1,expression,expression_vars)
+        else:
+            self.obj_y.location.y = value
         
     def z_dim(self,expression="",expression_vars=[],value=0):
-        self.obj_z.location.z = value   
+        if expression:
+            self.add_driver(self.obj_z,'location',2,expression,expression_vars)
+        else:
+            self.obj_z.location.z = value   
         
     def add_mesh(self,name,include_hooks = True):
         """
@@ -200,4 +257,173 @@ class Assembly:
             hook_vertex_group_to_object(obj_mesh,"Y Dimension",self.obj_y)
             hook_vertex_group_to_object(obj_mesh,"Z Dimension",self.obj_z)
             
-        return obj_mesh
\ No newline at end of file
+        return obj_mesh
+
+def get_dimension_objects(obj_bp):
+    """ Returns: (X Dimension, Y Dimension, Z Dimension) of an assembly base point.
+        The children are only searched the first time an assembly is used.
+        The cache is cleared when objects are removed because the pointers 
+        of removed objects can be used again by new objects.
+    """
+    global dimension_cache_object_count
+    if len(bpy.data.objects) != dimension_cache_object_count:
+        dimension_cache.clear()
+        dimension_cache_object_count = len(bpy.data.objects)
+    pointer = obj_bp.as_pointer()
+    if pointer in dimension_cache:
+        name, dims = dimension_cache[pointer]
+        try:
+            if name == obj_bp.name and all(obj is None or obj.parent == obj_bp for obj in dims):
+                return dims
+        except ReferenceError:
+            pass
+    assembly = Assembly(obj_bp)
+    dims = (assembly.obj_x,assembly.obj_y,assembly.obj_z)
+    dimension_cache[pointer] = (obj_bp.name,dims)
+    return dims
+
+@persistent
+def clear_assembly_caches(dummy):
+    """ Handler that clears the pointer caches when the objects are reloaded
+    """
+    dimension_cache.clear()
+
+def get_object_indexes(objects):
+    """ Returns: numpy array - The index of each object in bpy.data.objects or -1 for None.
+        bpy.data.objects is sorted by name so the indexes are found from the names 
+        every time. They change when any object is added, removed or renamed.
+    """
+    index_map = {name: index for index, name in enumerate(bpy.data.objects.keys())}
+    return numpy.array([index_map[obj.name] if obj is not None else -1 for obj in objects],dtype=numpy.int64)
+
+def get_object_locations():
+    """ Returns: numpy array with a row of x, y, z for every object in bpy.data.objects
+    """
+    locations = numpy.empty(len(bpy.data.objects) * 3,dtype=numpy.float32)
+    bpy.data.objects.foreach_get("location",locations)
+    return locations.reshape(-1,3)
+
+def set_object_locations(locations,objects):
+    """ 
+    writes the location of every object in bpy.data.objects with foreach_set.
+    foreach_set doesn't tell blender the objects changed so the objects 
+    that were changed are tagged for an update.
+    
+    **Parameters:**
+    
+    * **locations** (numpy array) - Read with get_object_locations and then changed
+    * **objects** (list of bpy.types.Object) - The objects that were changed
+    """
+    if not objects:
+        return
+    bpy.data.objects.foreach_set("location",locations.ravel())
+    for obj in objects:
+        obj.update_tag(refresh={'OBJECT'})
+
+class AssemblyArray(object):
+    """
+    Reads and writes the dimensions of many assemblies at once.
+    
+    The locations of every object are read with one foreach_get into a 
+    numpy array. The dimensions are changed in the array and written back
+    with one foreach_set, so the cost doesn't grow with one RNA write for 
+    each assembly. Only the dimension objects that changed are tagged for 
+    an update.
+    
+    Assemblies that are missing a dimension object are printed when the 
+    array is created. That dimension reads as 0 and is never written.
+    """
+    
+    def __init__(self,obj_bps):
+        """ 
+        **Parameters:**
+        
+        * **obj_bps** (list of bpy.types.Object) - Assembly base points
+        """
+        self.obj_bps = list(obj_bps)
+        self.dimension_objects = [get_dimension_objects(obj_bp) for obj_bp in self.obj_bps]
+        for obj_bp, dims in zip(self.obj_bps,self.dimension_objects):
+            if None in dims:
+                print("ASSEMBLY IS MISSING A DIMENSION OBJECT",obj_bp.name)
+        
+    def __len__(self):
+        return len(self.obj_bps)
+    
+    def get_dimension_indexes(self):
+        """ 
+        **Returns:** numpy array with a row of the x, y, z dimension object indexes for each assembly
+        """
+        objects = [obj for dims in self.dimension_objects for obj in dims]
+        return get_object_indexes(objects).reshape(-1,3)
+    
+    def get_dimensions(self):
+        """ 
+        **Returns:** numpy array with a row of x, y, z for each assembly
+        """
+        dimensions = numpy.zeros((len(self.obj_bps),3),dtype=numpy.float32)
+        if not self.obj_bps:
+            return dimensions
+        indexes = self.get_dimension_indexes()
+        locations = get_object_locations()
+        for axis in range(3):
+            found = indexes[:,axis] >= 0
+            dimensions[found,axis] = locations[indexes[found,axis],axis]
+        return dimensions
+    
+    def set_dimensions(self,x=None,y=None,z=None,mask=None):
+        """ 
+        sets the dimensions of every assembly. Each value can be
+        one number for all of the assemblies or an array with a value for each assembly.
+        Dimensions that are None are not changed. Only the dimension 
+        objects that change are tagged for an update.
+        
+        **Parameters:**
+        
+        * **x** (float or numpy array, (optional))
+        * **y** (float or numpy array, (optional))
+        * **z** (float or numpy array, (optional))
+        * **mask** (list of booleans, (optional)) - Only change the assemblies where this is True
+        """
+        if not self.obj_bps:
+            return
+        count = len(self.obj_bps)
+        indexes = self.get_dimension_indexes()
+        locations = get_object_locations()
+        changed = []
+        for axis, values in enumerate((x,y,z)):
+            if values is None:
+                continue
+            new_values = numpy.broadcast_to(numpy.asarray(values,dtype=numpy.float32),(count,))
+            selected = indexes[:,axis] >= 0
+            if mask is not None:
+                selected &= numpy.asarray(mask,dtype=bool)
+            axis_indexes = indexes[selected,axis]
+            new_values = new_values[selected]
+            is_changed = locations[axis_indexes,axis] != new_values
+            locations[axis_indexes[is_changed],axis] = new_values[is_changed]
+            for index in numpy.flatnonzero(selected)[is_changed].tolist():
+                changed.append(self.dimension_objects[index][axis])
+        set_object_locations(locations,changed)
+    
+    def get_locations(self):
+        """ 
+        **Returns:** numpy array with a row of x, y, z for each base point
+        """
+        if not self.obj_bps:
+            return numpy.empty((0,3),dtype=numpy.float32)
+        return get_object_locations()[get_object_indexes(self.obj_bps)]
+    
+    def set_locations(self,locations):
+        """ 
+        **Parameters:**
+        
+        * **locations** (numpy array) - A row of x, y, z for each base point
+        """
+        if not self.obj_bps:
+            return
+        indexes = get_object_indexes(self.obj_bps)
+        all_locations = get_object_locations()
+        new_locations = numpy.asarray(locations,dtype=numpy.float32).reshape(-1,3)
+        is_changed = (all_locations[indexes] != new_locations).any(axis=1)
+        all_locations[indexes[is_changed]] = new_locations[is_changed]
+        set_object_locations(all_locations,[self.obj_bps[index] for index in numpy.flatnonzero(is_changed).tolist()])
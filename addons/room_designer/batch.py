@@ -0,0 +1,289 @@
+"""
+This module runs library jobs in background Blender processes.
+
+The items are split into one queue for each worker. Every worker is a
+blender --background process that runs a worker script and prints one line
+when it starts and finishes each item. If a worker crashes the item it was
+working on is marked as failed and a new worker is started with the rest
+of its queue, so one bad item never stops the whole batch.
+
+    BATCH_START {"item": "..."}
+    BATCH_RESULT {"item": "...", "error": null}
+
+This module only uses the standard library so the worker scripts can
+import it without the add-on being enabled.
+
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+START_PREFIX = "BATCH_START "
+RESULT_PREFIX = "BATCH_RESULT "
+
+def get_worker_count(processes=0):
+    """ Returns: int - The number of worker processes to start.
+        0 uses every CPU core.
+    """
+    if processes > 0:
+        return processes
+    return os.cpu_count() or 1
+
+def split_queue(items,count):
+    """ Splits the items into count queues so each queue gets a mix of the items
+    """
+    queues = [[] for i in range(max(1,count))]
+    for index, item in enumerate(items):
+        queues[index % len(queues)].append(item)
+    return [item_queue for item_queue in queues if item_queue]
+
+class Batch_Result(object):
+
+    __slots__ = ('item','error')
+
+    def __init__(self,item,error=None):
+        self.item = item
+        self.error = error
+
+class Batch_Worker(object):
+    """
+    One background Blender process and the items it still has to finish
+    """
+
+    def __init__(self,job,items):
+        self.job = job
+        self.items = list(items)
+        self.current_item = None
+        self.finished_items = set()
+
+        file, self.queue_path = tempfile.mkstemp(prefix="room_designer_batch_",suffix=".json")
+        with os.fdopen(file,'w') as queue_file:
+            json.dump({"items":self.items,"options":job.options},queue_file)
+
+        command = [job.blender_path,"--background"]
+        if job.factory_startup:
+            command.append("--factory-startup")
+        command.extend(["--python",job.worker_script,"--",self.queue_path])
+        self.process = subprocess.Popen(command,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        stdin=subprocess.DEVNULL,
+                                        universal_newlines=True)
+        self.thread = threading.Thread(target=self.read_output,daemon=True)
+        self.thread.start()
+
+    def read_output(self):
+        """ Reads the worker output on a thread so the UI never waits on a pipe
+        """
+        for line in self.process.stdout:
+            if line.startswith(START_PREFIX):
+                self.job.messages.put((self,'START',json.loads(line[len(START_PREFIX):])))
+            elif line.startswith(RESULT_PREFIX):
+                self.job.messages.put((self,'RESULT',json.loads(line[len(RESULT_PREFIX):])))
+        self.process.wait()
+        self.job.messages.put((self,'EXIT',self.process.returncode))
+
+    def get_remaining_items(self):
+        return [item for item in self.items if item not in self.finished_items and item != self.current_item]
+
+    def remove_queue_file(self):
+        try:
+            os.remove(self.queue_path)
+        except OSError:
+            pass
+
+class Batch_Job(object):
+    """
+    runs a worker script on a list of items in a pool of background Blender processes
+
+    **Parameters:**
+
+    * **worker_script** (string) - Path to the script that calls run_worker
+    * **items** (list of strings) - The items to process. Each item must be unique.
+    * **options** (dictionary, (optional)) - JSON options passed to every worker
+    * **processes** (int, (optional)) - Number of workers. 0 uses every CPU core.
+    * **factory_startup** (boolean, (optional)) - Start the workers without the user preferences and add-ons
+    """
+
+    def __init__(self,worker_script,items,options=None,processes=0,factory_startup=False,blender_path=None):
+        import bpy
+        self.worker_script = worker_script
+        self.items = list(items)
+        self.options = options or {}
+        self.processes = get_worker_count(processes)
+        self.factory_startup = factory_startup
+        self.blender_path = blender_path or bpy.app.binary_path
+        self.messages = queue.Queue()
+        self.workers = []
+        self.results = []
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.time()
+        for items in split_queue(self.items,self.processes):
+            self.workers.append(Batch_Worker(self,items))
+
+    def poll(self):
+        """ Handles the messages from the workers. Call this from a timer.
+            Returns: list of Batch_Result - The items that finished since the last poll
+        """
+        finished = []
+        while True:
+            try:
+                worker, message, value = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message == 'START':
+                worker.current_item = value["item"]
+            elif message == 'RESULT':
+                worker.current_item = None
+                worker.finished_items.add(value["item"])
+                finished.append(Batch_Result(value["item"],value.get("error")))
+            elif message == 'EXIT':
+                finished.extend(self.finish_worker(worker,value))
+        self.results.extend(finished)
+        return finished
+
+    def finish_worker(self,worker,returncode):
+        """ Fails the item a worker crashed on and restarts the rest of its queue
+        """
+        if worker not in self.workers:
+            return []
+        self.workers.remove(worker)
+        worker.remove_queue_file()
+        failed = []
+        remaining = worker.get_remaining_items()
+        if worker.current_item is not None:
+            failed.append(Batch_Result(worker.current_item,"Blender exited with code " + str(returncode)))
+        elif remaining:
+            #THE WORKER STOPPED BETWEEN ITEMS SO THE WORKER SCRIPT ITSELF IS BROKEN
+            for item in remaining:
+                failed.append(Batch_Result(item,"Worker exited with code " + str(returncode)))
+            return failed
+        if remaining:
+            self.workers.append(Batch_Worker(self,remaining))
+        return failed
+
+    def is_finished(self):
+        return not self.workers and self.messages.empty()
+
+    def get_progress(self):
+        """ Returns: float - 0 to 1
+        """
+        if not self.items:
+            return 1.0
+        return len(self.results) / len(self.items)
+
+    def get_failed(self):
+        return [result for result in self.results if result.error]
+
+    def cancel(self):
+        for worker in self.workers:
+            worker.process.kill()
+            worker.remove_queue_file()
+        self.workers = []
+
+def run_worker(process_item):
+    """
+    runs inside the worker process. Reads the queue file passed after --
+    and calls process_item for each item. An exception only fails that item.
+
+    **Parameters:**
+
+    * **process_item** (function) - Called with (item, options)
+    """
+    queue_path = sys.argv[sys.argv.index("--") + 1]
+    with open(queue_path,'r') as queue_file:
+        data = json.load(queue_file)
+
+    for item in data["items"]:
+        print(START_PREFIX + json.dumps({"item":item}),flush=True)
+        error = None
+        try:
+            process_item(item,data["options"])
+        except Exception as exc:
+            traceback.print_exc()
+            error = str(exc) or exc.__class__.__name__
+        print(RESULT_PREFIX + json.dumps({"item":item,"error":error}),flush=True)
+
+class Batch_Operator(object):
+    """
+    Mix in for modal operators that run a Batch_Job. Call start_job from execute.
+    The progress is shown in the header and the job is canceled with Esc.
+    Call start_job again from job_finished to run the next step of a pipeline.
+    """
+
+    job = None
+    timer = None
+    job_label = "Processing"
+
+    def start_job(self,context,job):
+        self.job = job
+        self.job.start()
+        if self.timer is not None:
+            #THE PROGRESS OF THE LAST STEP OF A PIPELINE IS ENDED BEFORE THE NEXT STEP STARTS
+            context.window_manager.progress_end()
+        context.window_manager.progress_begin(0,len(job.items))
+        if self.timer is None:
+            self.timer = context.window_manager.event_timer_add(.5,context.window)
+            context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def job_item_finished(self,context,result):
+        """ Called for every item that finishes
+        """
+        if result.error:
+            print(self.job_label.upper(),"FAILED",result.item,result.error)
+        else:
+            print(self.job_label.upper(),"FINISHED",result.item,"(" + str(len(self.job.results)) + "/" + str(len(self.job.items)) + ")")
+
+    def job_finished(self,context):
+        """ Called once when the job is finished. Not called when the job is canceled.
+            Return {'FINISHED'} or {'CANCELLED'} after calling self.report to replace
+            the default report.
+        """
+        pass
+
+    def modal(self,context,event):
+        if event.type == 'ESC':
+            self.job.cancel()
+            self.finish_job(context)
+            self.report({'WARNING'},"Canceled after " + str(len(self.job.results)) + " of " + str(len(self.job.items)))
+            return {'CANCELLED'}
+
+        if event.type == 'TIMER':
+            for result in self.job.poll():
+                self.job_item_finished(context,result)
+            context.window_manager.progress_update(len(self.job.results))
+            if context.area:
+                context.area.header_text_set(self.job_label + " " + str(len(self.job.results)) + " of " + str(len(self.job.items)) + "  (Esc) = Cancel")
+            if self.job.is_finished():
+                job = self.job
+                result = self.job_finished(context)
+                if self.job is not job:
+                    return {'RUNNING_MODAL'}
+                self.finish_job(context)
+                if result:
+                    return result
+                failed = self.job.get_failed()
+                if failed:
+                    self.report({'WARNING'},str(len(failed)) + " of " + str(len(self.job.items)) + " failed. See the console for details.")
+                else:
+                    self.report({'INFO'},"Finished " + str(len(self.job.items)) + " in " + str(round(time.time() - self.job.start_time,1)) + " seconds")
+                return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
+
+    def finish_job(self,context):
+        context.window_manager.event_timer_remove(self.timer)
+        self.timer = None
+        context.window_manager.progress_end()
+        if context.area:
+            context.area.header_text_set()
@@ -0,0 +1,429 @@
+"""
+This module saves and loads floor plans without the blend file.
+
+A floor plan file stores the walls, rooms, room meshes and area lamps in columns.
+The rooms are stored as the index of each of their walls in the walls table
+and the floors and ceilings are built again from the walls when they are loaded.
+Each line of the file is a JSON object so the file can be written and read
+one column at a time. Files that end with .gz are compressed.
+
+    {"format": "room_designer_floor_plan", "version": 1}
+    {"table": "walls", "count": 2, "columns": ["name", "x", ...]}
+    {"column": "name", "values": ["Wall 1", "Wall 2"]}
+    {"column": "x", "values": [0.0, 3.0]}
+    ...
+
+"""
+
+import bpy
+import gzip
+import json
+from .assembly import Assembly, AssemblyArray
+from . import rooms
+
+FORMAT_NAME = "room_designer_floor_plan"
+FORMAT_VERSION = 1
+FILE_EXTENSION = ".jsonl"
+
+ISWALL = "ISWALL"
+ISROOMMESH = "ISROOMMESH"
+LAYOUT_PREVIOUS = "LAYOUT_PREVIOUS"
+
+#NUMBER OF DECIMALS SAVED FOR LOCATIONS AND DIMENSIONS (1/1000 MM)
+PRECISION = 6
+
+WALL_COLUMNS = ("name","mesh_name","x","y","z","rotation","length","depth","height",
+                "previous","default_height","default_depth")
+ROOM_COLUMNS = ("name","ceiling_name","walls")
+ROOM_MESH_COLUMNS = ("name","mesh_name","x","y","z","rotation_x","rotation_y","rotation_z",
+                     "length","width","height")
+LAMP_COLUMNS = ("name","x","y","z","rotation_x","rotation_y","rotation_z",
+                "shape","size","size_y","energy","color_r","color_g","color_b")
+
+#COLUMNS THAT MUST BE IN A TABLE THAT HAS ROWS. THE OTHER COLUMNS HAVE DEFAULTS
+REQUIRED_COLUMNS = {"walls":("name","x","y","z","rotation","length","depth","height"),
+                    "rooms":("name","walls"),
+                    "room_meshes":("name","x","y","z","rotation_x","rotation_y","rotation_z",
+                                   "length","width","height"),
+                    "lamps":LAMP_COLUMNS}
+
+def open_file(path,mode):
+    if path.endswith(".gz"):
+        return gzip.open(path,mode + "t",encoding="utf-8")
+    return open(path,mode,encoding="utf-8")
+
+def get_wall_mesh(obj_bp):
+    for child in obj_bp.children:
+        if ISWALL in child:
+            return child
+
+def get_previous_wall_name(obj_bp):
+    """ Returns: The name of the wall base point this wall is connected to or ""
+    """
+    if LAYOUT_PREVIOUS in obj_bp:
+        return obj_bp[LAYOUT_PREVIOUS]
+    for con in obj_bp.constraints:
+        if con.type == 'COPY_LOCATION' and con.target and con.target.parent:
+            return con.target.parent.name
+    return ""
+
+def get_floor_plan_objects(scene):
+    """
+    collects the walls, room meshes and lamps in one pass over the scene
+
+    **Parameters:**
+
+    * **scene** (bpy.types.Scene)
+
+    **Returns:** (list of wall base points, list of floors, list of room mesh base points, list of area lamps)
+    """
+    wall_bps = []
+    floors = []
+    room_mesh_bps = []
+    lamps = []
+    for obj in scene.objects:
+        if ISWALL in obj and obj.parent:
+            wall_bps.append(obj.parent)
+        elif rooms.ISFLOOR in obj and rooms.ROOM_WALLS in obj:
+            floors.append(obj)
+        elif ISROOMMESH in obj and obj.parent:
+            room_mesh_bps.append(obj.parent)
+        elif obj.type == 'LAMP' and obj.data.type == 'AREA':
+            lamps.append(obj)
+    return wall_bps, floors, room_mesh_bps, lamps
+
+def get_wall_columns(wall_bps):
+    columns = {name:[] for name in WALL_COLUMNS}
+    if not wall_bps:
+        return columns
+    bp_names = {obj_bp.name:index for index, obj_bp in enumerate(wall_bps)}
+    dimensions = AssemblyArray(wall_bps).get_dimensions()
+    for obj_bp, dims in zip(wall_bps,dimensions):
+        obj_mesh = get_wall_mesh(obj_bp)
+        location = obj_bp.matrix_world.to_translation()
+        columns["name"].append(obj_bp.name)
+        columns["mesh_name"].append(obj_mesh.name if obj_mesh else "")
+        columns["x"].append(round(float(location[0]),PRECISION))
+        columns["y"].append(round(float(location[1]),PRECISION))
+        columns["z"].append(round(float(location[2]),PRECISION))
+        columns["rotation"].append(round(obj_bp.rotation_euler.z,PRECISION))
+        columns["length"].append(round(float(dims[0]),PRECISION))
+        columns["depth"].append(round(float(dims[1]),PRECISION))
+        columns["height"].append(round(float(dims[2]),PRECISION))
+        columns["previous"].append(bp_names.get(get_previous_wall_name(obj_bp),-1))
+        columns["default_height"].append(int(obj_bp.get("USE_DEFAULT_HEIGHT",0)))
+        columns["default_depth"].append(int(obj_bp.get("USE_DEFAULT_DEPTH",0)))
+    return columns
+
+def get_room_columns(floors,wall_bps):
+    """ Rooms that use a wall that isn't in the walls table are skipped
+    """
+    columns = {name:[] for name in ROOM_COLUMNS}
+    bp_names = {obj_bp.name:index for index, obj_bp in enumerate(wall_bps)}
+    for floor in floors:
+        walls = [bp_names.get(name,-1) for name in floor[rooms.ROOM_WALLS].split(rooms.WALL_SEPARATOR)]
+        if -1 in walls:
+            continue
+        ceiling = bpy.data.objects.get(floor.get(rooms.ROOM_CEILING,""))
+        columns["name"].append(floor.name)
+        columns["ceiling_name"].append(ceiling.name if ceiling else "")
+        columns["walls"].append(walls)
+    return columns
+
+def get_room_mesh_columns(room_mesh_bps):
+    columns = {name:[] for name in ROOM_MESH_COLUMNS}
+    if not room_mesh_bps:
+        return columns
+    dimensions = AssemblyArray(room_mesh_bps).get_dimensions()
+    for obj_bp, dims in zip(room_mesh_bps,dimensions):
+        obj_mesh = None
+        for child in obj_bp.children:
+            if ISROOMMESH in child:
+                obj_mesh = child
+        columns["name"].append(obj_bp.name)
+        columns["mesh_name"].append(obj_mesh.name if obj_mesh else "")
+        for column, value in zip(("x","y","z"),obj_bp.location):
+            columns[column].append(round(value,PRECISION))
+        for column, value in zip(("rotation_x","rotation_y","rotation_z"),obj_bp.rotation_euler):
+            columns[column].append(round(value,PRECISION))
+        columns["length"].append(round(float(dims[0]),PRECISION))
+        columns["width"].append(round(float(dims[1]),PRECISION))
+        columns["height"].append(round(float(dims[2]),PRECISION))
+    return columns
+
+def get_lamp_columns(lamps):
+    columns = {name:[] for name in LAMP_COLUMNS}
+    for obj in lamps:
+        columns["name"].append(obj.name)
+        for column, value in zip(("x","y","z"),obj.location):
+            columns[column].append(round(value,PRECISION))
+        for column, value in zip(("rotation_x","rotation_y","rotation_z"),obj.rotation_euler):
+            columns[column].append(round(value,PRECISION))
+        columns["shape"].append(obj.data.shape)
+        columns["size"].append(round(obj.data.size,PRECISION))
+        columns["size_y"].append(round(obj.data.size_y,PRECISION))
+        columns["energy"].append(round(obj.data.energy,PRECISION))
+        for column, value in zip(("color_r","color_g","color_b"),obj.data.color):
+            columns[column].append(round(value,PRECISION))
+    return columns
+
+def write_table(file,table_name,column_names,columns):
+    count = len(columns[column_names[0]])
+    file.write(json.dumps({"table":table_name,"count":count,"columns":list(column_names)}) + "\n")
+    for column_name in column_names:
+        file.write(json.dumps({"column":column_name,"values":columns[column_name]},separators=(',',':')) + "\n")
+
+def export_floor_plan(scene,path):
+    """
+    saves the walls, rooms, room meshes and area lamps of a scene to a floor plan file
+
+    **Parameters:**
+
+    * **scene** (bpy.types.Scene)
+    * **path** (string) - File to write
+
+    **Returns:** (number of walls, number of rooms, number of room meshes, number of lamps)
+    """
+    wall_bps, floors, room_mesh_bps, lamps = get_floor_plan_objects(scene)
+    room_columns = get_room_columns(floors,wall_bps)
+    with open_file(path,"w") as file:
+        file.write(json.dumps({"format":FORMAT_NAME,"version":FORMAT_VERSION}) + "\n")
+        write_table(file,"walls",WALL_COLUMNS,get_wall_columns(wall_bps))
+        write_table(file,"rooms",ROOM_COLUMNS,room_columns)
+        write_table(file,"room_meshes",ROOM_MESH_COLUMNS,get_room_mesh_columns(room_mesh_bps))
+        write_table(file,"lamps",LAMP_COLUMNS,get_lamp_columns(lamps))
+    return len(wall_bps), len(room_columns["name"]), len(room_mesh_bps), len(lamps)
+
+def read_floor_plan(path):
+    """
+    reads a floor plan file one line at a time
+
+    **Parameters:**
+
+    * **path** (string) - File to read
+
+    **Returns:** Dictionary of table name -> dictionary of column name -> list of values
+    """
+    tables = {}
+    with open_file(path,"r") as file:
+        header = json.loads(file.readline())
+        if header.get("format") != FORMAT_NAME:
+            raise ValueError("Not a floor plan file: " + path)
+        if header.get("version",0) > FORMAT_VERSION:
+            raise ValueError("Floor plan was saved with a newer version: " + str(header["version"]))
+        table = None
+        for line in file:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if "table" in data:
+                table = tables.setdefault(data["table"],{})
+            elif table is not None:
+                if "column" not in data or "values" not in data:
+                    raise ValueError("Invalid column in floor plan: " + line.strip()[:80])
+                table[data["column"]] = data["values"]
+    return tables
+
+def validate_tables(tables):
+    """
+    checks that every table has the columns that are needed to create its rows 
+    and that no column is shorter than the name column. This is done before 
+    anything is created so a bad file never leaves a half built scene.
+
+    **Parameters:**
+
+    * **tables** (dictionary) - Read with read_floor_plan
+
+    **Raises:** ValueError if a column is missing or too short
+    """
+    for table_name, column_names in REQUIRED_COLUMNS.items():
+        table = tables.get(table_name,{})
+        count = len(table.get("name",[]))
+        if count == 0:
+            continue
+        for column_name in column_names:
+            if column_name not in table:
+                raise ValueError("The " + table_name + " table is missing the " + column_name + " column")
+        for column_name, values in table.items():
+            if len(values) < count:
+                raise ValueError("The " + column_name + " column of the " + table_name + " table is missing values")
+
+def get_column(table,name,count,default):
+    return table.get(name,[default] * count)
+
+def create_walls(context,table,use_baked_layout=False):
+    """
+    creates the walls from the walls table.
+    The walls are created first and then connected and sized in one batch.
+
+    **Returns:** list of Assembly
+    """
+    from .room_designer import create_wall_assembly, get_roombuilder_props
+    from . import wall_layout
+
+    names = table.get("name",[])
+    count = len(names)
+    if count == 0:
+        return []
+    props = get_roombuilder_props(context)
+
+    walls = []
+    mesh_names = get_column(table,"mesh_name",count,"")
+    for index in range(count):
+        wall = create_wall_assembly(props,(table["x"][index],table["y"][index],table["z"][index]),wall_number=index + 1,
+                                    name=names[index],mesh_name=mesh_names[index])
+        wall.obj_bp.rotation_euler.z = table["rotation"][index]
+        wall.obj_bp["USE_DEFAULT_HEIGHT"] = bool(get_column(table,"default_height",count,1)[index])
+        wall.obj_bp["USE_DEFAULT_DEPTH"] = bool(get_column(table,"default_depth",count,1)[index])
+        walls.append(wall)
+
+    for wall, previous in zip(walls,get_column(table,"previous",count,-1)):
+        if 0 <= previous < count:
+            if use_baked_layout:
+                wall.obj_bp[LAYOUT_PREVIOUS] = walls[previous].obj_bp.name
+            else:
+                wall_layout.connect_wall(wall.obj_bp,walls[previous].obj_x)
+    wall_layout.invalidate_layout_cache()
+
+    AssemblyArray([wall.obj_bp for wall in walls]).set_dimensions(x=table["length"],y=table["depth"],z=table["height"])
+    return walls
+
+def create_rooms(context,table,walls):
+    """
+    builds the floors and ceilings from the rooms table.
+    Rooms that use a wall that wasn't created are skipped.
+
+    **Returns:** list of rooms.Room
+    """
+    names = table.get("name",[])
+    count = len(names)
+    if count == 0:
+        return []
+    #THE WALL MATRICES HAVE TO BE UPDATED BEFORE THE ROOM OUTLINES CAN BE READ
+    context.scene.update()
+    new_rooms = []
+    ceiling_names = get_column(table,"ceiling_name",count,"")
+    for index in range(count):
+        wall_indexes = table["walls"][index]
+        if not all(0 <= wall_index < len(walls) for wall_index in wall_indexes):
+            continue
+        new_rooms.append(rooms.create_room(context,[walls[wall_index] for wall_index in wall_indexes],index + 1,
+                                           add_ceiling=ceiling_names[index] != "",
+                                           floor_name=names[index],ceiling_name=ceiling_names[index]))
+    return new_rooms
+
+def create_room_meshes(context,table):
+    """
+    creates the room meshes from the room meshes table
+
+    **Returns:** list of Assembly
+    """
+    names = table.get("name",[])
+    count = len(names)
+    assemblies = []
+    for index in range(count):
+        assembly = Assembly()
+        assembly.create_assembly()
+        obj_mesh = assembly.add_mesh(get_column(table,"mesh_name",count,"RoomCube")[index] or "RoomCube")
+        obj_mesh[ISROOMMESH] = True
+        assembly.obj_bp.name = names[index]
+        assembly.obj_bp.location = (table["x"][index],table["y"][index],table["z"][index])
+        assembly.obj_bp.rotation_euler = (table["rotation_x"][index],table["rotation_y"][index],table["rotation_z"][index])
+        assemblies.append(assembly)
+    if assemblies:
+        AssemblyArray([assembly.obj_bp for assembly in assemblies]).set_dimensions(x=table["length"],y=table["width"],z=table["height"])
+    return assemblies
+
+def create_lamps(context,table):
+    """
+    creates the area lamps from the lamps table
+
+    **Returns:** list of bpy.types.Object
+    """
+    names = table.get("name",[])
+    lamps = []
+    for index, name in enumerate(names):
+        lamp = bpy.data.lamps.new(name,'AREA')
+        lamp.shape = table["shape"][index]
+        lamp.size = table["size"][index]
+        lamp.size_y = table["size_y"][index]
+        lamp.energy = table["energy"][index]
+        lamp.color = (table["color_r"][index],table["color_g"][index],table["color_b"][index])
+        obj_lamp = bpy.data.objects.new(name,lamp)
+        obj_lamp.location = (table["x"][index],table["y"][index],table["z"][index])
+        obj_lamp.rotation_euler = (table["rotation_x"][index],table["rotation_y"][index],table["rotation_z"][index])
+        context.scene.objects.link(obj_lamp)
+        lamps.append(obj_lamp)
+    return lamps
+
+def import_floor_plan(context,path):
+    """
+    creates the walls, rooms, room meshes and area lamps saved in a floor plan file
+
+    **Parameters:**
+
+    * **context** (bpy.context)
+    * **path** (string) - File to read
+
+    **Returns:** (number of walls, number of rooms, number of room meshes, number of lamps)
+    """
+    tables = read_floor_plan(path)
+    validate_tables(tables)
+    use_baked_layout = context.scene.room_builder.use_baked_layout
+    walls = create_walls(context,tables.get("walls",{}),use_baked_layout)
+    new_rooms = create_rooms(context,tables.get("rooms",{}),walls)
+    room_meshes = create_room_meshes(context,tables.get("room_meshes",{}))
+    lamps = create_lamps(context,tables.get("lamps",{}))
+    return len(walls), len(new_rooms), len(room_meshes), len(lamps)
+
+class OPS_export_floor_plan(bpy.types.Operator):
+    bl_idname = "room_builder.export_floor_plan"
+    bl_label = "Export Floor Plan"
+    bl_description = "Saves the walls, rooms, room meshes and area lamps to a floor plan file"
+
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob = bpy.props.StringProperty(default="*.jsonl;*.gz",options={'HIDDEN'})
+
+    def execute(self,context):
+        path = self.filepath
+        if not path.endswith(".gz"):
+            path = bpy.path.ensure_ext(path,FILE_EXTENSION)
+        counts = export_floor_plan(context.scene,path)
+        self.report({'INFO'},"Saved %d walls, %d rooms, %d room meshes and %d lamps to %s" % (counts + (path,)))
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        if not self.filepath:
+            self.filepath = "floor_plan" + FILE_EXTENSION
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class OPS_import_floor_plan(bpy.types.Operator):
+    bl_idname = "room_builder.import_floor_plan"
+    bl_label = "Import Floor Plan"
+    bl_description = "Creates the walls, rooms, room meshes and area lamps saved in a floor plan file"
+    bl_options = {'UNDO'}
+
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob = bpy.props.StringProperty(default="*.jsonl;*.gz",options={'HIDDEN'})
+
+    def execute(self,context):
+        try:
+            counts = import_floor_plan(context,self.filepath)
+        except (OSError,ValueError) as error:
+            self.report({'ERROR'},str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'},"Created %d walls, %d rooms, %d room meshes and %d lamps" % counts)
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+def register():
+    bpy.utils.register_class(OPS_export_floor_plan)
+    bpy.utils.register_class(OPS_import_floor_plan)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_export_floor_plan)
+    bpy.utils.unregister_class(OPS_import_floor_plan)
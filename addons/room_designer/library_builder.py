@@ -0,0 +1,109 @@
+"""
+This module builds and saves every product in a library in parallel.
+
+Each product class is drawn, cleaned and saved with utils.save_assembly
+by library_worker.py in a pool of background Blender processes. The workers
+start with the user preferences so the library packages are available.
+A product that raises an error or crashes Blender only fails that product.
+
+    package_name:module_name:PRODUCT_Class_Name
+
+"""
+
+import bpy
+import inspect
+import os
+from . import batch, utils
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__),"library_worker.py")
+
+def get_product_item(package_name,module_name,class_name):
+    return package_name + ":" + module_name + ":" + class_name
+
+def get_product_items(package_name,category_name=""):
+    """
+    finds the product classes in a library package
+
+    **Parameters:**
+
+    * **package_name** (string) - Python package of the library
+    * **category_name** (string, (optional)) - Only include products in this category
+
+    **Returns:** list of strings - package_name:module_name:class_name
+    """
+    pkg = __import__(package_name)
+    items = []
+    for modname, modobj in inspect.getmembers(pkg,inspect.ismodule):
+        for name, obj in inspect.getmembers(modobj,inspect.isclass):
+            if "PRODUCT_" in name and obj.__module__ == modobj.__name__:
+                if category_name and getattr(obj,'category_name',"") != category_name:
+                    continue
+                items.append(get_product_item(package_name,modname,name))
+    return sorted(items)
+
+def get_package_path(package_name):
+    """ Returns: string - The folder that has to be on sys.path to import the package
+    """
+    pkg = __import__(package_name)
+    return os.path.dirname(os.path.dirname(os.path.abspath(pkg.__file__)))
+
+def get_library_job(items,path,processes=0):
+    """
+    creates the job that builds and saves the products
+
+    **Parameters:**
+
+    * **items** (list of strings) - Products from get_product_items
+    * **path** (string) - Library folder. Each product is saved in a folder for its category.
+    * **processes** (int, (optional)) - Number of Blender processes. 0 uses every CPU core.
+
+    **Returns:** batch.Batch_Job - Call start then poll until is_finished returns True
+    """
+    package_paths = sorted(set(get_package_path(item.split(":")[0]) for item in items))
+    return batch.Batch_Job(WORKER_SCRIPT,
+                           items,
+                           options={"path":path,"addon":__package__,"package_paths":package_paths},
+                           processes=min(batch.get_worker_count(processes),max(1,len(items))),
+                           factory_startup=False)
+
+class OPS_save_library(batch.Batch_Operator,bpy.types.Operator):
+    bl_idname = "room_builder.save_library"
+    bl_label = "Save Product Library"
+    bl_description = "Builds and saves every product in the active product library using every CPU core"
+
+    directory = bpy.props.StringProperty(name="Library Folder",subtype='DIR_PATH')
+    category_name = bpy.props.StringProperty(name="Category",description="Only save the products in this category. Leave blank to save every category")
+    processes = bpy.props.IntProperty(name="Processes",description="Number of Blender processes to start. 0 uses every CPU core",default=0,min=0)
+
+    job_label = "Saving Products"
+
+    @classmethod
+    def poll(cls,context):
+        return hasattr(context.window_manager,'cabinetlib') and context.scene.mv.product_library_name in context.window_manager.cabinetlib.lib_products
+
+    def execute(self,context):
+        lib = context.window_manager.cabinetlib.lib_products[context.scene.mv.product_library_name]
+        items = get_product_items(lib.package_name,self.category_name)
+        if not items:
+            self.report({'INFO'},"No products found in " + lib.package_name)
+            return {'FINISHED'}
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        return self.start_job(context,get_library_job(items,self.directory,self.processes))
+
+    def invoke(self,context,event):
+        if not self.directory:
+            self.directory = utils.get_library_dir("assemblies")
+        return context.window_manager.invoke_props_dialog(self,width=400)
+
+    def draw(self,context):
+        layout = self.layout
+        layout.prop(self,'directory')
+        layout.prop(self,'category_name')
+        layout.prop(self,'processes')
+
+def register():
+    bpy.utils.register_class(OPS_save_library)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_save_library)
@@ -0,0 +1,200 @@
+"""
+This module removes the duplicate meshes, materials and images from a library.
+
+Every .blend file in the library folder is hashed by packer_worker.py.
+Datablocks that have the same hash in more than one place are appended once
+into shared_data.blend in the root of the library folder. Every file that
+used a copy then links the datablock from the shared file instead, so
+get_object and get_group only read each shared panel and texture once.
+
+    HASH - Hash the datablocks in every file in parallel
+    BUILD - Save the shared file
+    RELINK - Link the shared datablocks in every file in parallel
+
+"""
+
+import bpy
+import json
+import os
+import shutil
+import tempfile
+from . import batch, utils
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__),"packer_worker.py")
+SHARED_FILENAME = "shared_data.blend"
+DATA_TYPES = ('images','materials','meshes')
+
+def get_shared_path(path):
+    return os.path.join(path,SHARED_FILENAME)
+
+def find_library_files(path):
+    """ Returns: sorted list of the .blend files in the library folder except the shared file
+    """
+    shared_path = get_shared_path(path)
+    paths = []
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            if file.lower().endswith(".blend"):
+                blend_path = os.path.join(root,file)
+                if os.path.normcase(blend_path) != os.path.normcase(shared_path):
+                    paths.append(blend_path)
+    return sorted(paths)
+
+def get_folder_size(paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+def read_manifests(manifest_dir):
+    """ Returns: Dictionary of file path -> manifest written by the HASH step
+    """
+    manifests = {}
+    for file in os.listdir(manifest_dir):
+        with open(os.path.join(manifest_dir,file),'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        manifests[manifest["path"]] = manifest
+    return manifests
+
+def get_shared_hashes(manifests,shared_path):
+    """
+    finds the datablocks that are used more than once in the library.
+    Everything that is already in the shared file stays shared so the
+    files that link it don't break.
+
+    **Returns:** Dictionary of data type -> sorted list of hashes
+    """
+    shared = {}
+    for data_type in DATA_TYPES:
+        counts = {}
+        for path, manifest in manifests.items():
+            for value in manifest[data_type].values():
+                counts[value] = counts.get(value,0) + 1
+        hashes = set(value for value, count in counts.items() if count > 1)
+        if shared_path in manifests:
+            hashes.update(manifests[shared_path][data_type].values())
+        shared[data_type] = sorted(hashes)
+    return shared
+
+def get_sources(manifests,shared,shared_path):
+    """
+    picks one file to append each shared datablock from. The shared file
+    is used first so existing datablocks don't have to be appended again.
+
+    **Returns:** Dictionary of file path -> (data type -> list of names)
+    """
+    sources = {}
+    found = {data_type:set() for data_type in DATA_TYPES}
+    paths = sorted(manifests,key=lambda path: (path != shared_path,path))
+    for path in paths:
+        for data_type in DATA_TYPES:
+            shared_hashes = set(shared[data_type])
+            for name, value in sorted(manifests[path][data_type].items()):
+                if value in shared_hashes and value not in found[data_type]:
+                    found[data_type].add(value)
+                    sources.setdefault(path,{data_type:[] for data_type in DATA_TYPES})[data_type].append(name)
+    return sources
+
+def get_relink_paths(manifests,shared,shared_path):
+    """ Returns: sorted list of the files that have a copy of a shared datablock
+    """
+    paths = []
+    for path, manifest in manifests.items():
+        if path == shared_path:
+            continue
+        for data_type in DATA_TYPES:
+            if set(manifest[data_type].values()) & set(shared[data_type]):
+                paths.append(path)
+                break
+    return sorted(paths)
+
+def get_packer_job(mode,items,options,processes=0):
+    options = dict(options)
+    options["mode"] = mode
+    return batch.Batch_Job(WORKER_SCRIPT,
+                           items,
+                           options=options,
+                           processes=min(batch.get_worker_count(processes),max(1,len(items))),
+                           factory_startup=True)
+
+class OPS_pack_library(batch.Batch_Operator,bpy.types.Operator):
+    bl_idname = "room_builder.pack_library"
+    bl_label = "Pack Library"
+    bl_description = "Stores the meshes, materials and images that are used more than once in a library folder in one shared file"
+
+    directory = bpy.props.StringProperty(name="Library Folder",subtype='DIR_PATH')
+    keep_backups = bpy.props.BoolProperty(name="Keep Backups",description="Save a .blend1 backup of every file that is changed",default=True)
+    processes = bpy.props.IntProperty(name="Processes",description="Number of Blender processes to start. 0 uses every CPU core",default=0,min=0)
+
+    step = 'HASH'
+    manifest_dir = ""
+    size_before = 0
+
+    def execute(self,context):
+        self.files = find_library_files(self.directory)
+        if not self.files:
+            self.report({'INFO'},"No .blend files found in " + self.directory)
+            return {'FINISHED'}
+        shared_path = get_shared_path(self.directory)
+        items = list(self.files)
+        if os.path.exists(shared_path):
+            items.append(shared_path)
+        self.size_before = get_folder_size(items)
+        self.manifest_dir = tempfile.mkdtemp(prefix="room_designer_pack_")
+        self.step = 'HASH'
+        self.job_label = "Hashing Files"
+        return self.start_job(context,get_packer_job('HASH',items,{"manifest_dir":self.manifest_dir},self.processes))
+
+    def job_finished(self,context):
+        shared_path = get_shared_path(self.directory)
+        if self.step == 'HASH':
+            manifests = read_manifests(self.manifest_dir)
+            if shared_path not in manifests and os.path.exists(shared_path):
+                return self.finish_packing("Could not read " + shared_path)
+            self.shared = get_shared_hashes(manifests,shared_path)
+            self.relink_paths = get_relink_paths(manifests,self.shared,shared_path)
+            if not self.relink_paths:
+                return self.finish_packing()
+            self.step = 'BUILD'
+            self.job_label = "Saving Shared File"
+            options = {"shared":self.shared,"sources":get_sources(manifests,self.shared,shared_path)}
+            self.start_job(context,get_packer_job('BUILD',[shared_path],options,1))
+
+        elif self.step == 'BUILD':
+            if self.job.get_failed():
+                return self.finish_packing("Could not save " + shared_path)
+            self.step = 'RELINK'
+            self.job_label = "Linking Shared Data"
+            options = {"shared":self.shared,"shared_path":shared_path,"keep_backups":self.keep_backups}
+            self.start_job(context,get_packer_job('RELINK',self.relink_paths,options,self.processes))
+
+        else:
+            return self.finish_packing()
+
+    def finish_packing(self,error=""):
+        shutil.rmtree(self.manifest_dir,ignore_errors=True)
+        if error:
+            self.report({'ERROR'},"Pack library failed. " + error)
+            return {'CANCELLED'}
+        size_after = get_folder_size(self.files + [get_shared_path(self.directory)])
+        failed = self.job.get_failed()
+        message = "Packed " + self.directory + " from " + str(round(self.size_before / 1048576,1)) + " MB to " + str(round(size_after / 1048576,1)) + " MB"
+        if failed:
+            self.report({'WARNING'},message + ". " + str(len(failed)) + " files failed. See the console for details.")
+        else:
+            self.report({'INFO'},message)
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        if not self.directory:
+            self.directory = utils.get_library_dir("assemblies")
+        return context.window_manager.invoke_props_dialog(self,width=400)
+
+    def draw(self,context):
+        layout = self.layout
+        layout.prop(self,'directory')
+        layout.prop(self,'keep_backups')
+        layout.prop(self,'processes')
+
+def register():
+    bpy.utils.register_class(OPS_pack_library)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_pack_library)
@@ -0,0 +1,62 @@
+"""
+Worker script for the batch library save. This is run by library_builder.py with
+
+    blender --background --python library_worker.py -- queue.json
+
+Each item is package_name:module_name:class_name. An empty file is saved
+when the worker starts and it is opened again before each product, so no
+datablocks from the startup file or the last product are saved with the
+next one. The product is drawn and then saved with utils.save_assembly.
+
+"""
+
+import bpy
+import importlib
+import os
+import sys
+import tempfile
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+from batch import run_worker
+
+def save_empty_file():
+    """ Removes everything from the startup file and saves it so it can be opened before each product
+        Returns: string - Path to the empty file
+    """
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj,do_unlink=True)
+    #DATABLOCKS ARE REMOVED IN THIS ORDER SO THE USERS OF EACH ONE ARE ALREADY GONE
+    for collection in (bpy.data.groups,bpy.data.meshes,bpy.data.curves,bpy.data.materials,
+                       bpy.data.textures,bpy.data.images,bpy.data.cameras,bpy.data.lamps):
+        for datablock in list(collection):
+            if datablock.users == 0:
+                collection.remove(datablock)
+    file, path = tempfile.mkstemp(prefix="room_designer_empty_",suffix=".blend")
+    os.close(file)
+    bpy.ops.wm.save_as_mainfile(filepath=path,copy=True)
+    return path
+
+EMPTY_FILE = save_empty_file()
+
+def save_product(item,options):
+    for path in options["package_paths"]:
+        if path not in sys.path:
+            sys.path.append(path)
+    utils = importlib.import_module(options["addon"] + ".utils")
+
+    package_name, module_name, class_name = item.split(":")
+    module = importlib.import_module(package_name + "." + module_name)
+    product = getattr(module,class_name)()
+    if product.assembly_name == "":
+        product.assembly_name = utils.get_product_class_name(class_name)
+
+    bpy.ops.wm.open_mainfile(filepath=EMPTY_FILE,load_ui=False)
+    product.draw()
+    if hasattr(product,'update'):
+        product.update()
+    utils.save_assembly(product,options["path"])
+
+try:
+    run_worker(save_product)
+finally:
+    os.remove(EMPTY_FILE)
@@ -0,0 +1,268 @@
+"""
+Worker script for the library packer. This is run by library_packer.py with
+
+    blender --background --factory-startup --python packer_worker.py -- queue.json
+
+The options mode decides what is done with each item.
+
+    HASH - Item is a .blend file. Writes the hash of every local image,
+           material and mesh to a JSON manifest.
+    BUILD - Item is the shared .blend file. Appends one copy of every shared
+            datablock, names it by its hash and saves the file.
+    RELINK - Item is a .blend file. Replaces the local datablocks that are in
+             the shared file with links to the shared file and saves the file.
+
+The hashes only use the content of the datablocks and never the names
+so two panels with the same geometry and materials get the same hash.
+
+"""
+
+import array
+import bpy
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+from batch import run_worker
+
+DATA_TYPES = ('images','materials','meshes')
+
+#PROPERTIES THAT DON'T CHANGE HOW A DATABLOCK LOOKS
+SKIP_PROPS = {'rna_type','name','users','use_fake_user','tag','is_updated','is_updated_data',
+              'is_library_indirect','location','width','width_hidden','height','dimensions',
+              'select','hide','show_options','show_preview','show_texture','label',
+              'use_custom_color','color','filepath','filepath_raw','bindcode','is_dirty',
+              'has_data','frame_duration','preview_render_type','pass_index'}
+
+#NUMBER OF DECIMALS USED WHEN HASHING FLOAT PROPERTIES
+PRECISION = 6
+
+def get_value(value):
+    if isinstance(value,float):
+        return round(value,PRECISION)
+    if isinstance(value,(str,bool,int)):
+        return value
+    if isinstance(value,(set,frozenset)):
+        return tuple(sorted(value))
+    try:
+        return tuple(get_value(item) for item in value)
+    except TypeError:
+        return repr(value)
+
+def get_rna_values(struct):
+    """ Returns: list of (identifier, value) for every property that isn't a pointer or collection
+    """
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in SKIP_PROPS or prop.type in {'POINTER','COLLECTION'}:
+            continue
+        values.append((prop.identifier,get_value(getattr(struct,prop.identifier))))
+    return values
+
+def get_md5(values):
+    return hashlib.md5(repr(values).encode('utf-8')).hexdigest()
+
+def get_file_md5(path):
+    md5 = hashlib.md5()
+    with open(path,'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20),b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def get_image_hash(image):
+    """ Returns: string or None if the image doesn't have data that can be hashed
+    """
+    if image.packed_file and getattr(image.packed_file,'data',None):
+        content = hashlib.md5(image.packed_file.data).hexdigest()
+    else:
+        path = bpy.path.abspath(image.filepath,library=image.library)
+        if image.source != 'FILE' or not os.path.isfile(path):
+            return None
+        content = get_file_md5(path)
+    return get_md5([content,image.colorspace_settings.name,image.alpha_mode,image.use_alpha])
+
+def get_material_hash(material,image_hashes):
+    """ Returns: string or None if the material uses an image that can't be hashed
+    """
+    values = get_rna_values(material)
+    for slot in material.texture_slots:
+        if slot is None or slot.texture is None:
+            values.append(None)
+            continue
+        values.append(get_rna_values(slot))
+        values.append(get_rna_values(slot.texture))
+        image = getattr(slot.texture,'image',None)
+        if image:
+            if image_hashes.get(image.name) is None:
+                return None
+            values.append(image_hashes[image.name])
+    if material.use_nodes and material.node_tree:
+        for node in sorted(material.node_tree.nodes,key=lambda node: node.name):
+            values.append((node.name,node.bl_idname))
+            values.append(get_rna_values(node))
+            for socket in node.inputs:
+                values.append(get_value(getattr(socket,'default_value',None)))
+            image = getattr(node,'image',None)
+            if image:
+                if image_hashes.get(image.name) is None:
+                    return None
+                values.append(image_hashes[image.name])
+        for link in material.node_tree.links:
+            values.append((link.from_node.name,link.from_socket.identifier,
+                           link.to_node.name,link.to_socket.identifier))
+    return get_md5(values)
+
+def get_foreach_bytes(collection,attribute,size,type_code):
+    data = array.array(type_code,[0]) * (len(collection) * size)
+    collection.foreach_get(attribute,data)
+    return data.tobytes()
+
+def get_mesh_hash(mesh,material_hashes):
+    """ Returns: string or None if the mesh can't be shared
+        Meshes with shape keys are never shared because appending them links the objects.
+    """
+    if mesh.shape_keys:
+        return None
+    md5 = hashlib.md5()
+    md5.update(get_foreach_bytes(mesh.vertices,"co",3,'f'))
+    md5.update(get_foreach_bytes(mesh.edges,"vertices",2,'i'))
+    md5.update(get_foreach_bytes(mesh.loops,"vertex_index",1,'i'))
+    md5.update(get_foreach_bytes(mesh.polygons,"loop_start",1,'i'))
+    md5.update(get_foreach_bytes(mesh.polygons,"loop_total",1,'i'))
+    md5.update(get_foreach_bytes(mesh.polygons,"material_index",1,'i'))
+    md5.update(get_foreach_bytes(mesh.polygons,"use_smooth",1,'b'))
+    for uv_layer in mesh.uv_layers:
+        md5.update(uv_layer.name.encode('utf-8'))
+        md5.update(get_foreach_bytes(uv_layer.data,"uv",2,'f'))
+    for material in mesh.materials:
+        if material is None:
+            md5.update(b'None')
+        elif material_hashes.get(material.name) is None:
+            return None
+        else:
+            md5.update(material_hashes[material.name].encode('utf-8'))
+    md5.update(repr(get_rna_values(mesh)).encode('utf-8'))
+    return md5.hexdigest()
+
+def get_hashes():
+    """ Returns: Dictionary of data type -> (name -> hash) for the local datablocks in the file
+    """
+    hashes = {data_type:{} for data_type in DATA_TYPES}
+    for image in bpy.data.images:
+        if image.library is None:
+            hashes['images'][image.name] = get_image_hash(image)
+    for material in bpy.data.materials:
+        if material.library is None:
+            hashes['materials'][material.name] = get_material_hash(material,hashes['images'])
+    for mesh in bpy.data.meshes:
+        if mesh.library is None:
+            hashes['meshes'][mesh.name] = get_mesh_hash(mesh,hashes['materials'])
+    for data_type in DATA_TYPES:
+        hashes[data_type] = {name: value for name, value in hashes[data_type].items() if value is not None}
+    return hashes
+
+def get_manifest_path(manifest_dir,path):
+    return os.path.join(manifest_dir,hashlib.md5(path.encode('utf-8')).hexdigest() + ".json")
+
+def clear_file():
+    scene = bpy.context.scene
+    for obj in list(scene.objects):
+        scene.objects.unlink(obj)
+    for collection in (bpy.data.groups,bpy.data.objects,bpy.data.meshes,bpy.data.curves,bpy.data.materials,
+                       bpy.data.textures,bpy.data.images,bpy.data.cameras,bpy.data.lamps):
+        for datablock in list(collection):
+            if datablock.users == 0:
+                collection.remove(datablock)
+
+def hash_file(path,options):
+    bpy.ops.wm.open_mainfile(filepath=path,load_ui=False)
+    manifest = get_hashes()
+    manifest["path"] = path
+    with open(get_manifest_path(options["manifest_dir"],path),'w') as file:
+        json.dump(manifest,file)
+
+def build_shared_file(path,options):
+    clear_file()
+    for source_path, names in sorted(options["sources"].items()):
+        with bpy.data.libraries.load(source_path,False,False) as (data_from, data_to):
+            for data_type in DATA_TYPES:
+                setattr(data_to,data_type,[name for name in names[data_type] if name in getattr(data_from,data_type)])
+
+    #APPENDED MESHES BRING THEIR MATERIALS AND IMAGES WITH THEM SO COPIES ARE MERGED BY HASH
+    hashes = get_hashes()
+    for data_type in DATA_TYPES:
+        collection = getattr(bpy.data,data_type)
+        shared = set(options["shared"][data_type])
+        kept = {}
+        for name, value in sorted(hashes[data_type].items()):
+            datablock = collection[name]
+            if value in kept:
+                datablock.user_remap(kept[value])
+                collection.remove(datablock)
+            elif value in shared:
+                datablock.name = value
+                datablock.use_fake_user = True
+                kept[value] = datablock
+        missing = shared - set(kept)
+        if missing:
+            raise ValueError("Could not append " + str(len(missing)) + " shared " + data_type)
+        #HASHES ARE RECALCULATED WITH THE MERGED DATABLOCKS
+        hashes = get_hashes()
+
+    temp_path = path + ".tmp.blend"
+    bpy.ops.wm.save_as_mainfile(filepath=temp_path,relative_remap=True)
+    os.replace(temp_path,path)
+
+def relink_file(path,options):
+    bpy.ops.wm.open_mainfile(filepath=path,load_ui=False)
+    hashes = get_hashes()
+
+    link_names = {}
+    for data_type in DATA_TYPES:
+        shared = set(options["shared"][data_type])
+        link_names[data_type] = {name: value for name, value in hashes[data_type].items() if value in shared}
+    if not any(link_names.values()):
+        return
+
+    with bpy.data.libraries.load(options["shared_path"],True,True) as (data_from, data_to):
+        for data_type in DATA_TYPES:
+            setattr(data_to,data_type,sorted(set(link_names[data_type].values())))
+
+    linked_meshes = set()
+    for data_type in DATA_TYPES:
+        collection = getattr(bpy.data,data_type)
+        linked = {datablock.name: datablock for datablock in getattr(data_to,data_type) if datablock is not None}
+        for name, value in link_names[data_type].items():
+            if value not in linked:
+                continue
+            local = collection[name]
+            local.user_remap(linked[value])
+            collection.remove(local)
+            if data_type == 'meshes':
+                linked_meshes.add(linked[value])
+
+    #LINKED MESHES CAN'T BE CHANGED SO MATERIALS ARE ASSIGNED TO THE OBJECTS INSTEAD
+    for obj in bpy.data.objects:
+        if obj.library is None and obj.data in linked_meshes:
+            for slot in obj.material_slots:
+                if slot.link == 'DATA':
+                    material = slot.material
+                    slot.link = 'OBJECT'
+                    slot.material = material
+
+    #THE FILE IS SAVED NEXT TO THE ORIGINAL FIRST SO A FAILED SAVE NEVER LEAVES A BROKEN FILE
+    temp_path = path + ".tmp.blend"
+    bpy.ops.wm.save_as_mainfile(filepath=temp_path,relative_remap=True,copy=True)
+    if options["keep_backups"]:
+        shutil.copy2(path,path + "1")
+    os.replace(temp_path,path)
+
+MODES = {'HASH':hash_file,'BUILD':build_shared_file,'RELINK':relink_file}
+
+def process_item(item,options):
+    MODES[options["mode"]](item,options)
+
+run_worker(process_item)
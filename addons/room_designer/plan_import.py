@@ -0,0 +1,489 @@
+"""
+This module imports 2D floor plans from DXF and CSV files as walls.
+
+The segments are read one at a time from the file. Segments that lie on the
+same line and touch are merged. Lines that are parallel and a wall thickness
+apart are paired into walls by looking up the lines that are close in a
+spatial hash. The closest pairs are used first and a line can pair with more
+than one line. The ends of the paired walls are moved to where their center
+lines meet the center lines of the walls next to them so the corners close.
+The parts of lines that don't have a pair become walls with the default depth.
+
+    ASCII DXF - LINE and LWPOLYLINE entities
+    CSV - one segment per row: x1,y1,x2,y2
+
+"""
+
+import bpy
+import csv
+import math
+from .assembly import AssemblyArray
+
+#$INSUNITS -> METERS
+DXF_UNITS = {1:.0254,2:.3048,4:.001,5:.01,6:1.0}
+
+UNIT_SCALE = {'IN':.0254,'FT':.3048,'MM':.001,'CM':.01,'M':1.0}
+
+#SEGMENTS THAT ARE CLOSER THAN THIS ARE TREATED AS TOUCHING (METERS)
+TOLERANCE = .001
+
+#LINES WITH DIRECTIONS CLOSER THAN THIS ARE TREATED AS PARALLEL (RADIANS)
+ANGLE_TOLERANCE = math.radians(.5)
+
+def read_dxf_pairs(file):
+    """ Yields the (group code, value) pairs of a DXF file
+    """
+    while True:
+        code = file.readline()
+        value = file.readline()
+        if not code or not value:
+            return
+        yield int(code.strip()), value.strip()
+
+def read_dxf_segments(path):
+    """
+    reads the LINE and LWPOLYLINE entities of an ASCII DXF file
+    without loading the whole file.
+
+    **Parameters:**
+
+    * **path** (string)
+
+    **Yields:** ((x1,y1),(x2,y2)) in the units of the file.
+    The $INSUNITS header value is yielded first as ('UNITS',value) if it exists.
+    """
+    with open(path,'r',encoding='utf-8',errors='replace') as file:
+        section = None
+        entity = None
+        points = []
+        closed = False
+        line_values = {}
+        variable = None
+
+        def finish_entity():
+            #ENTITIES THAT ARE MISSING A COORDINATE ARE SKIPPED
+            if entity == 'LINE':
+                if all(code in line_values for code in (10,20,11,21)):
+                    yield ((line_values[10],line_values[20]),(line_values[11],line_values[21]))
+            elif entity == 'LWPOLYLINE':
+                if any(point[1] is None for point in points):
+                    return
+                for start, end in zip(points,points[1:]):
+                    yield (start,end)
+                if closed and len(points) > 2:
+                    yield (points[-1],points[0])
+
+        for code, value in read_dxf_pairs(file):
+            if code == 0:
+                for segment in finish_entity():
+                    yield segment
+                entity = None
+                if value == 'SECTION':
+                    section = None
+                elif value == 'ENDSEC':
+                    section = None
+                elif section == 'ENTITIES' and value in {'LINE','LWPOLYLINE'}:
+                    entity = value
+                    points = []
+                    closed = False
+                    line_values = {}
+                continue
+            if code == 2 and section is None:
+                section = value
+            elif section == 'HEADER':
+                if code == 9:
+                    variable = value
+                elif variable == '$INSUNITS' and code == 70:
+                    yield ('UNITS',int(value))
+            elif entity == 'LINE':
+                if code in {10,20,11,21}:
+                    line_values[code] = float(value)
+            elif entity == 'LWPOLYLINE':
+                if code == 10:
+                    points.append((float(value),None))
+                elif code == 20 and points:
+                    points[-1] = (points[-1][0],float(value))
+                elif code == 70:
+                    closed = bool(int(value) & 1)
+
+def read_csv_segments(path):
+    """
+    reads the segments in a CSV file. Rows that don't start
+    with four numbers (ex. a header) are skipped.
+
+    **Yields:** ((x1,y1),(x2,y2))
+    """
+    with open(path,'r',newline='') as file:
+        for row in csv.reader(file):
+            try:
+                x1, y1, x2, y2 = (float(value) for value in row[:4])
+            except ValueError:
+                continue
+            yield ((x1,y1),(x2,y2))
+
+def get_line_key(start,end):
+    """
+    returns the direction and offset of the infinite line through a segment.
+    The direction is between 0 and pi so segments drawn in either direction match.
+
+    **Returns:** (angle, offset, dx, dy) or None if the segment has no length
+    """
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.hypot(dx,dy)
+    if length < TOLERANCE:
+        return None
+    angle = math.atan2(dy,dx)
+    if angle < 0:
+        angle += math.pi
+    if angle >= math.pi - ANGLE_TOLERANCE / 2:
+        angle = 0.0
+    dx = math.cos(angle)
+    dy = math.sin(angle)
+    offset = start[1] * dx - start[0] * dy
+    return angle, offset, dx, dy
+
+def merge_collinear_segments(segments):
+    """
+    merges segments that are on the same line and touch or overlap.
+
+    **Parameters:**
+
+    * **segments** (iterable of ((x1,y1),(x2,y2)))
+
+    **Returns:** list of (angle, offset, start, end) where start and end are
+    distances along the line direction
+    """
+    lines = {}
+    for start, end in segments:
+        key = get_line_key(start,end)
+        if key is None:
+            continue
+        angle, offset, dx, dy = key
+        bucket = (int(round(angle / ANGLE_TOLERANCE)),int(round(offset / TOLERANCE)))
+        if bucket not in lines:
+            #LINES THAT ROUND TO THE BUCKETS NEXT TO EACH OTHER ARE STILL THE SAME LINE
+            for x in (-1,0,1):
+                for y in (-1,0,1):
+                    near_bucket = (bucket[0] + x,bucket[1] + y)
+                    if near_bucket in lines:
+                        near_angle, near_offset = lines[near_bucket][:2]
+                        if abs(near_angle - angle) <= ANGLE_TOLERANCE and abs(near_offset - offset) <= TOLERANCE:
+                            bucket = near_bucket
+                            break
+                else:
+                    continue
+                break
+        t1 = start[0] * dx + start[1] * dy
+        t2 = end[0] * dx + end[1] * dy
+        lines.setdefault(bucket,(angle,offset,[]))[2].append((min(t1,t2),max(t1,t2)))
+
+    merged = []
+    for angle, offset, intervals in lines.values():
+        intervals.sort()
+        current_start, current_end = intervals[0]
+        for start, end in intervals[1:]:
+            if start <= current_end + TOLERANCE:
+                current_end = max(current_end,end)
+            else:
+                merged.append((angle,offset,current_start,current_end))
+                current_start, current_end = start, end
+        merged.append((angle,offset,current_start,current_end))
+    return merged
+
+def get_line_points(line):
+    angle, offset, start, end = line
+    dx = math.cos(angle)
+    dy = math.sin(angle)
+    return ((start * dx - offset * dy,start * dy + offset * dx),
+            (end * dx - offset * dy,end * dy + offset * dx))
+
+def get_line_cells(line,cell_size):
+    start, end = get_line_points(line)
+    steps = max(1,int((line[3] - line[2]) / cell_size))
+    cells = set()
+    for step in range(steps + 1):
+        t = step / steps
+        cells.add((int(math.floor((start[0] + (end[0] - start[0]) * t) / cell_size)),
+                   int(math.floor((start[1] + (end[1] - start[1]) * t) / cell_size))))
+    return cells
+
+def subtract_intervals(start,end,intervals):
+    """ Returns: list of (start, end) - The parts of start to end that are not in the intervals
+    """
+    parts = []
+    for interval_start, interval_end in sorted(intervals):
+        if interval_end <= start + TOLERANCE:
+            continue
+        if interval_start >= end - TOLERANCE:
+            break
+        if interval_start > start + TOLERANCE:
+            parts.append((start,interval_start))
+        start = max(start,interval_end)
+    if end - start > TOLERANCE:
+        parts.append((start,end))
+    return parts
+
+def get_line_intersection(angle,offset,other_angle,other_offset):
+    """ Returns: float - Distance along the first line where the lines cross or None if they are parallel
+    """
+    dx, dy = math.cos(angle), math.sin(angle)
+    other_dx, other_dy = math.cos(other_angle), math.sin(other_angle)
+    det = dx * other_dy - dy * other_dx
+    if abs(det) < math.sin(ANGLE_TOLERANCE):
+        return None
+    x = (offset * other_dx - other_offset * dx) / det
+    y = (offset * other_dy - other_offset * dy) / det
+    return x * dx + y * dy
+
+def find_line_pairs(lines,grid,cell_size,min_thickness,max_thickness):
+    """ Returns: list of (index, other index, thickness, overlap start, overlap end) sorted by thickness
+    """
+    pairs = []
+    for index, line in enumerate(lines):
+        angle, offset, start, end = line
+        candidates = set()
+        for cell_x, cell_y in get_line_cells(line,cell_size):
+            for x in (-1,0,1):
+                for y in (-1,0,1):
+                    candidates.update(grid.get((cell_x + x,cell_y + y),()))
+        for other_index in candidates:
+            if other_index <= index:
+                continue
+            other_angle, other_offset, other_start, other_end = lines[other_index]
+            if abs(other_angle - angle) > ANGLE_TOLERANCE:
+                continue
+            thickness = other_offset - offset
+            if not min_thickness <= abs(thickness) <= max_thickness:
+                continue
+            overlap_start = max(start,other_start)
+            overlap_end = min(end,other_end)
+            if overlap_end - overlap_start > TOLERANCE:
+                pairs.append((index,other_index,thickness,overlap_start,overlap_end))
+    pairs.sort(key=lambda pair: (abs(pair[2]),pair[0],pair[1]))
+    return pairs
+
+def extend_wall_ends(walls,max_thickness):
+    """
+    moves the ends of the paired walls to where their center lines cross the
+    center line of the closest wall that ends near them.
+    Ends only move up to max_thickness.
+
+    **Parameters:**
+
+    * **walls** (list) - [index, other index, angle, center offset, start, end] for each paired wall
+    * **max_thickness** (float)
+    """
+    cell_size = max(max_thickness,TOLERANCE)
+    ends = {}
+    for wall_index, wall in enumerate(walls):
+        for point in get_line_points((wall[2],wall[3],wall[4],wall[5])):
+            ends.setdefault((int(math.floor(point[0] / cell_size)),int(math.floor(point[1] / cell_size))),[]).append(wall_index)
+
+    new_ends = []
+    for wall_index, wall in enumerate(walls):
+        angle, center, start, end = wall[2:]
+        new_wall_ends = [start,end]
+        for end_index, point in enumerate(get_line_points((angle,center,start,end))):
+            cell = (int(math.floor(point[0] / cell_size)),int(math.floor(point[1] / cell_size)))
+            best = None
+            for x in (-1,0,1):
+                for y in (-1,0,1):
+                    for other_index in ends.get((cell[0] + x,cell[1] + y),()):
+                        if other_index == wall_index:
+                            continue
+                        other = walls[other_index]
+                        t = get_line_intersection(angle,center,other[2],other[3])
+                        if t is None or abs(t - new_wall_ends[end_index]) > max_thickness:
+                            continue
+                        #THE CROSSING HAS TO BE NEAR AN END OF THE OTHER WALL TOO
+                        other_t = get_line_intersection(other[2],other[3],angle,center)
+                        if min(abs(other_t - other[4]),abs(other_t - other[5])) > max_thickness:
+                            continue
+                        if best is None or abs(t - new_wall_ends[end_index]) < abs(best - new_wall_ends[end_index]):
+                            best = t
+            if best is not None:
+                new_wall_ends[end_index] = best
+        new_ends.append(new_wall_ends)
+
+    for wall, (start, end) in zip(walls,new_ends):
+        if end - start > TOLERANCE:
+            wall[4], wall[5] = start, end
+
+def point_is_in_band(point,band):
+    angle, offset_min, offset_max, start, end = band
+    dx, dy = math.cos(angle), math.sin(angle)
+    t = point[0] * dx + point[1] * dy
+    offset = point[1] * dx - point[0] * dy
+    return (offset_min - TOLERANCE <= offset <= offset_max + TOLERANCE and
+            start - TOLERANCE <= t <= end + TOLERANCE)
+
+def find_wall_pairs(lines,min_thickness,max_thickness):
+    """
+    pairs parallel lines that are between min_thickness and max_thickness
+    apart and overlap. The lines are put in a spatial hash with a cell size
+    of max_thickness so each line is only compared with lines close to it.
+
+    The closest pairs are used first. Each pair only uses the part of its 
+    overlap that isn't used by a closer pair, so a line can be paired with 
+    more than one line. The parts of a line that aren't paired become walls 
+    without a thickness unless they are inside another paired wall, 
+    like the ends of the outside lines at a corner.
+
+    **Parameters:**
+
+    * **lines** (list) - Lines from merge_collinear_segments
+    * **min_thickness** (float)
+    * **max_thickness** (float)
+
+    **Returns:** list of (start, end, thickness) where start and end are the
+    x,y of the wall base line and the wall depth goes to the left of it
+    """
+    cell_size = max(max_thickness,TOLERANCE)
+    grid = {}
+    for index, line in enumerate(lines):
+        for cell in get_line_cells(line,cell_size):
+            grid.setdefault(cell,[]).append(index)
+
+    used = {index:[] for index in range(len(lines))}
+    paired_walls = []
+    for index, other_index, thickness, overlap_start, overlap_end in find_line_pairs(lines,grid,cell_size,min_thickness,max_thickness):
+        for start, end in subtract_intervals(overlap_start,overlap_end,used[index] + used[other_index]):
+            used[index].append((start,end))
+            used[other_index].append((start,end))
+            angle, offset = lines[index][:2]
+            paired_walls.append([index,other_index,angle,offset + thickness / 2,start,end])
+
+    extend_wall_ends(paired_walls,max_thickness)
+
+    walls = []
+    #LINE INDEX -> LIST OF (LINES OF THE WALL, AREA OF THE WALL)
+    line_bands = {}
+    for index, other_index, angle, center, start, end in paired_walls:
+        used[index].append((start,end))
+        used[other_index].append((start,end))
+        thickness = lines[other_index][1] - lines[index][1]
+        offset = center - thickness / 2
+        if thickness > 0:
+            walls.append(get_line_points((angle,offset,start,end)) + (thickness,))
+        else:
+            end_point, start_point = get_line_points((angle,offset,start,end))
+            walls.append((start_point,end_point,-thickness))
+        band = ((index,other_index),(angle,min(offset,offset + thickness),max(offset,offset + thickness),
+                                     min(start,lines[index][2],lines[other_index][2]),
+                                     max(end,lines[index][3],lines[other_index][3])))
+        line_bands.setdefault(index,[]).append(band)
+        line_bands.setdefault(other_index,[]).append(band)
+
+    for index, line in enumerate(lines):
+        angle, offset, line_start, line_end = line
+        for start, end in subtract_intervals(line_start,line_end,used[index]):
+            points = get_line_points((angle,offset,start,end))
+            near_lines = set()
+            for point in points:
+                cell = (int(math.floor(point[0] / cell_size)),int(math.floor(point[1] / cell_size)))
+                for x in (-1,0,1):
+                    for y in (-1,0,1):
+                        near_lines.update(grid.get((cell[0] + x,cell[1] + y),()))
+            if any(index not in band_lines and point_is_in_band(points[0],band) and point_is_in_band(points[1],band)
+                   for near_index in near_lines for band_lines, band in line_bands.get(near_index,())):
+                continue
+            walls.append(points + (None,))
+    return walls
+
+def read_segments(path,units='AUTO'):
+    """
+    reads the segments from a DXF or CSV file and scales them to meters.
+    AUTO uses the units saved in the DXF header and inches if there are none.
+
+    **Returns:** generator of ((x1,y1),(x2,y2))
+    """
+    scale = UNIT_SCALE.get(units,UNIT_SCALE['IN'])
+    if path.lower().endswith(".dxf"):
+        reader = read_dxf_segments(path)
+    else:
+        reader = read_csv_segments(path)
+    for segment in reader:
+        if segment[0] == 'UNITS':
+            if units == 'AUTO':
+                scale = DXF_UNITS.get(segment[1],scale)
+            continue
+        (x1, y1), (x2, y2) = segment
+        yield ((x1 * scale,y1 * scale),(x2 * scale,y2 * scale))
+
+def import_plan(context,path,units='AUTO',min_thickness=.05,max_thickness=.5):
+    """
+    creates walls from the segments in a DXF or CSV floor plan
+
+    **Parameters:**
+
+    * **context** (bpy.context)
+    * **path** (string)
+    * **units** (string, (optional)) - AUTO, IN, FT, MM, CM or M
+    * **min_thickness** (float, (optional)) - Thinnest wall in meters
+    * **max_thickness** (float, (optional)) - Thickest wall in meters
+
+    **Returns:** list of Assembly
+    """
+    from .room_designer import create_wall_assembly, get_roombuilder_props, get_number_of_walls
+
+    props = get_roombuilder_props(context)
+    lines = merge_collinear_segments(read_segments(path,units))
+    wall_lines = find_wall_pairs(lines,min_thickness,max_thickness)
+
+    first_number = get_number_of_walls() + 1
+    walls = []
+    lengths = []
+    depths = []
+    for index, (start, end, thickness) in enumerate(wall_lines):
+        wall = create_wall_assembly(props,(start[0],start[1],0),wall_number=first_number + index)
+        wall.obj_bp.rotation_euler.z = math.atan2(end[1] - start[1],end[0] - start[0])
+        if thickness is not None:
+            wall.obj_bp["USE_DEFAULT_DEPTH"] = False
+        walls.append(wall)
+        lengths.append(math.hypot(end[0] - start[0],end[1] - start[1]))
+        depths.append(props.wall_depth if thickness is None else thickness)
+
+    if walls:
+        AssemblyArray([wall.obj_bp for wall in walls]).set_dimensions(x=lengths,y=depths)
+    return walls
+
+class OPS_import_plan(bpy.types.Operator):
+    bl_idname = "room_builder.import_plan"
+    bl_label = "Import DXF/CSV Plan"
+    bl_description = "Creates walls from the lines in a DXF or CSV floor plan"
+    bl_options = {'UNDO'}
+
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob = bpy.props.StringProperty(default="*.dxf;*.csv",options={'HIDDEN'})
+
+    units = bpy.props.EnumProperty(name="Units",
+                                   items=[('AUTO',"Auto","Use the units saved in the DXF file, otherwise inches"),
+                                          ('IN',"Inches","Inches"),
+                                          ('FT',"Feet","Feet"),
+                                          ('MM',"Millimeters","Millimeters"),
+                                          ('CM',"Centimeters","Centimeters"),
+                                          ('M',"Meters","Meters")],
+                                   default='AUTO')
+
+    min_thickness = bpy.props.FloatProperty(name="Min Wall Thickness",default=.05,min=0,unit='LENGTH')
+    max_thickness = bpy.props.FloatProperty(name="Max Wall Thickness",default=.5,min=0,unit='LENGTH')
+
+    def execute(self,context):
+        try:
+            walls = import_plan(context,self.filepath,self.units,self.min_thickness,self.max_thickness)
+        except (OSError,ValueError) as error:
+            self.report({'ERROR'},str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'},"Created " + str(len(walls)) + " walls")
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+def register():
+    bpy.utils.register_class(OPS_import_plan)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_import_plan)
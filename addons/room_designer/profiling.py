@@ -0,0 +1,308 @@
+"""
+This module contains the opt-in timing instrumentation for the 
+room designer operators. 
+
+When profiling is turned on every modal event is timed and split into 
+ray cast, scene mutation and redraw time. The events are stored in a 
+ring buffer that can be dumped to a CSV file or viewed in the Room Designer panel.
+
+The bpy.ops counter counts and times every bpy.ops call made from this
+add-on grouped by the function that made the call. The counts are 
+printed to the console when a room designer operator finishes.
+
+"""
+
+import bpy
+import collections
+import cProfile
+import csv
+import io
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+EVENT_BUFFER_SIZE = 5000
+CSV_HEADER = ("Time","Operator","Event","Ray Cast (ms)","Mutation (ms)","Redraw (ms)","Total (ms)")
+PROFILE_FILENAME = "room_designer.prof"
+PACKAGE_NAME = __name__.rpartition(".")[0]
+
+events = collections.deque(maxlen=EVENT_BUFFER_SIZE)
+pending_redraw_time = {}
+session_profile = None
+
+#(CALLING FUNCTION, OPERATOR) -> [CALL COUNT, SECONDS]
+ops_calls = {}
+ops_original_call = None
+
+def is_enabled():
+    """ Returns True if the user turned on operator profiling
+    """
+    wm = bpy.context.window_manager
+    return hasattr(wm,'room_builder') and wm.room_builder.use_profiling
+
+class Event_Timer(object):
+    """
+    Times the steps of a single modal event.
+    Call lap after each step and finish before the modal function returns.
+    """
+    
+    def __init__(self,operator_name,event):
+        self.enabled = is_enabled()
+        if not self.enabled:
+            return
+        self.operator_name = operator_name
+        self.event_type = event.type
+        self.ray_cast = 0.0
+        self.mutation = 0.0
+        self.start = self.last = time.perf_counter()
+        
+    def lap(self,step):
+        """ Adds the time since the last lap to the step ('RAY_CAST' or 'MUTATION')
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if step == 'RAY_CAST':
+            self.ray_cast += now - self.last
+        else:
+            self.mutation += now - self.last
+        self.last = now
+        
+    def finish(self):
+        """ Stores the event in the ring buffer. The redraw time is the time 
+            spent in the operators draw callback since the last event.
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        redraw = pending_redraw_time.pop(self.operator_name,0.0)
+        total = time.perf_counter() - self.start + redraw
+        events.append((time.time(),self.operator_name,self.event_type,
+                       self.ray_cast,self.mutation,redraw,total))
+
+def timed_redraw(draw_function):
+    """ Decorator for operator draw callbacks that adds the draw time
+        to the next event recorded for the operator
+    """
+    def wrapper(self,context):
+        if not is_enabled():
+            return draw_function(self,context)
+        start = time.perf_counter()
+        result = draw_function(self,context)
+        name = self.bl_idname
+        pending_redraw_time[name] = pending_redraw_time.get(name,0.0) + time.perf_counter() - start
+        return result
+    return wrapper
+
+def clear_events():
+    events.clear()
+    pending_redraw_time.clear()
+
+def get_event_summary():
+    """ Returns: List of (Operator, Event Count, Ray Cast, Mutation, Redraw, Total)
+        The times are the mean of each step in milliseconds
+    """
+    totals = collections.OrderedDict()
+    for timestamp, operator_name, event_type, ray_cast, mutation, redraw, total in events:
+        if operator_name not in totals:
+            totals[operator_name] = [0,0.0,0.0,0.0,0.0]
+        row = totals[operator_name]
+        row[0] += 1
+        row[1] += ray_cast
+        row[2] += mutation
+        row[3] += redraw
+        row[4] += total
+    
+    summary = []
+    for operator_name, row in totals.items():
+        count = row[0]
+        summary.append((operator_name,count) + tuple(value / count * 1000 for value in row[1:]))
+    return summary
+
+def write_events_csv(path):
+    """ Writes the ring buffer to a CSV file
+    """
+    with open(path,'w',newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for timestamp, operator_name, event_type, ray_cast, mutation, redraw, total in events:
+            writer.writerow((time.strftime("%H:%M:%S",time.localtime(timestamp)) + ("%.3f" % (timestamp % 1))[1:],
+                             operator_name,event_type,
+                             round(ray_cast * 1000,3),round(mutation * 1000,3),
+                             round(redraw * 1000,3),round(total * 1000,3)))
+
+def start_session_profile():
+    """ Starts a cProfile session that runs until stop_session_profile is called
+    """
+    global session_profile
+    if session_profile is None:
+        session_profile = cProfile.Profile()
+        session_profile.enable()
+
+def stop_session_profile(path=None,line_count=30):
+    """ Stops the cProfile session, prints the slowest functions 
+        and saves the stats so they can be opened with pstats or snakeviz.
+        Returns the path the stats were saved to.
+    """
+    global session_profile
+    if session_profile is None:
+        return None
+    session_profile.disable()
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(),PROFILE_FILENAME)
+    session_profile.dump_stats(path)
+    stream = io.StringIO()
+    stats = pstats.Stats(session_profile,stream=stream)
+    stats.sort_stats('cumulative').print_stats(line_count)
+    print(stream.getvalue())
+    print("PROFILE SAVED TO: " + path)
+    session_profile = None
+    return path
+
+def get_ops_call_class():
+    """ Returns the class blender uses for bpy.ops.module.operator objects
+    """
+    ops_module = sys.modules.get("bpy.ops")
+    for name in ("BPyOpsSubModOp","_BPyOpsSubModOp"):
+        if hasattr(ops_module,name):
+            return getattr(ops_module,name)
+
+def get_ops_name(op):
+    if hasattr(op,'idname_py'):
+        return op.idname_py()
+    return str(op)
+
+def start_counting_ops():
+    """ Wraps bpy.ops calls so every call made from this add-on is counted and timed
+    """
+    global ops_original_call
+    ops_class = get_ops_call_class()
+    if ops_class is None or ops_original_call is not None:
+        return
+    ops_original_call = ops_class.__call__
+    original_call = ops_original_call
+    
+    def counted_call(op,*args,**kwargs):
+        frame = sys._getframe(1)
+        module_name = frame.f_globals.get("__name__","")
+        if not module_name.startswith(PACKAGE_NAME):
+            return original_call(op,*args,**kwargs)
+        caller = module_name.rpartition(".")[2] + "." + frame.f_code.co_name
+        start = time.perf_counter()
+        try:
+            return original_call(op,*args,**kwargs)
+        finally:
+            key = (caller,get_ops_name(op))
+            if key not in ops_calls:
+                ops_calls[key] = [0,0.0]
+            ops_calls[key][0] += 1
+            ops_calls[key][1] += time.perf_counter() - start
+    
+    ops_class.__call__ = counted_call
+
+def stop_counting_ops():
+    """ Removes the bpy.ops wrapper and clears the counts
+    """
+    global ops_original_call
+    ops_class = get_ops_call_class()
+    if ops_class is not None and ops_original_call is not None:
+        ops_class.__call__ = ops_original_call
+    ops_original_call = None
+    ops_calls.clear()
+
+def get_ops_call_report():
+    """ Returns: List of (Calling Function, Operator, Count, Total ms)
+        Sorted by the total time so the busiest calls are first
+    """
+    report = [(caller,op_name,count,seconds * 1000) for (caller,op_name), (count,seconds) in ops_calls.items()]
+    report.sort(key=lambda row: row[3],reverse=True)
+    return report
+
+def report_ops_calls(operator_name):
+    """ Prints the bpy.ops calls made while the operator was running 
+        and clears the counts for the next operator
+    """
+    if ops_original_call is None or len(ops_calls) == 0:
+        return
+    print("BPY.OPS CALLS MADE BY " + operator_name)
+    print("%-45s %-35s %8s %12s" % ("Function","Operator","Calls","Total (ms)"))
+    for caller, op_name, count, milliseconds in get_ops_call_report():
+        print("%-45s %-35s %8d %12.3f" % (caller,op_name,count,milliseconds))
+    ops_calls.clear()
+
+def update_use_ops_counter(self,context):
+    if self.use_ops_counter:
+        start_counting_ops()
+    else:
+        stop_counting_ops()
+
+def update_use_cprofile(self,context):
+    if self.use_cprofile:
+        start_session_profile()
+    else:
+        stop_session_profile()
+
+def draw_profiling_options(layout,context):
+    wm_props = context.window_manager.room_builder
+    box = layout.box()
+    row = box.row(align=True)
+    row.label("Diagnostics:",icon='TIME')
+    row.prop(wm_props,'use_profiling',text="Time Events")
+    row.prop(wm_props,'use_cprofile',text="cProfile")
+    row.prop(wm_props,'use_ops_counter',text="Count bpy.ops")
+    if not wm_props.use_profiling:
+        return
+    
+    col = box.column(align=True)
+    row = col.row()
+    for label in ("Operator","Events","Ray","Mutate","Redraw","Total"):
+        row.label(label)
+    for operator_name, count, ray_cast, mutation, redraw, total in get_event_summary():
+        row = col.row()
+        row.label(operator_name.split(".")[-1])
+        row.label(str(count))
+        for value in (ray_cast,mutation,redraw,total):
+            row.label(str(round(value,2)))
+    row = box.row(align=True)
+    row.operator('room_builder.dump_profile_data',text="Save CSV",icon='FILE_TEXT')
+    row.operator('room_builder.clear_profile_data',text="Clear",icon='X')
+
+class OPS_dump_profile_data(bpy.types.Operator):
+    bl_idname = "room_builder.dump_profile_data"
+    bl_label = "Save Profile Data"
+    bl_description = "Saves the timed operator events to a CSV file"
+    
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+    filename_ext = ".csv"
+    
+    def execute(self,context):
+        path = bpy.path.ensure_ext(self.filepath,self.filename_ext)
+        write_events_csv(path)
+        self.report({'INFO'},"Saved " + str(len(events)) + " events to " + path)
+        return {'FINISHED'}
+    
+    def invoke(self,context,event):
+        if not self.filepath:
+            self.filepath = "room_designer_events.csv"
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class OPS_clear_profile_data(bpy.types.Operator):
+    bl_idname = "room_builder.clear_profile_data"
+    bl_label = "Clear Profile Data"
+    bl_description = "Clears the timed operator events"
+    
+    def execute(self,context):
+        clear_events()
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(OPS_dump_profile_data)
+    bpy.utils.register_class(OPS_clear_profile_data)
+
+def unregister():
+    stop_counting_ops()
+    bpy.utils.unregister_class(OPS_dump_profile_data)
+    bpy.utils.unregister_class(OPS_clear_profile_data)
@@ -0,0 +1,240 @@
+"""
+This module builds the material takeoff for a job.
+
+Every part in the scene is visited once and the thickness of each part
+is only looked up once. The totals for each material are kept in a 
+dictionary and written to a CSV or JSON file.
+
+    CUTPART - Count and area for each material name
+    EDGEBANDING - Count and length for each edgebanding name
+    SOLIDSTOCK - Count and length for each solid stock name
+    BUYOUT - Count for each buyout name. Assemblies that are marked as
+             buyout are counted as one part.
+
+Hidden parts are usually parts that are turned off by a prompt so they are
+not counted unless include_hidden is set. The number of hidden parts of each
+material is always written in the Hidden column so nothing is left out
+without it showing in the file.
+
+Parts are never left out of the takeoff. Cutparts and edgebanding that 
+don't have a thickness are totaled in an Unknown Thickness row and parts
+that don't have a material name are totaled in an Unknown Material row.
+
+The python driver report lists the drivers in every assembly that still
+need python to evaluate. The full list is written to a text datablock.
+
+"""
+
+import bpy
+import collections
+import csv
+import json
+import math
+from . import utils
+
+PART_TYPES = ('CUTPART','EDGEBANDING','SOLIDSTOCK','BUYOUT')
+PYTHON_DRIVER_TEXT = "Python Drivers"
+CSV_HEADER = ("Type","Material","Count","Area","Length","Thickness","Hidden")
+UNKNOWN_THICKNESS = "Unknown Thickness"
+UNKNOWN_MATERIAL = "Unknown Material"
+UNKNOWN_NAMES = {UNKNOWN_THICKNESS,UNKNOWN_MATERIAL}
+
+class Takeoff_Row(object):
+    """
+    The totals for one material
+    """
+
+    __slots__ = ('part_type','material_name','count','area','length','thickness','hidden_count')
+
+    def __init__(self,part_type,material_name,thickness):
+        self.part_type = part_type
+        self.material_name = material_name
+        self.count = 0
+        self.hidden_count = 0
+        self.area = 0.0
+        self.length = 0.0
+        self.thickness = thickness
+
+    def to_tuple(self):
+        return (self.part_type,self.material_name,self.count,
+                round(self.area,6),round(self.length,6),
+                round(self.thickness,6) if self.thickness is not None else "",
+                self.hidden_count)
+
+def is_part_hidden(obj):
+    """ Returns True if the part is hidden. Assembly base points are always 
+        hidden so a buyout assembly is hidden when all of its meshes are hidden.
+    """
+    if obj.type == 'MESH':
+        return obj.hide
+    meshes = [child for child in utils.get_child_objects(obj) if child.type == 'MESH']
+    return len(meshes) > 0 and all(child.hide for child in meshes)
+
+def build_takeoff(scene,part_callback=None,include_hidden=False):
+    """
+    walks the scene once and totals the parts by material
+
+    **Parameters:**
+
+    * **scene** (bpy.types.Scene)
+    * **part_callback** (function, (optional)) - Called with (obj, part type, material name, thickness)
+      for every part so the parts can be written out while the scene is walked
+    * **include_hidden** (boolean, (optional)) - Count the hidden parts in the totals.
+      Hidden parts are always counted in the hidden column of their material.
+
+    **Returns:** list of Takeoff_Row sorted by part type and material name
+    """
+    rows = collections.OrderedDict()
+
+    for obj in scene.objects:
+        part_type = obj.cabinetlib.type_mesh
+        if part_type not in PART_TYPES:
+            continue
+        if obj.type != 'MESH' and not (part_type == 'BUYOUT' and obj.mv.type == 'BPASSEMBLY'):
+            continue
+
+        thickness = None
+        if part_type in {'CUTPART','EDGEBANDING'} and obj.mv.cutpart_material_name != "":
+            material_name = obj.mv.cutpart_material_name
+        elif part_type in {'CUTPART','EDGEBANDING'}:
+            thickness = utils.get_part_thickness(obj)
+            material_name = utils.get_material_name(obj,thickness) if thickness is not None else UNKNOWN_THICKNESS
+        else:
+            material_name = utils.get_material_name(obj)
+        if not material_name:
+            material_name = UNKNOWN_MATERIAL
+
+        key = (part_type,material_name)
+        if key not in rows:
+            rows[key] = Takeoff_Row(part_type,material_name,thickness)
+        row = rows[key]
+        if is_part_hidden(obj):
+            row.hidden_count += 1
+            if not include_hidden:
+                continue
+        row.count += 1
+        dimensions = obj.dimensions
+        if part_type == 'CUTPART':
+            row.area += math.fabs(dimensions.x * dimensions.y)
+        elif part_type in {'EDGEBANDING','SOLIDSTOCK'}:
+            row.length += math.fabs(dimensions.x)
+
+        if part_callback:
+            part_callback(obj,part_type,material_name,thickness)
+
+    return [rows[key] for key in sorted(rows)]
+
+def write_takeoff_csv(rows,path,include_hidden=False):
+    with open(path,'w',newline='') as file:
+        writer = csv.writer(file)
+        header = list(CSV_HEADER)
+        header[-1] = "Hidden (Counted)" if include_hidden else "Hidden (Not Counted)"
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row.to_tuple())
+
+def write_takeoff_json(rows,path,include_hidden=False):
+    """ Writes one row at a time so large takeoffs aren't built up in one string
+    """
+    with open(path,'w') as file:
+        file.write('{"include_hidden":' + json.dumps(include_hidden) + ',"columns":' + json.dumps([name.lower() for name in CSV_HEADER]) + ',"rows":[\n')
+        for index, row in enumerate(rows):
+            if index > 0:
+                file.write(",\n")
+            file.write(json.dumps(row.to_tuple()))
+        file.write("\n]}\n")
+
+class OPS_takeoff_report(bpy.types.Operator):
+    bl_idname = "room_builder.takeoff_report"
+    bl_label = "Material Takeoff Report"
+    bl_description = "Saves the totals of every cutpart, edgebanding, solid stock and buyout material to a CSV or JSON file"
+
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob = bpy.props.StringProperty(default="*.csv;*.json",options={'HIDDEN'})
+    include_hidden = bpy.props.BoolProperty(name="Include Hidden Parts",description="Count the hidden parts in the totals",default=False)
+
+    @classmethod
+    def poll(cls,context):
+        return hasattr(context.scene,'mv')
+
+    def execute(self,context):
+        rows = build_takeoff(context.scene,include_hidden=self.include_hidden)
+        if self.filepath.lower().endswith(".json"):
+            write_takeoff_json(rows,self.filepath,self.include_hidden)
+        else:
+            self.filepath = bpy.path.ensure_ext(self.filepath,".csv")
+            write_takeoff_csv(rows,self.filepath,self.include_hidden)
+        unknown = sum(row.count + row.hidden_count for row in rows if row.material_name in UNKNOWN_NAMES)
+        if unknown:
+            self.report({'WARNING'},"Saved " + str(len(rows)) + " materials to " + self.filepath + ". " + str(unknown) + " parts have an unknown thickness or material.")
+        else:
+            self.report({'INFO'},"Saved " + str(len(rows)) + " materials to " + self.filepath)
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        if not self.filepath:
+            self.filepath = "takeoff.csv"
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class OPS_python_driver_report(bpy.types.Operator):
+    bl_idname = "room_builder.python_driver_report"
+    bl_label = "Python Driver Report"
+    bl_description = "Lists the drivers in every assembly that still need python to evaluate"
+
+    #ASSEMBLY NAME, TOTAL DRIVERS, PYTHON DRIVERS, PYTHON EXPRESSIONS
+    rows = []
+
+    @classmethod
+    def poll(cls,context):
+        return hasattr(context.scene,'mv')
+
+    def get_rows(self,context):
+        report = {}
+        for obj in context.scene.objects:
+            if obj.mv.type == 'BPASSEMBLY' and (obj.parent is None or obj.parent.mv.type != 'BPASSEMBLY'):
+                utils.get_python_driver_report(obj,report)
+        rows = []
+        for name, (total, python, expressions) in sorted(report.items()):
+            if python > 0:
+                rows.append((name,total,python,expressions))
+        return rows
+
+    def write_text(self,rows):
+        """ Writes every expression that needs python to a text datablock
+        """
+        text = bpy.data.texts.get(PYTHON_DRIVER_TEXT) or bpy.data.texts.new(PYTHON_DRIVER_TEXT)
+        text.clear()
+        for name, total, python, expressions in rows:
+            text.write(name + ": " + str(python) + " of " + str(total) + " drivers need python\n")
+            for expression in expressions:
+                text.write("    " + expression + "\n")
+
+    def execute(self,context):
+        return {'FINISHED'}
+
+    def invoke(self,context,event):
+        self.rows = self.get_rows(context)
+        if not self.rows:
+            self.report({'INFO'},"Every driver can be evaluated without python")
+            return {'FINISHED'}
+        self.write_text(self.rows)
+        python = sum(row[2] for row in self.rows)
+        self.report({'WARNING'},str(python) + " drivers in " + str(len(self.rows)) + " assemblies need python. See the " + PYTHON_DRIVER_TEXT + " text for details.")
+        return context.window_manager.invoke_props_dialog(self,width=500)
+
+    def draw(self,context):
+        layout = self.layout
+        box = layout.box()
+        for name, total, python, expressions in self.rows:
+            row = box.row()
+            row.label(name + ": " + str(python) + " of " + str(total))
+            row.label(expressions[0])
+
+def register():
+    bpy.utils.register_class(OPS_takeoff_report)
+    bpy.utils.register_class(OPS_python_driver_report)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_takeoff_report)
+    bpy.utils.unregister_class(OPS_python_driver_report)
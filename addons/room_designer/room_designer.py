@@ -2,8 +2,8 @@ import bpy
 import bmesh
 import math
 import os
-from . import unit, utils
-from .assembly import Assembly
+from . import unit, utils, profiling, snapping, rooms, wall_layout, visibility, floor_plan, plan_import, reports, thumbnails, library_builder, library_packer
+from .assembly import Assembly, AssemblyArray, clear_assembly_caches
 from bpy_extras import view3d_utils
 from .opengl import TextBox, Dimension
 
@@ -17,9 +17,88 @@ PROPERTY STRINGS
 """
 ISWALL = "ISWALL"
 ISROOMMESH = "ISROOMMESH"
+USE_DEFAULT_HEIGHT = "USE_DEFAULT_HEIGHT"
+USE_DEFAULT_DEPTH = "USE_DEFAULT_DEPTH"
+
+#WALLS SHORTER THAN THIS ARE NOT PLACED
+MIN_WALL_LENGTH = .001
+
+"""
+KEYS THAT CAN BE TYPED TO SET THE WALL LENGTH
+"""
+TYPED_KEYS = {'ONE':"1",'NUMPAD_1':"1",
+              'TWO':"2",'NUMPAD_2':"2",
+              'THREE':"3",'NUMPAD_3':"3",
+              'FOUR':"4",'NUMPAD_4':"4",
+              'FIVE':"5",'NUMPAD_5':"5",
+              'SIX':"6",'NUMPAD_6':"6",
+              'SEVEN':"7",'NUMPAD_7':"7",
+              'EIGHT':"8",'NUMPAD_8':"8",
+              'NINE':"9",'NUMPAD_9':"9",
+              'ZERO':"0",'NUMPAD_0':"0",
+              'QUOTE':"'",
+              'SLASH':"/",'NUMPAD_SLASH':"/",
+              'MINUS':"-",'NUMPAD_MINUS':"-",
+              'NUMPAD_PLUS':"+",
+              'NUMPAD_ASTERIX':"*",
+              'SPACE':" ",
+              'M':"m",
+              'C':"c"}
+SHIFT_TYPED_KEYS = {'QUOTE':'"',
+                    'EIGHT':"*",
+                    'EQUAL':"+",
+                    'NINE':"(",
+                    'ZERO':")"}
+
+"""
+ANGLE INCREMENTS THAT WALLS CAN BE DRAWN AT. TYPE A WHILE DRAWING TO CYCLE THROUGH THEM
+"""
+ANGLE_INCREMENTS = ('90','45','30','15','5')
+
+#INCREMENT -> (ANGLES, COS, SIN)
+angle_tables = {}
 
 preview_collections = {} 
 
+def get_angle_table(increment):
+    """ 
+    returns the allowed wall angles for an angle increment with their 
+    sine and cosine. The tables are only calculated once for each increment.
+    
+    **Parameters:**
+    
+    * **increment** (string) - Angle increment in degrees (ex. '45')
+    
+    **Returns:** (tuple of angles in radians, tuple of cos, tuple of sin)
+    """
+    if increment not in angle_tables:
+        step = int(increment)
+        angles = []
+        for degrees in range(0,360,step):
+            if degrees > 180:
+                degrees -= 360
+            angles.append(math.radians(degrees))
+        angle_tables[increment] = (tuple(angles),
+                                   tuple(math.cos(angle) for angle in angles),
+                                   tuple(math.sin(angle) for angle in angles))
+    return angle_tables[increment]
+
+def get_wall_angle(x,y,increment):
+    """ 
+    snaps a direction to the closest allowed wall angle
+    
+    **Parameters:**
+    
+    * **x** (float) - X distance from the start of the wall
+    * **y** (float) - Y distance from the start of the wall
+    * **increment** (string) - Angle increment in degrees (ex. '45')
+    
+    **Returns:** (angle in radians, length of x,y projected onto the angle)
+    """
+    angles, cos_table, sin_table = get_angle_table(increment)
+    index = int(round(math.atan2(y,x) / angles[1])) % len(angles)
+    return angles[index], x * cos_table[index] + y * sin_table[index]
+
 def get_roombuilder_props(context):
     """ 
     returns the room builder scene props
@@ -268,23 +347,61 @@ def update_show_wall_names(self,context):
             obj.show_name = self.show_wall_names
 
 def update_show_wall_empties(self,context):
-    for obj in bpy.data.objects:
-        if "ISWALL" in obj:
-            if obj.parent:
-                if "ISBP" in obj.parent:
-                    obj.parent.hide = not self.show_wall_obj_bp
-                for child in obj.parent.children:
-                    if "ISXDIM" in child:
-                        child.hide = not self.show_wall_obj_x
-                    if "ISYDIM" in child:
-                        child.hide = not self.show_wall_obj_y
-                    if "ISZDIM" in child:
-                        child.hide = not self.show_wall_obj_z
+    visibility.request_update()
+
+#WALL BASE POINTS IN THE SCENE. THEY ARE ONLY FOUND AGAIN WHEN OBJECTS ARE ADDED OR REMOVED
+scene_wall_bps = []
+scene_wall_bps_scene_name = ""
+scene_wall_bps_object_count = -1
+
+def get_wall_bps(context):
+    """ 
+    returns the base points of every wall in the scene
+    
+    **Parameters:**
+    
+    * **context** (bpy.context)
+    
+    **Returns:** list of bpy.types.Object
+    """
+    global scene_wall_bps, scene_wall_bps_scene_name, scene_wall_bps_object_count
+    if scene_wall_bps_scene_name == context.scene.name and scene_wall_bps_object_count == len(bpy.data.objects):
+        try:
+            #A REMOVED OBJECT RAISES A REFERENCE ERROR
+            if all(obj_bp.name for obj_bp in scene_wall_bps):
+                return scene_wall_bps
+        except ReferenceError:
+            pass
+    scene_wall_bps = [obj.parent for obj in context.scene.objects if ISWALL in obj and obj.parent]
+    scene_wall_bps_scene_name = context.scene.name
+    scene_wall_bps_object_count = len(bpy.data.objects)
+    return scene_wall_bps
+
+def set_default_wall_dimension(context,flag,y=None,z=None):
+    """ 
+    sets the depth or height of every wall that uses the default in one batched write
+    
+    **Parameters:**
+    
+    * **context** (bpy.context)
+    * **flag** (string) - USE_DEFAULT_HEIGHT or USE_DEFAULT_DEPTH
+    * **y** (float, (optional)) - Wall depth
+    * **z** (float, (optional)) - Wall height
+    """
+    wall_bps = get_wall_bps(context)
+    mask = [obj_bp.get(flag,False) for obj_bp in wall_bps]
+    if any(mask):
+        AssemblyArray(wall_bps).set_dimensions(y=y,z=z,mask=mask)
+
+def update_wall_height(self,context):
+    set_default_wall_dimension(context,USE_DEFAULT_HEIGHT,z=self.wall_height)
+
+def update_wall_depth(self,context):
+    set_default_wall_dimension(context,USE_DEFAULT_DEPTH,y=self.wall_depth)
 
 def get_selection_point(context, event, ray_max=10000.0,objects=None,floor=None):
     """Gets the point to place an object based on selection"""
     # get the context arguments
-    scene = context.scene
     region = context.region
     rv3d = context.region_data
     coord = event.mouse_region_x, event.mouse_region_y
@@ -293,6 +410,25 @@ def get_selection_point(context, event, ray_max=10000.0,objects=None,floor=None)
     view_vector = view3d_utils.region_2d_to_vector_3d(region, rv3d, coord)
     ray_origin = view3d_utils.region_2d_to_origin_3d(region, rv3d, coord)
     ray_target = ray_origin + view_vector
+    
+    return get_ray_hit(context, ray_origin, ray_target, ray_max, objects, floor)
+    
+def get_ray_hit(context, ray_origin, ray_target, ray_max=10000.0,objects=None,floor=None):
+    """ 
+    casts a ray through the visible objects and returns the closest hit
+    
+    **Parameters:**
+    
+    * **context** (bpy.context)
+    * **ray_origin** (mathutils.Vector) - Start of the ray in world space
+    * **ray_target** (mathutils.Vector) - Point on the ray in world space
+    * **ray_max** (float, (optional)) - Max distance of the ray
+    * **objects** (list of bpy.types.Object, (optional)) - Only cast against these objects
+    * **floor** (bpy.types.Object, (optional)) - Always cast against this object
+    
+    **Returns:** (mathutils.Vector, bpy.types.Object)
+    """
+    scene = context.scene
  
     def visible_objects_and_duplis():
         """Loop over (object, matrix) pairs (mesh only)"""
@@ -357,6 +493,86 @@ def get_selection_point(context, event, ray_max=10000.0,objects=None,floor=None)
                         best_obj = obj
                         
     return best_hit, best_obj    
+
+def get_number_of_walls():
+    """ 
+    returns the number of walls in the file
+    
+    **Returns:** int
+    """
+    number = 0
+    for obj in bpy.data.objects:
+        if ISWALL in obj:
+            number += 1
+    return number
+
+def create_wall_assembly(props,starting_point=(0,0,0),previous_wall=None,wall_number=None,name="",mesh_name=""):
+    """ 
+    creates a wall assembly using the room builder settings. 
+    If a previous wall is passed in the new wall is connected to the end of it.
+    
+    **Parameters:**
+    
+    * **props** (PROPS_Room_Builder) - Room builder scene props
+    * **starting_point** (tuple(float,float,float), (optional)) - Location of the wall base point
+    * **previous_wall** (Assembly, (optional)) - Wall to connect the new wall to
+    * **wall_number** (int, (optional)) - Number used for the wall name
+    * **name** (string, (optional)) - Name of the wall base point. The wall number is used if this is empty.
+    * **mesh_name** (string, (optional)) - Name of the wall mesh. The wall number is used if this is empty.
+    
+    **Returns:** Assembly
+    """
+    if wall_number is None:
+        wall_number = get_number_of_walls() + 1
+    
+    wall = Assembly()
+    wall.create_assembly()
+    obj_mesh = wall.add_mesh("wall")
+    obj_mesh[ISWALL] = True
+    obj_mesh.draw_type = 'WIRE'
+    obj_mesh.lock_location = (True,True,True)
+    obj_mesh.show_name = props.show_wall_names
+    wall.obj_bp.name = name or "BPWALL " + str(wall_number)
+    obj_mesh.name = mesh_name or "Wall " + str(wall_number)
+    wall.obj_bp.location = starting_point
+    wall.obj_bp[USE_DEFAULT_HEIGHT] = True
+    wall.obj_bp[USE_DEFAULT_DEPTH] = True
+    wall.obj_z.location.z = props.wall_height
+    wall.obj_y.location.y = props.wall_depth
+    wall.obj_bp.hide = not props.show_wall_obj_bp
+    wall.obj_x.hide = not props.show_wall_obj_x
+    wall.obj_y.hide = not props.show_wall_obj_y
+    wall.obj_z.hide = not props.show_wall_obj_z
+    
+    if previous_wall:
+        if props.use_baked_layout:
+            wall.obj_bp[wall_layout.LAYOUT_PREVIOUS] = previous_wall.obj_bp.name
+            wall_layout.invalidate_layout_cache()
+        else:
+            wall_layout.connect_wall(wall.obj_bp,previous_wall.obj_x)
+    
+    return wall
+
+def get_wall_dimension_objects(context):
+    """ 
+    collects the objects needed to draw the wall dimensions
+    
+    **Parameters:**
+    
+    * **context** (bpy.context)
+    
+    **Returns:** list of (wall base point, wall x dimension)
+    """
+    dim_objects = []
+    for obj in context.visible_objects:
+        if ISWALL in obj:
+            bp = obj.parent
+            x = None
+            for child in bp.children:
+                if "ISXDIM" in child:
+                    x = child
+            dim_objects.append((bp,x))
+    return dim_objects
     
 def draw_wall_dimensions(self,context):
     context = bpy.context
@@ -365,18 +581,7 @@ def draw_wall_dimensions(self,context):
     scene = context.scene    
     
     if context.scene.room_builder.show_wall_dimensions:
-        walls = []
-        for obj in context.visible_objects:
-            if ISWALL in obj:
-                walls.append(obj)
-                 
-        for wall in walls:
-            bp = wall.parent
-            x = None
-            for child in bp.children:
-                if "ISXDIM" in child:
-                    x = child
-            
+        for bp, x in get_wall_dimension_objects(context):
             wall_dim = Dimension(region,rv3d)
             wall_dim.draw(bp,x)
     
@@ -384,10 +589,28 @@ class WMPROPS_Room_Builder(bpy.types.PropertyGroup):
     
     show_wall_dimensions = bpy.props.BoolProperty(name="Show Wall Dimensions",default=True) 
     
+    use_profiling = bpy.props.BoolProperty(name="Use Profiling",
+                                           description="Time every modal event of the room designer operators",
+                                           default=False)
+    
+    use_cprofile = bpy.props.BoolProperty(name="Use cProfile",
+                                          description="Profile everything until this is turned off and print the results to the console",
+                                          default=False,
+                                          update=profiling.update_use_cprofile)
+    
+    use_ops_counter = bpy.props.BoolProperty(name="Count bpy.ops Calls",
+                                             description="Count and time the bpy.ops calls made by the room designer and print them when an operator finishes",
+                                             default=False,
+                                             update=profiling.update_use_ops_counter)
+    
 class PROPS_Room_Builder(bpy.types.PropertyGroup):
     
-    wall_height = bpy.props.FloatProperty(name="Wall Height",default=unit.inch(108),unit='LENGTH')
-    wall_depth = bpy.props.FloatProperty(name="Wall Depth",default=unit.inch(6),unit='LENGTH')
+    wall_height = bpy.props.FloatProperty(name="Wall Height",default=unit.inch(108),unit='LENGTH',update=update_wall_height)
+    
+    wall_angle_increment = bpy.props.EnumProperty(name="Wall Angle Increment",
+                                                  items=[(increment,increment + "\u00b0","Draw walls in " + increment + " degree increments") for increment in ANGLE_INCREMENTS],
+                                                  default='90')
+    wall_depth = bpy.props.FloatProperty(name="Wall Depth",default=unit.inch(6),unit='LENGTH',update=update_wall_depth)
     
     show_wall_dimensions = bpy.props.BoolProperty(name="Show Wall Dimensions",default=True)
     
@@ -403,6 +626,20 @@ class PROPS_Room_Builder(bpy.types.PropertyGroup):
     show_wall_obj_y = bpy.props.BoolProperty(name="Show Wall Y Object",default=False,update=update_show_wall_empties)
     show_wall_obj_z = bpy.props.BoolProperty(name="Show Wall Z Object",default=False,update=update_show_wall_empties)
     
+    use_snapping = bpy.props.BoolProperty(name="Use Snapping",description="Snap walls to other walls and the grid while drawing",default=True)
+    snap_to_endpoints = bpy.props.BoolProperty(name="Snap to Endpoints",default=True)
+    snap_to_midpoints = bpy.props.BoolProperty(name="Snap to Midpoints",default=False)
+    snap_to_grid = bpy.props.BoolProperty(name="Snap to Grid",default=False)
+    snap_distance = bpy.props.FloatProperty(name="Snap Distance",default=unit.inch(6),min=0,unit='LENGTH')
+    grid_size = bpy.props.FloatProperty(name="Grid Size",default=unit.inch(1),min=0,unit='LENGTH')
+    
+    use_baked_layout = bpy.props.BoolProperty(name="Bake Wall Layout",
+                                              description="Solve the location of connected walls in one pass instead of using a chain of constraints",
+                                              default=False,
+                                              update=wall_layout.update_use_baked_layout)
+    
+    auto_build_rooms = bpy.props.BoolProperty(name="Auto Build Rooms",description="Create a floor and ceiling when a loop of walls is closed",default=True)
+    
     test_object = bpy.props.PointerProperty(name="Wall Depth",type=bpy.types.Object)
     
     #------ENUM ENTRY DOOR LIBRARY PROPS
@@ -479,6 +716,20 @@ class PANEL_Room_Builder_Library(bpy.types.Panel):
         row.scale_y = 1.2   
         row.operator("room_builder.draw_wall",text="Draw Walls",icon='GREASEPENCIL')            
         row.operator("room_builder.draw_mesh",text="Draw Plane",icon='MESH_PLANE')            
+        row = box.row(align=True)
+        row.operator("room_builder.build_rooms",text="Build Floors and Ceilings",icon='MESH_GRID')
+        row = box.row(align=True)
+        row.operator("room_builder.import_floor_plan",text="Import Floor Plan",icon='IMPORT')
+        row.operator("room_builder.export_floor_plan",text="Export Floor Plan",icon='EXPORT')
+        row = box.row(align=True)
+        row.operator("room_builder.import_plan",text="Import DXF/CSV Plan",icon='IMPORT')
+        row.operator("room_builder.takeoff_report",text="Takeoff Report",icon='FILE_TEXT')
+        row.operator("room_builder.python_driver_report",text="Python Driver Report",icon='SCRIPT')
+        row = box.row(align=True)
+        row.operator("room_builder.render_thumbnails",text="Render Library Thumbnails",icon='RENDER_STILL')
+        row.operator("room_builder.save_library",text="Save Product Library",icon='FILE_TICK')
+        row = box.row(align=True)
+        row.operator("room_builder.pack_library",text="Pack Library",icon='PACKAGE')
         
         box = layout.box()
         row = box.row(align=True)
@@ -488,6 +739,8 @@ class PANEL_Room_Builder_Library(bpy.types.Panel):
         row.scale_y = 1.2
         row.operator('blender_design.temp_operator',text="Place Spot Lamp",icon='LAMP_SPOT')
         row.operator('room_builder.place_area_lamp',text="Place Area Lamp",icon='LAMP_AREA')
+        
+        profiling.draw_profiling_options(layout,context)
     
     def draw_library(self,context,layout,rm_props):
         box = layout.box()
@@ -588,8 +841,12 @@ class OPS_draw_walls(bpy.types.Operator):
     mouse_y = 0    
     
     typed_value = ""
+    parsed_text = ""
+    parsed_length = None
+    typed_error = ""
     
     starting_point = (0,0,0)
+    wall_start = (0,0,0)
     header_text = "(Esc, Right Click) = Cancel Command  :  (Left Click) = Place Wall  :  (Ctrl) = Disconnect/Move Wall"
     
     props = None
@@ -600,50 +857,25 @@ class OPS_draw_walls(bpy.types.Operator):
     
     ray_obj_list = []
     
+    snap_index = None
+    snap_kind = None
+    
     def cancel_drop(self,context,event):
         utils.delete_object_and_children(self.wall.obj_bp)
         context.window.cursor_set('DEFAULT')
         utils.delete_obj_list([self.drawing_plane])
         context.space_data.draw_handler_remove(self._draw_handle, 'WINDOW')
+        profiling.report_ops_calls(self.bl_idname)
         return {'FINISHED'}
         
     def __del__(self):
         bpy.context.area.header_text_set()
         
     def number_of_walls(self):
-        number = 0
-        for obj in bpy.data.objects:
-            if ISWALL in obj:
-                number += 1
-        return number
+        return get_number_of_walls()
 
     def create_wall(self):
-        
-        number_of_walls = self.number_of_walls()
-        
-        self.wall = Assembly()
-        self.wall.create_assembly()
-        obj_mesh = self.wall.add_mesh("wall")
-        obj_mesh[ISWALL] = True
-        obj_mesh.draw_type = 'WIRE'
-        obj_mesh.lock_location = (True,True,True)
-        obj_mesh.show_name = self.props.show_wall_names
-        self.wall.obj_bp.name = "BPWALL " + str(number_of_walls + 1)
-        obj_mesh.name = "Wall " + str(number_of_walls + 1)
-        self.wall.obj_bp.location = self.starting_point
-        self.wall.obj_z.location.z = self.props.wall_height
-        self.wall.obj_y.location.y = self.props.wall_depth
-        self.wall.obj_bp.hide = not self.props.show_wall_obj_bp
-        self.wall.obj_x.hide = not self.props.show_wall_obj_x
-        self.wall.obj_y.hide = not self.props.show_wall_obj_y
-        self.wall.obj_z.hide = not self.props.show_wall_obj_z
-        
-        if self.previous_wall:
-            constraint = self.wall.obj_bp.constraints.new('COPY_LOCATION')
-            constraint.target = self.previous_wall.obj_x
-            constraint.use_x = True
-            constraint.use_y = True
-            constraint.use_z = True
+        self.wall = create_wall_assembly(self.props,self.starting_point,self.previous_wall)
 
     def position_wall_base_point(self,p):
         x = p[0] - self.starting_point[0]
@@ -653,6 +885,26 @@ class OPS_draw_walls(bpy.types.Operator):
         self.wall.obj_y.location.y = 0   
         self.wall.obj_z.location.z = 0    
         
+    def get_typed_length(self):
+        """ 
+        returns the typed length in meters. The typed value is only parsed 
+        when it changes. If the typed value is not a valid length 
+        (ex. 10'6 1/) the error is stored in typed_error and None is returned
+        so the wall can't be placed with an old length.
+        
+        **Returns:** float or None if no valid length has been typed
+        """
+        if self.typed_value != self.parsed_text:
+            self.parsed_text = self.typed_value
+            self.parsed_length = None
+            self.typed_error = ""
+            if self.typed_value.strip() != "":
+                try:
+                    self.parsed_length = unit.parse_length(self.typed_value,bpy.context.scene.unit_settings.system)
+                except ValueError as error:
+                    self.typed_error = str(error)
+        return self.parsed_length
+        
     def position_wall_length(self,p):
         
         x = p[0] - self.starting_point[0]
@@ -662,57 +914,33 @@ class OPS_draw_walls(bpy.types.Operator):
         self.wall.obj_y.location.y = self.props.wall_depth
         for child in self.wall.obj_bp.children:
             child.draw_type = 'WIRE'  
-                    
-        if math.fabs(x) > math.fabs(y):
-            if x > 0:
-                self.wall.obj_bp.rotation_euler.z = math.radians(0)
-            else:
-                self.wall.obj_bp.rotation_euler.z = math.radians(180)
-            if self.typed_value == "":
-                self.wall.obj_x.location.x = math.fabs(x)
-            else:
-                value = eval(self.typed_value)
-                if bpy.context.scene.unit_settings.system == 'METRIC':
-                    self.wall.obj_x.location.x = unit.millimeter(float(value))
-                else:
-                    self.wall.obj_x.location.x = unit.inch(float(value))
-            
-        if math.fabs(y) > math.fabs(x):
-            if y > 0:
-                self.wall.obj_bp.rotation_euler.z = math.radians(90)
-            else:
-                self.wall.obj_bp.rotation_euler.z = math.radians(-90)
-            if self.typed_value == "":
-                self.wall.obj_x.location.x = math.fabs(y)
-            else:
-                value = eval(self.typed_value)
-                if bpy.context.scene.unit_settings.system == 'METRIC':
-                    self.wall.obj_x.location.x = unit.millimeter(float(value))
-                else:
-                    self.wall.obj_x.location.x = unit.inch(float(value))
+        
+        typed_length = self.get_typed_length()
+        
+        if x == 0 and y == 0:
+            return
+        
+        if self.snap_kind == snapping.ENDPOINT:
+            #THE WALL HAS TO END EXACTLY ON THE SNAPPED WALL SO THE ANGLE AND TYPED LENGTH ARE IGNORED
+            self.wall.obj_bp.rotation_euler.z = math.atan2(y,x)
+            self.wall.obj_x.location.x = math.hypot(x,y)
+            return
+        
+        angle, length = get_wall_angle(x,y,self.props.wall_angle_increment)
+        self.wall.obj_bp.rotation_euler.z = angle
+        self.wall.obj_x.location.x = length if typed_length is None else typed_length
+        
+    def change_angle_increment(self,event):
+        if event.type == 'A' and event.value == 'PRESS':
+            index = ANGLE_INCREMENTS.index(self.props.wall_angle_increment)
+            self.props.wall_angle_increment = ANGLE_INCREMENTS[(index + 1) % len(ANGLE_INCREMENTS)]
 
     def set_type_value(self,event):
         if event.value == 'PRESS':
-            if event.type == "ONE" or event.type == "NUMPAD_1":
-                self.typed_value += "1"
-            if event.type == "TWO" or event.type == "NUMPAD_2":
-                self.typed_value += "2"
-            if event.type == "THREE" or event.type == "NUMPAD_3":
-                self.typed_value += "3"
-            if event.type == "FOUR" or event.type == "NUMPAD_4":
-                self.typed_value += "4"
-            if event.type == "FIVE" or event.type == "NUMPAD_5":
-                self.typed_value += "5"
-            if event.type == "SIX" or event.type == "NUMPAD_6":
-                self.typed_value += "6"
-            if event.type == "SEVEN" or event.type == "NUMPAD_7":
-                self.typed_value += "7"
-            if event.type == "EIGHT" or event.type == "NUMPAD_8":
-                self.typed_value += "8"
-            if event.type == "NINE" or event.type == "NUMPAD_9":
-                self.typed_value += "9"
-            if event.type == "ZERO" or event.type == "NUMPAD_0":
-                self.typed_value += "0"
+            if event.shift and event.type in SHIFT_TYPED_KEYS:
+                self.typed_value += SHIFT_TYPED_KEYS[event.type]
+            elif event.type in TYPED_KEYS:
+                self.typed_value += TYPED_KEYS[event.type]
             if event.type == "PERIOD" or event.type == "NUMPAD_PERIOD":
                 last_value = self.typed_value[-1:]
                 if last_value != ".":
@@ -725,17 +953,32 @@ class OPS_draw_walls(bpy.types.Operator):
         pass        
     
     def place_wall(self,context):
+        if self.previous_wall and self.typed_error:
+            self.report({'WARNING'},"Invalid length: " + self.typed_error)
+            return
+        if self.previous_wall and self.wall.obj_x.location.x < MIN_WALL_LENGTH:
+            self.report({'WARNING'},"The wall has no length so it was not placed")
+            return
         if self.previous_wall:
             for child in self.wall.obj_bp.children:
                 child.draw_type = 'TEXTURED'
                 self.ray_obj_list.append(child)
             
+        self.wall_start = self.starting_point
         self.starting_point = (self.wall.obj_x.matrix_world[0][3], self.wall.obj_x.matrix_world[1][3], self.wall.obj_x.matrix_world[2][3])
 
         if self.previous_wall:
+            self.snap_index.add_wall(self.wall_start,self.starting_point)
+            if self.snap_kind == snapping.ENDPOINT and self.props.auto_build_rooms:
+                #THE WALL MATRICES HAVE TO BE UPDATED BEFORE THE LOOP CAN BE FOUND
+                context.scene.update()
+                if not rooms.build_rooms(context,wall=self.wall):
+                    self.report({'WARNING'},"No closed loop of walls was found so a room was not built")
             self.previous_wall = self.wall
             self.create_wall()
         else:
+            #THE START OF THE FIRST WALL CAN BE SNAPPED TO BEFORE THE WALL IS PLACED
+            self.snap_index.add_point(self.starting_point,snapping.ENDPOINT)
             self.previous_wall = self.wall
 
         self.typed_value = ""
@@ -770,25 +1013,45 @@ class OPS_draw_walls(bpy.types.Operator):
         return wall_number
             
     def modal(self, context, event):
+        timer = profiling.Event_Timer(self.bl_idname,event)
         self.mouse_x = event.mouse_x
         self.mouse_y = event.mouse_y
         context.area.tag_redraw()
         selected_point, selected_obj = get_selection_point(context,event,objects=self.ray_obj_list) #Pass in Drawing Plane
+        #THE WALL THAT IS BEING DRAWN CAN'T SNAP TO ITS OWN START
+        exclude = self.starting_point if self.previous_wall else None
+        selected_point, self.snap_kind = snapping.snap_point(self.snap_index,selected_point,self.props,exclude)
+        timer.lap('RAY_CAST')
         bpy.ops.object.select_all(action='DESELECT')
 
         if self.previous_wall:
             self.set_type_value(event)
+            self.change_angle_increment(event)
+            self.get_typed_length()
             wall_length_text = str(unit.meter_to_active_unit(round(self.wall.obj_x.location.x,4)))
             wall_length_unit = '"' if context.scene.unit_settings.system == 'IMPERIAL' else 'mm'
-            context.area.header_text_set(text=self.header_text + '   (Current Wall Length = ' + wall_length_text + wall_length_unit + ')')
-            self.cursor_help_text = 'Left Click to Place Wall\nType Number to Set Length\nType A to change angle\n(Current Wall Length = ' + wall_length_text + wall_length_unit + ')'                  
+            header_text = self.header_text + '   (Current Wall Length = ' + wall_length_text + wall_length_unit + ')'
+            if self.typed_error:
+                header_text += '   (Invalid Length: ' + self.typed_error + ')'
+            context.area.header_text_set(text=header_text)
+            self.cursor_help_text = 'Left Click to Place Wall\nType Number to Set Length\nType A to change angle (' + self.props.wall_angle_increment + '\u00b0)\n(Current Wall Length = ' + wall_length_text + wall_length_unit + ')'
+            if self.typed_value != "":
+                self.cursor_help_text += '\n(Typed Length = ' + self.typed_value + ')'
+            if self.typed_error:
+                self.cursor_help_text += '\n(Invalid Length: ' + self.typed_error + ')'
+            if self.snap_kind:
+                self.cursor_help_text += '\n(Snap = ' + self.snap_kind.title() + ')'
             self.position_wall_length(selected_point)  
         else:
             self.cursor_help_text = "Left Click to Draw Walls"
+            if self.snap_kind:
+                self.cursor_help_text += '\n(Snap = ' + self.snap_kind.title() + ')'
             self.position_wall_base_point(selected_point)  
 
         if self.event_is_place_wall(event):
             self.place_wall(context)
+        timer.lap('MUTATION')
+        timer.finish()
 
         if event.type in {'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE'}:
             return {'PASS_THROUGH'}
@@ -798,6 +1061,7 @@ class OPS_draw_walls(bpy.types.Operator):
             
         return {'RUNNING_MODAL'}
         
+    @profiling.timed_redraw
     def draw_menu(self,context):
         self.help_box.draw()
         self.help_box.raw_text = self.cursor_help_text
@@ -813,6 +1077,9 @@ class OPS_draw_walls(bpy.types.Operator):
         
         self.help_box = TextBox(500,500,300,200,10,100, "Select first point to draw wall")
         
+        self.snap_index = snapping.Wall_Snap_Index()
+        self.snap_index.build(get_wall_dimension_objects(context))
+        
         self.create_wall()
         
         bpy.ops.mesh.primitive_plane_add()
@@ -853,6 +1120,7 @@ class OPS_draw_mesh(bpy.types.Operator):
         if self.drawing_plane:
             utils.delete_obj_list([self.drawing_plane])
         context.area.tag_redraw()
+        profiling.report_ops_calls(self.bl_idname)
         return {'FINISHED'}
 
     @staticmethod
@@ -862,6 +1130,7 @@ class OPS_draw_mesh(bpy.types.Operator):
                           if region.type == 'WINDOW']
         return window_regions[0]
 
+    @profiling.timed_redraw
     def draw_opengl(self,context):     
         region = self._window_region(context)
         
@@ -909,9 +1178,13 @@ class OPS_draw_mesh(bpy.types.Operator):
         self.mouse_x = event.mouse_x
         self.mouse_y = event.mouse_y
         
+        timer = profiling.Event_Timer(self.bl_idname,event)
         selected_point, selected_obj = utils.get_selection_point(context,event)
+        timer.lap('RAY_CAST')
         
         self.position_cube(selected_point)
+        timer.lap('MUTATION')
+        timer.finish()
 
         if self.event_is_place_second_point(event):
             return self.finish(context)
@@ -990,6 +1263,7 @@ class OPS_place_area_lamp(bpy.types.Operator):
         if self.drawing_plane:
             utils.delete_obj_list([self.drawing_plane])
         context.area.tag_redraw()
+        profiling.report_ops_calls(self.bl_idname)
         return {'FINISHED'}
 
     @staticmethod
@@ -999,6 +1273,7 @@ class OPS_place_area_lamp(bpy.types.Operator):
                           if region.type == 'WINDOW']
         return window_regions[0]
 
+    @profiling.timed_redraw
     def draw_opengl(self,context):     
         region = self._window_region(context)
         
@@ -1051,9 +1326,13 @@ class OPS_place_area_lamp(bpy.types.Operator):
         self.mouse_x = event.mouse_x
         self.mouse_y = event.mouse_y
         
+        timer = profiling.Event_Timer(self.bl_idname,event)
         selected_point, selected_obj = utils.get_selection_point(context,event)
+        timer.lap('RAY_CAST')
         
         self.position_lamp(selected_point)
+        timer.lap('MUTATION')
+        timer.finish()
         
         if self.event_is_place_second_point(event):
             return self.finish(context)
@@ -1134,6 +1413,7 @@ class OPS_place_furniture(bpy.types.Operator):
         context.window.cursor_set('DEFAULT')
         
         context.area.tag_redraw()
+        profiling.report_ops_calls(self.bl_idname)
         return {'FINISHED'}
 
     @staticmethod
@@ -1143,6 +1423,7 @@ class OPS_place_furniture(bpy.types.Operator):
                           if region.type == 'WINDOW']
         return window_regions[0]
 
+    @profiling.timed_redraw
     def draw_opengl(self,context):
         region = self._window_region(context)
         
@@ -1164,6 +1445,7 @@ class OPS_place_furniture(bpy.types.Operator):
         self.mouse_x = event.mouse_x
         self.mouse_y = event.mouse_y
         
+        timer = profiling.Event_Timer(self.bl_idname,event)
         for area in bpy.context.screen.areas:
             if area.type == 'VIEW_3D':
                 rv3d = area.spaces.active.region_3d
@@ -1171,7 +1453,10 @@ class OPS_place_furniture(bpy.types.Operator):
                 ''' WHY Is context.region_data NONE?
                 '''
                 selected_point, selected_obj = utils.ray_cast(context,event,rv3d,objects=self.ray_obj_list)
+                timer.lap('RAY_CAST')
                 self.position_furniture(selected_point,selected_obj)
+                timer.lap('MUTATION')
+        timer.finish()
             
         if event.type in {'RIGHTMOUSE', 'ESC'}:
             self.cancel_drop(context)
@@ -1238,6 +1523,7 @@ class OPS_place_room_material(bpy.types.Operator):
         context.window.cursor_set('DEFAULT')
         
         context.area.tag_redraw()
+        profiling.report_ops_calls(self.bl_idname)
         return {'FINISHED'}
 
     @staticmethod
@@ -1247,6 +1533,7 @@ class OPS_place_room_material(bpy.types.Operator):
                           if region.type == 'WINDOW']
         return window_regions[0]
 
+    @profiling.timed_redraw
     def draw_opengl(self,context):     
         region = self._window_region(context)
         
@@ -1265,9 +1552,13 @@ class OPS_place_room_material(bpy.types.Operator):
         self.mouse_x = event.mouse_x
         self.mouse_y = event.mouse_y
         
+        timer = profiling.Event_Timer(self.bl_idname,event)
         selected_point, selected_obj = utils.get_selection_point(context,event)
+        timer.lap('RAY_CAST')
         
         self.position_cube(selected_point)
+        timer.lap('MUTATION')
+        timer.finish()
 
         if event.type in {'RIGHTMOUSE', 'ESC'}:
             self.cancel_drop(context)
@@ -1296,6 +1587,7 @@ class OPS_properties(bpy.types.Operator):
     bl_label = "Properties"
 
     obj = None
+    dependent_objects = []
 
     @classmethod
     def poll(cls, context):
@@ -1307,28 +1599,72 @@ class OPS_properties(bpy.types.Operator):
             else:
                 return False
 
+    def update_default_flags(self,context):
+        """ Walls stop using the default height and depth once they are 
+            changed in this dialog and use them again if they are set back
+        """
+        obj_bp = self.obj.parent
+        if USE_DEFAULT_HEIGHT not in obj_bp:
+            return
+        props = get_roombuilder_props(context)
+        wall = Assembly(obj_bp)
+        obj_bp[USE_DEFAULT_HEIGHT] = math.fabs(wall.obj_z.location.z - props.wall_height) < .0001
+        obj_bp[USE_DEFAULT_DEPTH] = math.fabs(wall.obj_y.location.y - props.wall_depth) < .0001
+
     def check(self,context):
+        self.update_default_flags(context)
         return True
 
     def execute(self, context):
+        self.update_default_flags(context)
         return {'FINISHED'}
 
     def invoke(self,context,event):
         wm = context.window_manager
         self.obj = context.object
+        self.dependent_objects = self.get_dependent_objects(Assembly(self.obj.parent))
         
         return wm.invoke_props_dialog(self, width=400)
 
+    def get_dependent_objects(self,wall):
+        """ Returns: List of Objects outside of the wall that have drivers that use the wall
+        """
+        wall_objects = utils.get_child_objects(wall.obj_bp)
+        objects = []
+        for obj in (wall.obj_bp,wall.obj_x,wall.obj_y,wall.obj_z):
+            if obj is None:
+                continue
+            for dependent in utils.get_dependent_objects(obj):
+                if dependent not in wall_objects and dependent not in objects:
+                    objects.append(dependent)
+        return objects
+
+    def draw_dependent_objects(self,layout):
+        if self.dependent_objects:
+            col = layout.column(align=True)
+            col.label("Used by " + str(len(self.dependent_objects)) + " objects:",icon='CONSTRAINT')
+            for obj in self.dependent_objects[:5]:
+                col.label(obj.name,icon='BLANK1')
+            if len(self.dependent_objects) > 5:
+                col.label("...",icon='BLANK1')
+
     def draw_wall_properties(self,layout,wall):
         layout.label(self.obj.name)
         col = layout.column(align=True)
         col.prop(self.obj,'name',text="Wall Name")
         col.separator()
         col.prop(wall.obj_x,'location',index=0,text="Wall Length")
-        col.prop(wall.obj_y,'location',index=1,text="Wall Depth")
-        col.prop(wall.obj_z,'location',index=2,text="Wall Height")        
+        self.draw_default_dimension(col,wall.obj_bp,wall.obj_y,1,"Wall Depth",USE_DEFAULT_DEPTH)
+        self.draw_default_dimension(col,wall.obj_bp,wall.obj_z,2,"Wall Height",USE_DEFAULT_HEIGHT)
         layout.prop(wall.obj_bp,'location',text="Location")
         layout.prop(wall.obj_bp,'rotation_euler',index=2,text="Rotation")
+        self.draw_dependent_objects(layout)
+
+    def draw_default_dimension(self,layout,obj_bp,obj_dim,index,text,flag):
+        row = layout.row(align=True)
+        row.prop(obj_dim,'location',index=index,text=text)
+        if flag in obj_bp:
+            row.label("",icon='LINKED' if obj_bp[flag] else 'UNLINKED')
 
     def draw_room_mesh(self,layout,wall):
         layout.label(self.obj.name)
@@ -1422,9 +1758,16 @@ class OPS_room_properties(bpy.types.Operator):
         row.prop(rm_props,"wall_height",text="Wall Height")
         row.prop(rm_props,"wall_depth",text="Wall Depth") 
         row = box.row()
+        row.prop(rm_props,"wall_angle_increment",text="Angle Increment")
+        row = box.row()
         row.prop(rm_props,"show_wall_dimensions")
         row = box.row()
         row.prop(rm_props,"show_wall_names")
+        row = box.row()
+        row.prop(rm_props,"auto_build_rooms")
+        row = box.row()
+        row.prop(rm_props,"use_baked_layout")
+        snapping.draw_snap_options(box,rm_props)
         split = box.split()
         row = split.row()
         row.label("Show Handles:")
@@ -1453,6 +1796,34 @@ class OPS_temp_operator(bpy.types.Operator):
         
         # OPERATOR: Apply Hooks or Edit Mesh
 
+#DRAW HANDLER AND KEYMAP ITEMS ADDED IN REGISTER SO THEY CAN BE REMOVED IN UNREGISTER
+draw_handle = None
+addon_keymaps = []
+
+def get_handlers():
+    """ Returns: List of (handler list name, function) that are added when the add-on is registered
+    """
+    return [('scene_update_post',utils.driver_index_scene_update),
+            ('load_post',utils.driver_index_load_post),
+            ('load_post',utils.part_thickness_load_post),
+            ('undo_post',utils.part_thickness_load_post),
+            ('redo_post',utils.part_thickness_load_post),
+            ('load_post',utils.init_signatures_load_post),
+            ('undo_post',utils.init_signatures_load_post),
+            ('redo_post',utils.init_signatures_load_post),
+            ('load_post',clear_assembly_caches),
+            ('undo_post',clear_assembly_caches),
+            ('redo_post',clear_assembly_caches),
+            ('scene_update_post',visibility.visibility_scene_update),
+            ('load_post',visibility.visibility_load_post),
+            ('undo_post',visibility.visibility_load_post),
+            ('scene_update_post',wall_layout.layout_scene_update),
+            ('load_post',wall_layout.layout_load_post),
+            ('scene_update_post',rooms.rooms_scene_update),
+            ('load_post',rooms.rooms_load_post),
+            ('undo_post',rooms.rooms_load_post),
+            ('redo_post',rooms.rooms_load_post)]
+
 def register():
     bpy.utils.register_class(WMPROPS_Room_Builder)
     bpy.utils.register_class(PROPS_Room_Builder)
@@ -1467,14 +1838,70 @@ def register():
     bpy.utils.register_class(OPS_room_properties)
     bpy.utils.register_class(OPS_temp_operator)
     
+    profiling.register()
+    rooms.register()
+    floor_plan.register()
+    plan_import.register()
+    reports.register()
+    thumbnails.register()
+    library_builder.register()
+    library_packer.register()
+    
     bpy.types.WindowManager.room_builder = bpy.props.PointerProperty(type=WMPROPS_Room_Builder)
     bpy.types.Scene.room_builder = bpy.props.PointerProperty(type=PROPS_Room_Builder)
     
-    bpy.types.SpaceView3D.draw_handler_add(draw_wall_dimensions, (None,None),'WINDOW','POST_PIXEL')
+    global draw_handle
+    draw_handle = bpy.types.SpaceView3D.draw_handler_add(draw_wall_dimensions, (None,None),'WINDOW','POST_PIXEL')
+    
+    for handler_name, function in get_handlers():
+        getattr(bpy.app.handlers,handler_name).append(function)
     
     wm = bpy.context.window_manager
     if wm.keyconfigs.addon:
         obj_km = wm.keyconfigs.addon.keymaps.new(name='Object Mode', space_type='EMPTY')
         kmi = obj_km.keymap_items.new('wm.console_toggle', 'HOME', 'PRESS', shift=True)
+        addon_keymaps.append((obj_km,kmi))
         kmi = obj_km.keymap_items.new('blender_design.properties', 'RIGHTMOUSE', 'PRESS')
+        addon_keymaps.append((obj_km,kmi))
         kmi = obj_km.keymap_items.new('blender_design.lamp_properties', 'RIGHTMOUSE', 'PRESS')
+        addon_keymaps.append((obj_km,kmi))
+
+def unregister():
+    global draw_handle
+    for handler_name, function in get_handlers():
+        handlers = getattr(bpy.app.handlers,handler_name)
+        if function in handlers:
+            handlers.remove(function)
+    
+    if draw_handle is not None:
+        bpy.types.SpaceView3D.draw_handler_remove(draw_handle,'WINDOW')
+        draw_handle = None
+    
+    for km, kmi in addon_keymaps:
+        km.keymap_items.remove(kmi)
+    addon_keymaps.clear()
+    
+    del bpy.types.WindowManager.room_builder
+    del bpy.types.Scene.room_builder
+    
+    library_packer.unregister()
+    library_builder.unregister()
+    thumbnails.unregister()
+    reports.unregister()
+    plan_import.unregister()
+    floor_plan.unregister()
+    rooms.unregister()
+    profiling.unregister()
+    
+    bpy.utils.unregister_class(OPS_temp_operator)
+    bpy.utils.unregister_class(OPS_room_properties)
+    bpy.utils.unregister_class(OPS_lamp_properties)
+    bpy.utils.unregister_class(OPS_properties)
+    bpy.utils.unregister_class(OPS_place_area_lamp)
+    bpy.utils.unregister_class(OPS_place_furniture)
+    bpy.utils.unregister_class(OPS_draw_mesh)
+    bpy.utils.unregister_class(OPS_draw_walls)
+    
+    bpy.utils.unregister_class(PANEL_Room_Builder_Library)
+    bpy.utils.unregister_class(PROPS_Room_Builder)
+    bpy.utils.unregister_class(WMPROPS_Room_Builder)
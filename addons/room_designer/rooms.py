@@ -0,0 +1,443 @@
+"""
+This module finds the rooms that are made by closed loops of walls
+and creates a floor and ceiling for each room.
+
+A loop is found by following walls from the end of one wall to the start
+of the next wall. When more than one wall starts at the same point the wall
+that turns the most to one side is used, so a wall that ends on the middle
+of a T-junction closes the smallest room. The floor and ceiling are updated
+when the walls move. Only the rooms that have a wall that changed are updated.
+
+"""
+
+import bpy
+import math
+import numpy
+from bpy.app.handlers import persistent
+from mathutils import Vector
+from mathutils.geometry import tessellate_polygon
+from .assembly import Assembly
+
+ISWALL = "ISWALL"
+ISFLOOR = "ISFLOOR"
+ISCEILING = "ISCEILING"
+ROOM_WALLS = "ROOM_WALLS"
+ROOM_CEILING = "ROOM_CEILING"
+WALL_SEPARATOR = "|"
+
+#DISTANCE BETWEEN THE END OF ONE WALL AND THE START OF THE NEXT WALL THAT IS STILL CONNECTED
+CONNECT_TOLERANCE = .001
+
+#FLOOR NAME -> Room
+room_cache = {}
+room_cache_is_valid = False
+
+#NUMBER OF OBJECTS WHEN THE WALL OBJECTS OF THE ROOMS WERE LOOKED UP
+room_object_count = 0
+
+class Room(object):
+    """
+    The walls and meshes of one room. The points and triangles of the last
+    update are stored so the meshes are only rebuilt when the outline changes.
+    """
+
+    def __init__(self,floor,ceiling,walls):
+        self.floor_name = floor.name
+        self.ceiling_name = ceiling.name if ceiling else ""
+        self.walls = walls
+        self.points = None
+        self.triangles = None
+        self.objects = None
+        self.objects_are_valid = False
+
+    def get_objects(self):
+        """ Returns: List of (Base Point, X Dimension, Z Dimension) or None if a wall was deleted
+            The objects are only looked up by name again after objects are added or removed.
+        """
+        if not self.objects_are_valid:
+            self.objects = []
+            for names in self.walls:
+                wall = [bpy.data.objects.get(name) for name in names]
+                if None in wall:
+                    self.objects = None
+                    break
+                self.objects.append(wall)
+            self.objects_are_valid = True
+        return self.objects
+
+def get_walls(context):
+    """
+    returns the assemblies for every wall in the scene
+
+    **Parameters:**
+
+    * **context** (bpy.context)
+
+    **Returns:** list of Assembly
+    """
+    walls = []
+    for obj in context.scene.objects:
+        if ISWALL in obj and obj.parent:
+            wall = Assembly(obj.parent)
+            if wall.obj_x and wall.obj_z:
+                walls.append(wall)
+    return walls
+
+def get_point_key(co):
+    return (int(round(co[0] / CONNECT_TOLERANCE)),int(round(co[1] / CONNECT_TOLERANCE)))
+
+def get_turn_angle(wall,next_wall):
+    """ Returns: float - Angle from the direction of wall to the direction of next_wall.
+        Positive angles turn left.
+    """
+    start, end = wall
+    next_start, next_end = next_wall
+    x1, y1 = end[0] - start[0], end[1] - start[1]
+    x2, y2 = next_end[0] - next_start[0], next_end[1] - next_start[1]
+    return math.atan2(x1 * y2 - y1 * x2,x1 * x2 + y1 * y2)
+
+def get_signed_area(points):
+    return sum(points[i - 1][0] * points[i][1] - points[i][0] * points[i - 1][1] for i in range(len(points)))
+
+def find_wall_loops(walls,first_walls=None):
+    """
+    finds the closed loops of walls.
+    Each wall is only used in one loop.
+
+    Every loop is followed twice. The first time the wall that turns the most
+    to the left is used at each point, which only closes counter clockwise
+    rooms. The second time the wall that turns the most to the right is used,
+    which only closes clockwise rooms. A wall that can't close a loop is
+    never followed again so open chains of walls are only walked once.
+
+    **Parameters:**
+
+    * **walls** (list of Assembly)
+    * **first_walls** (list of Assembly, (optional)) - Only find the loops that use these walls
+
+    **Returns:** list of lists of Assembly
+    """
+    starts = {}
+    ends = []
+    lines = []
+    for index, wall in enumerate(walls):
+        start = wall.obj_bp.matrix_world.to_translation()
+        end = wall.obj_x.matrix_world.to_translation()
+        key = get_point_key(start)
+        for x in (-1,0,1):
+            for y in (-1,0,1):
+                starts.setdefault((key[0] + x,key[1] + y),[]).append(index)
+        ends.append(get_point_key(end))
+        lines.append((start,end))
+
+    if first_walls is None:
+        first_indexes = range(len(walls))
+    else:
+        first_names = set(wall.obj_bp.name for wall in first_walls)
+        first_indexes = [index for index, wall in enumerate(walls) if wall.obj_bp.name in first_names]
+
+    used = set()
+    loops = []
+    for direction in (1,-1):
+        next_walls = {}
+        dead = set()
+
+        def get_next_wall(current):
+            if current not in next_walls:
+                best = None
+                best_turn = None
+                for index in starts.get(ends[current],()):
+                    if index == current:
+                        continue
+                    turn = get_turn_angle(lines[current],lines[index]) * direction
+                    if turn > math.pi - 1e-6:
+                        #GOING BACK ALONG THE SAME LINE IS ONLY USED IF THERE IS NO OTHER WALL
+                        turn = -math.pi
+                    if best_turn is None or turn > best_turn:
+                        best = index
+                        best_turn = turn
+                next_walls[current] = best
+            return next_walls[current]
+
+        for first in first_indexes:
+            if first in used or first in dead:
+                continue
+            path = [first]
+            path_set = {first}
+            current = first
+            is_closed = False
+            while True:
+                next_wall = get_next_wall(current)
+                if next_wall == first:
+                    is_closed = True
+                    break
+                if next_wall is None or next_wall in used or next_wall in dead:
+                    break
+                if next_wall in path_set:
+                    #THE PATH RUNS INTO A LOOP THAT DOESN'T USE THE FIRST WALL
+                    path = path[:path.index(next_wall)]
+                    break
+                path.append(next_wall)
+                path_set.add(next_wall)
+                current = next_wall
+            if is_closed and len(path) > 2 and get_signed_area([lines[index][0] for index in path]) * direction > 0:
+                used.update(path)
+                loops.append([walls[index] for index in path])
+            else:
+                #EVERY WALL ON THE PATH WOULD FOLLOW THE SAME WALLS AGAIN
+                dead.update(path)
+    return loops
+
+def get_loop_points(wall_objects):
+    """ Returns: numpy array of the x,y of the start of each wall
+    """
+    points = numpy.empty((len(wall_objects),2),dtype=numpy.float32)
+    for index, (obj_bp, obj_x, obj_z) in enumerate(wall_objects):
+        co = obj_bp.matrix_world.to_translation()
+        points[index] = (co[0],co[1])
+    return points
+
+def triangulate(points):
+    """
+    triangulates the outline of a room.
+    The triangles always face up even if the walls were drawn clockwise.
+
+    **Parameters:**
+
+    * **points** (numpy array) - X,Y of the room outline
+
+    **Returns:** numpy array of vertex indexes with 3 columns
+    """
+    outline = [Vector((x,y,0)) for x, y in points]
+    triangles = numpy.array(tessellate_polygon([outline]),dtype=numpy.int32).reshape(-1,3)
+    x = points[:,0]
+    y = points[:,1]
+    area = numpy.dot(x,numpy.roll(y,-1)) - numpy.dot(y,numpy.roll(x,-1))
+    if area < 0:
+        triangles = triangles[:,::-1]
+    return triangles
+
+def get_vertex_coordinates(points,z):
+    co = numpy.empty((len(points),3),dtype=numpy.float32)
+    co[:,:2] = points
+    co[:,2] = z
+    return co.ravel()
+
+def create_room_mesh(name,points,triangles,z,flip=False):
+    """
+    creates a mesh from the room outline and triangles in one pass
+
+    **Parameters:**
+
+    * **name** (string)
+    * **points** (numpy array) - X,Y of the room outline
+    * **triangles** (numpy array) - Vertex indexes with 3 columns
+    * **z** (float) - Height of the mesh
+    * **flip** (boolean, (optional)) - Make the faces point down
+
+    **Returns:** bpy.types.Mesh
+    """
+    if flip:
+        triangles = triangles[:,::-1]
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(points))
+    mesh.vertices.foreach_set("co",get_vertex_coordinates(points,z))
+    mesh.loops.add(triangles.size)
+    mesh.loops.foreach_set("vertex_index",numpy.ascontiguousarray(triangles).ravel())
+    mesh.polygons.add(len(triangles))
+    mesh.polygons.foreach_set("loop_start",numpy.arange(0,triangles.size,3,dtype=numpy.int32))
+    mesh.polygons.foreach_set("loop_total",numpy.full(len(triangles),3,dtype=numpy.int32))
+    mesh.update(calc_edges=True)
+    return mesh
+
+def replace_mesh(obj,mesh):
+    old_mesh = obj.data
+    obj.data = mesh
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+def get_ceiling_height(wall_objects):
+    return max(obj_z.location.z for obj_bp, obj_x, obj_z in wall_objects)
+
+def update_room(room):
+    """
+    updates the floor and ceiling of a room if the walls have moved.
+    If the outline keeps the same triangles only the vertex locations are changed.
+
+    **Parameters:**
+
+    * **room** (Room)
+
+    **Returns:** bool - True if the meshes were changed
+    """
+    wall_objects = room.get_objects()
+    floor = bpy.data.objects.get(room.floor_name)
+    if wall_objects is None or floor is None:
+        return False
+    ceiling = bpy.data.objects.get(room.ceiling_name)
+
+    points = get_loop_points(wall_objects)
+    height = get_ceiling_height(wall_objects)
+    if room.points is not None and numpy.array_equal(points,room.points) and (ceiling is None or ceiling["ROOM_HEIGHT"] == height):
+        return False
+
+    triangles = triangulate(points)
+    if room.triangles is not None and numpy.array_equal(triangles,room.triangles):
+        floor.data.vertices.foreach_set("co",get_vertex_coordinates(points,0))
+        floor.data.update()
+        if ceiling:
+            ceiling.data.vertices.foreach_set("co",get_vertex_coordinates(points,height))
+            ceiling.data.update()
+    else:
+        replace_mesh(floor,create_room_mesh(floor.name,points,triangles,0))
+        if ceiling:
+            replace_mesh(ceiling,create_room_mesh(ceiling.name,points,triangles,height,flip=True))
+    if ceiling:
+        ceiling["ROOM_HEIGHT"] = height
+    room.points = points
+    room.triangles = triangles
+    return True
+
+def create_room(context,walls,room_number,add_ceiling=True,floor_name="",ceiling_name=""):
+    """
+    creates the floor and ceiling for a loop of walls
+
+    **Parameters:**
+
+    * **context** (bpy.context)
+    * **walls** (list of Assembly) - Closed loop of walls
+    * **room_number** (int) - Number used for the object names
+    * **add_ceiling** (boolean, (optional))
+    * **floor_name** (string, (optional)) - The room number is used if this is empty
+    * **ceiling_name** (string, (optional)) - The room number is used if this is empty
+
+    **Returns:** Room
+    """
+    wall_objects = [(wall.obj_bp,wall.obj_x,wall.obj_z) for wall in walls]
+    points = get_loop_points(wall_objects)
+    triangles = triangulate(points)
+    wall_names = WALL_SEPARATOR.join(wall.obj_bp.name for wall in walls)
+
+    floor_name = floor_name or "Floor " + str(room_number)
+    floor = bpy.data.objects.new(floor_name,create_room_mesh(floor_name,points,triangles,0))
+    floor[ISFLOOR] = True
+    floor[ROOM_WALLS] = wall_names
+    context.scene.objects.link(floor)
+
+    ceiling = None
+    if add_ceiling:
+        height = get_ceiling_height(wall_objects)
+        ceiling_name = ceiling_name or "Ceiling " + str(room_number)
+        ceiling = bpy.data.objects.new(ceiling_name,create_room_mesh(ceiling_name,points,triangles,height,flip=True))
+        ceiling[ISCEILING] = True
+        ceiling["ROOM_HEIGHT"] = height
+        context.scene.objects.link(ceiling)
+        floor[ROOM_CEILING] = ceiling.name
+
+    room = Room(floor,ceiling,[(obj_bp.name,obj_x.name,obj_z.name) for obj_bp, obj_x, obj_z in wall_objects])
+    room.points = points
+    room.triangles = triangles
+    room_cache[floor.name] = room
+    return room
+
+def build_room_cache():
+    """
+    finds the floors in the file and the walls they were made from
+    """
+    global room_cache_is_valid
+    room_cache.clear()
+    for floor in bpy.data.objects:
+        if ISFLOOR in floor and ROOM_WALLS in floor:
+            walls = []
+            for name in floor[ROOM_WALLS].split(WALL_SEPARATOR):
+                obj_bp = bpy.data.objects.get(name)
+                wall = Assembly(obj_bp) if obj_bp else None
+                if wall is None or wall.obj_x is None or wall.obj_z is None:
+                    walls = None
+                    break
+                walls.append((wall.obj_bp.name,wall.obj_x.name,wall.obj_z.name))
+            if walls:
+                ceiling = bpy.data.objects.get(floor.get(ROOM_CEILING,""))
+                room_cache[floor.name] = Room(floor,ceiling,walls)
+    room_cache_is_valid = True
+
+def get_rooms():
+    if not room_cache_is_valid:
+        build_room_cache()
+    return room_cache
+
+def build_rooms(context,add_ceiling=True,wall=None):
+    """
+    creates a floor and ceiling for every closed loop of walls
+    that doesn't already have a room
+
+    **Parameters:**
+
+    * **context** (bpy.context)
+    * **add_ceiling** (boolean, (optional))
+    * **wall** (Assembly, (optional)) - Only build the room that uses this wall
+
+    **Returns:** list of the new Rooms
+    """
+    rooms = get_rooms()
+    walls_in_rooms = set()
+    for room in rooms.values():
+        for names in room.walls:
+            walls_in_rooms.add(names[0])
+
+    if wall and wall.obj_bp.name in walls_in_rooms:
+        return []
+    walls = [obj for obj in get_walls(context) if obj.obj_bp.name not in walls_in_rooms]
+    new_rooms = []
+    for loop in find_wall_loops(walls,[wall] if wall else None):
+        new_rooms.append(create_room(context,loop,len(rooms) + 1,add_ceiling))
+    return new_rooms
+
+@persistent
+def rooms_scene_update(scene):
+    """ Scene update handler that updates the rooms that have walls that moved
+    """
+    global room_object_count
+    if not bpy.data.objects.is_updated:
+        return
+    rooms = get_rooms()
+    if len(bpy.data.objects) != room_object_count:
+        room_object_count = len(bpy.data.objects)
+        for room in rooms.values():
+            room.objects_are_valid = False
+    for room in list(rooms.values()):
+        wall_objects = room.get_objects()
+        if wall_objects is None:
+            continue
+        for wall in wall_objects:
+            if wall[0].is_updated or wall[1].is_updated or wall[2].is_updated:
+                update_room(room)
+                break
+
+@persistent
+def rooms_load_post(dummy):
+    """ Clears the rooms when a file is loaded and after undo and redo
+        because the objects the rooms point to are replaced
+    """
+    global room_cache_is_valid
+    room_cache.clear()
+    room_cache_is_valid = False
+
+class OPS_build_rooms(bpy.types.Operator):
+    bl_idname = "room_builder.build_rooms"
+    bl_label = "Build Rooms"
+    bl_description = "Creates a floor and ceiling for every closed loop of walls"
+    bl_options = {'UNDO'}
+
+    add_ceiling = bpy.props.BoolProperty(name="Add Ceiling",default=True)
+
+    def execute(self,context):
+        new_rooms = build_rooms(context,self.add_ceiling)
+        self.report({'INFO'},"Created " + str(len(new_rooms)) + " rooms")
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(OPS_build_rooms)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_build_rooms)
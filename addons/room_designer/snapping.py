@@ -0,0 +1,217 @@
+"""
+This module contains the snapping engine used when drawing walls.
+
+The start, end and middle of every wall are stored in a KD-tree
+so the closest snap point can be found without looping through the walls.
+A KD-tree can't be changed after it is balanced so the points of walls that
+are placed while drawing are kept in a short pending list that is searched
+directly. The tree is rebuilt once the pending list gets too long.
+
+"""
+
+from mathutils import kdtree, Vector
+
+ENDPOINT = 'ENDPOINT'
+MIDPOINT = 'MIDPOINT'
+GRID = 'GRID'
+
+#LOWER NUMBERS WIN WHEN TWO POINTS ARE INSIDE THE SNAP DISTANCE
+SNAP_PRIORITY = {ENDPOINT:0,MIDPOINT:1}
+
+MAX_PENDING_POINTS = 64
+
+#POINTS CLOSER THAN THIS TO THE EXCLUDED POINT ARE NEVER SNAPPED TO
+EXCLUDE_DISTANCE = .0001
+
+def get_wall_endpoints(obj_bp,obj_x):
+    """
+    returns the world space start and end of a wall
+
+    **Parameters:**
+
+    * **obj_bp** (bpy.types.Object) - Wall base point
+    * **obj_x** (bpy.types.Object) - Wall x dimension
+
+    **Returns:** (mathutils.Vector, mathutils.Vector)
+    """
+    return obj_bp.matrix_world.to_translation(), obj_x.matrix_world.to_translation()
+
+def snap_to_grid(co,grid_size):
+    """
+    rounds the x and y of a point to the closest grid line
+
+    **Parameters:**
+
+    * **co** (mathutils.Vector) - Point to snap
+    * **grid_size** (float) - Distance between grid lines
+
+    **Returns:** mathutils.Vector
+    """
+    if grid_size <= 0:
+        return Vector(co)
+    return Vector((round(co[0] / grid_size) * grid_size,
+                   round(co[1] / grid_size) * grid_size,
+                   co[2]))
+
+class Wall_Snap_Index(object):
+    """
+    Stores the snap points of all of the walls in a scene.
+    """
+
+    def __init__(self):
+        self.points = []
+        self.kinds = []
+        self.tree = None
+        self.tree_size = 0
+
+    def clear(self):
+        self.points = []
+        self.kinds = []
+        self.tree = None
+        self.tree_size = 0
+
+    def add_point(self,co,kind):
+        self.points.append(Vector(co))
+        self.kinds.append(kind)
+        if len(self.points) - self.tree_size > MAX_PENDING_POINTS:
+            self.balance()
+
+    def add_wall(self,start,end):
+        """
+        adds the start, end and middle of a wall to the index
+
+        **Parameters:**
+
+        * **start** (mathutils.Vector) - World location of the start of the wall
+        * **end** (mathutils.Vector) - World location of the end of the wall
+        """
+        start = Vector(start)
+        end = Vector(end)
+        self.add_point(start,ENDPOINT)
+        self.add_point(end,ENDPOINT)
+        self.add_point((start + end) / 2,MIDPOINT)
+
+    def build(self,walls):
+        """
+        clears the index and adds all of the walls
+
+        **Parameters:**
+
+        * **walls** (list of (wall base point, wall x dimension))
+          Walls without an x dimension are skipped.
+        """
+        self.clear()
+        for obj_bp, obj_x in walls:
+            if obj_x is None:
+                continue
+            start, end = get_wall_endpoints(obj_bp,obj_x)
+            self.points.extend((start,end,(start + end) / 2))
+            self.kinds.extend((ENDPOINT,ENDPOINT,MIDPOINT))
+        self.balance()
+
+    def balance(self):
+        """
+        rebuilds the KD-tree from every point so the pending list is empty
+        """
+        self.tree = kdtree.KDTree(len(self.points))
+        for index, co in enumerate(self.points):
+            self.tree.insert(co,index)
+        self.tree.balance()
+        self.tree_size = len(self.points)
+
+    def is_excluded(self,index,exclude):
+        return exclude is not None and (self.points[index] - exclude).length < EXCLUDE_DISTANCE
+
+    def find(self,co,distance,kinds={ENDPOINT,MIDPOINT},exclude=None):
+        """
+        finds the snap point closest to a location
+
+        **Parameters:**
+
+        * **co** (mathutils.Vector) - Location to snap
+        * **distance** (float) - Only points inside this distance are returned
+        * **kinds** (set, (optional)) - The kinds of points to snap to
+        * **exclude** (mathutils.Vector, (optional)) - Points at this location are skipped.
+          This is used so the wall that is being drawn doesn't snap to its own start.
+
+        **Returns:** (mathutils.Vector, string) or (None, None) if nothing is close
+        """
+        best_key = None
+        best_index = None
+
+        if self.tree is not None and self.tree_size > 0:
+            for point, index, dist in self.tree.find_range(co,distance):
+                if self.kinds[index] in kinds and not self.is_excluded(index,exclude):
+                    key = (SNAP_PRIORITY[self.kinds[index]],dist)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best_index = index
+
+        for index in range(self.tree_size,len(self.points)):
+            if self.kinds[index] in kinds and not self.is_excluded(index,exclude):
+                dist = (self.points[index] - co).length
+                if dist <= distance:
+                    key = (SNAP_PRIORITY[self.kinds[index]],dist)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best_index = index
+
+        if best_index is None:
+            return None, None
+        return self.points[best_index].copy(), self.kinds[best_index]
+
+def get_snap_kinds(props):
+    """
+    returns the kinds of points that are turned on in the room builder props
+
+    **Parameters:**
+
+    * **props** (PROPS_Room_Builder) - Room builder scene props
+
+    **Returns:** set
+    """
+    kinds = set()
+    if props.snap_to_endpoints:
+        kinds.add(ENDPOINT)
+    if props.snap_to_midpoints:
+        kinds.add(MIDPOINT)
+    return kinds
+
+def snap_point(snap_index,co,props,exclude=None):
+    """
+    snaps a point to the walls in the snap index or to the grid
+    using the room builder snap settings. Wall points are used before the grid.
+
+    **Parameters:**
+
+    * **snap_index** (Wall_Snap_Index) - Index of the wall points
+    * **co** (mathutils.Vector) - Point to snap
+    * **props** (PROPS_Room_Builder) - Room builder scene props
+    * **exclude** (mathutils.Vector, (optional)) - Wall points at this location are skipped
+
+    **Returns:** (mathutils.Vector, string) the snap kind is None if the point didn't move
+    """
+    co = Vector(co)
+    if not props.use_snapping:
+        return co, None
+
+    kinds = get_snap_kinds(props)
+    if kinds:
+        snapped_co, kind = snap_index.find(co,props.snap_distance,kinds,Vector(exclude) if exclude is not None else None)
+        if snapped_co is not None:
+            return snapped_co, kind
+
+    if props.snap_to_grid:
+        return snap_to_grid(co,props.grid_size), GRID
+
+    return co, None
+
+def draw_snap_options(layout,props):
+    row = layout.row(align=True)
+    row.prop(props,"use_snapping",text="Snap",icon='SNAP_ON' if props.use_snapping else 'SNAP_OFF')
+    row.prop(props,"snap_to_endpoints",text="Endpoints")
+    row.prop(props,"snap_to_midpoints",text="Midpoints")
+    row.prop(props,"snap_to_grid",text="Grid")
+    row = layout.row(align=True)
+    row.prop(props,"snap_distance",text="Snap Distance")
+    row.prop(props,"grid_size",text="Grid Size")
@@ -0,0 +1,101 @@
+"""
+Worker script for the batch thumbnail renderer. This is run by thumbnails.py with
+
+    blender --background --factory-startup --python thumbnail_worker.py -- queue.json
+
+Each item is the path to a .blend file. The objects in the file are appended
+into an empty scene, the camera is fit to the meshes and a PNG with the same
+name is rendered next to the .blend file.
+
+"""
+
+import bpy
+import math
+import mathutils
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+from batch import run_worker
+
+#CAMERA LOOKS AT THE FRONT OF THE ASSEMBLY FROM THE LEFT AND ABOVE
+CAMERA_ROTATION = (math.radians(65),0,math.radians(-30))
+
+#DISTANCE ADDED AROUND THE FIT SO THE ASSEMBLY DOESN'T TOUCH THE EDGE OF THE IMAGE
+CAMERA_MARGIN = 1.1
+
+def clear_scene(scene):
+    for obj in list(scene.objects):
+        scene.objects.unlink(obj)
+    for collection in (bpy.data.groups,bpy.data.objects,bpy.data.meshes,bpy.data.curves,bpy.data.materials,
+                       bpy.data.textures,bpy.data.images,bpy.data.cameras,bpy.data.lamps):
+        for datablock in list(collection):
+            if datablock.users == 0:
+                collection.remove(datablock)
+
+def set_render_settings(scene,options):
+    render = scene.render
+    render.engine = options.get("engine",'BLENDER_RENDER')
+    render.resolution_x = options.get("resolution",128)
+    render.resolution_y = options.get("resolution",128)
+    render.resolution_percentage = 100
+    render.use_file_extension = True
+    render.image_settings.file_format = 'PNG'
+    render.image_settings.color_mode = 'RGBA'
+    if render.engine == 'CYCLES':
+        scene.cycles.samples = options.get("samples",16)
+        scene.cycles.preview_samples = options.get("samples",16)
+        scene.cycles.film_transparent = True
+    else:
+        render.alpha_mode = 'TRANSPARENT'
+        render.use_raytrace = False
+        render.use_shadows = False
+        render.use_sss = False
+        render.use_envmap = False
+        render.antialiasing_samples = '5'
+    if scene.world:
+        scene.world.light_settings.use_environment_light = True
+
+def get_mesh_coords(scene):
+    """ Returns: list of floats - The x,y,z of the bounding box corners of every mesh
+    """
+    coords = []
+    for obj in scene.objects:
+        if obj.type == 'MESH' and not obj.hide_render:
+            for corner in obj.bound_box:
+                coords.extend(obj.matrix_world * mathutils.Vector(corner))
+    return coords
+
+def render_thumbnail(path,options):
+    scene = bpy.context.scene
+    clear_scene(scene)
+
+    with bpy.data.libraries.load(path,False,False) as (data_from, data_to):
+        data_to.objects = data_from.objects
+    for obj in data_to.objects:
+        if obj is not None:
+            scene.objects.link(obj)
+
+    coords = get_mesh_coords(scene)
+    if not coords:
+        raise ValueError("No meshes to render in " + path)
+
+    camera = bpy.data.objects.new("Thumbnail Camera",bpy.data.cameras.new("Thumbnail Camera"))
+    scene.objects.link(camera)
+    camera.rotation_euler = CAMERA_ROTATION
+    scene.camera = camera
+
+    lamp = bpy.data.objects.new("Thumbnail Lamp",bpy.data.lamps.new("Thumbnail Lamp",'SUN'))
+    scene.objects.link(lamp)
+    lamp.rotation_euler = CAMERA_ROTATION
+
+    scene.update()
+    location, scale = camera.camera_fit_coords(scene,coords)
+    center = mathutils.Vector((sum(coords[0::3]),sum(coords[1::3]),sum(coords[2::3]))) / (len(coords) / 3)
+    camera.location = center + (location - center) * CAMERA_MARGIN
+
+    set_render_settings(scene,options)
+    scene.render.filepath = os.path.splitext(path)[0] + ".png"
+    bpy.ops.render.render(write_still=True)
+
+run_worker(render_thumbnail)
@@ -0,0 +1,123 @@
+"""
+This module renders the thumbnails for a library folder in parallel.
+
+Every .blend file that doesn't have a PNG or has a PNG that is older than
+the .blend file is rendered by thumbnail_worker.py. The files are split
+between one background Blender process for each CPU core. The PNGs are saved
+next to the .blend files so get_image_enum_previews shows them.
+
+"""
+
+import bpy
+import os
+from . import batch
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__),"thumbnail_worker.py")
+ASSET_DIR = os.path.join(os.path.dirname(__file__),"assets")
+
+def get_thumbnail_path(path):
+    return os.path.splitext(path)[0] + ".png"
+
+def needs_thumbnail(path):
+    """ Returns: True if the .blend file doesn't have a PNG or the PNG is older than the .blend file
+    """
+    thumbnail_path = get_thumbnail_path(path)
+    if not os.path.exists(thumbnail_path):
+        return True
+    return os.path.getmtime(thumbnail_path) < os.path.getmtime(path)
+
+def find_blend_files(path,overwrite=False):
+    """
+    finds the .blend files in a library folder and all of its sub folders
+
+    **Parameters:**
+
+    * **path** (string) - The library folder
+    * **overwrite** (boolean, (optional)) - Include files that already have an up to date PNG
+
+    **Returns:** sorted list of paths
+    """
+    paths = []
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            if file.lower().endswith(".blend"):
+                blend_path = os.path.join(root,file)
+                if overwrite or needs_thumbnail(blend_path):
+                    paths.append(blend_path)
+    return sorted(paths)
+
+def get_thumbnail_job(paths,resolution=128,engine='BLENDER_RENDER',samples=16,processes=0):
+    """
+    creates the job that renders the thumbnails for a list of .blend files
+
+    **Parameters:**
+
+    * **paths** (list of strings) - .blend files
+    * **resolution** (int, (optional)) - Width and height of the PNG
+    * **engine** (string, (optional)) - BLENDER_RENDER or CYCLES
+    * **samples** (int, (optional)) - Cycles samples
+    * **processes** (int, (optional)) - Number of Blender processes. 0 uses every CPU core.
+
+    **Returns:** batch.Batch_Job - Call start then poll until is_finished returns True
+    """
+    return batch.Batch_Job(WORKER_SCRIPT,
+                           paths,
+                           options={"resolution":resolution,"engine":engine,"samples":samples},
+                           processes=min(batch.get_worker_count(processes),max(1,len(paths))),
+                           factory_startup=True)
+
+def reload_previews():
+    """ Recreates the preview collections so the new thumbnails are loaded
+    """
+    from .room_designer import preview_collections, create_image_preview_collection
+    for key in list(preview_collections.keys()):
+        bpy.utils.previews.remove(preview_collections[key])
+        preview_collections[key] = create_image_preview_collection()
+
+class OPS_render_thumbnails(batch.Batch_Operator,bpy.types.Operator):
+    bl_idname = "room_builder.render_thumbnails"
+    bl_label = "Render Library Thumbnails"
+    bl_description = "Renders the thumbnails for every .blend file in a library folder using every CPU core"
+
+    directory = bpy.props.StringProperty(name="Library Folder",subtype='DIR_PATH')
+    overwrite = bpy.props.BoolProperty(name="Overwrite",description="Render files that already have an up to date thumbnail",default=False)
+    resolution = bpy.props.IntProperty(name="Resolution",default=128,min=16,max=1024)
+    engine = bpy.props.EnumProperty(name="Render Engine",
+                                    items=[('BLENDER_RENDER',"Blender Render","Fastest"),
+                                           ('CYCLES',"Cycles","Slower but looks better")],
+                                    default='BLENDER_RENDER')
+    samples = bpy.props.IntProperty(name="Samples",default=16,min=1)
+    processes = bpy.props.IntProperty(name="Processes",description="Number of Blender processes to start. 0 uses every CPU core",default=0,min=0)
+
+    job_label = "Rendering Thumbnails"
+
+    def execute(self,context):
+        paths = find_blend_files(self.directory,self.overwrite)
+        if not paths:
+            self.report({'INFO'},"All thumbnails are up to date")
+            return {'FINISHED'}
+        return self.start_job(context,get_thumbnail_job(paths,self.resolution,self.engine,self.samples,self.processes))
+
+    def job_finished(self,context):
+        reload_previews()
+
+    def invoke(self,context,event):
+        if not self.directory:
+            self.directory = ASSET_DIR
+        return context.window_manager.invoke_props_dialog(self,width=400)
+
+    def draw(self,context):
+        layout = self.layout
+        layout.prop(self,'directory')
+        layout.prop(self,'overwrite')
+        layout.prop(self,'resolution')
+        layout.prop(self,'engine')
+        if self.engine == 'CYCLES':
+            layout.prop(self,'samples')
+        layout.prop(self,'processes')
+
+def register():
+    bpy.utils.register_class(OPS_render_thumbnails)
+
+def unregister():
+    bpy.utils.unregister_class(OPS_render_thumbnails)
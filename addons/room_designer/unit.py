@@ -2,6 +2,7 @@
 Common Unit Conversion Functions
 '''
 import bpy
+import re
 from decimal import Decimal
 
 def inch(inch):
@@ -49,3 +50,179 @@ def decimal_inch_to_millimeter(inch):
 
 def draw_dollar_price(value):
     return  "$" + str(round(value,2))
+
+#-------LENGTH PARSER
+
+LENGTH_UNITS = {"'":0.3048,
+                "ft":0.3048,
+                '"':0.0254,
+                "in":0.0254,
+                "mm":0.001,
+                "cm":0.01,
+                "m":1.0}
+
+LENGTH_TOKEN = re.compile(r"\s*(?:(\d+/\d+|\d+\.?\d*|\.\d+)|(mm|cm|m|ft|in|'|\")|([-+*/()]))")
+
+#(TEXT, UNIT SYSTEM) -> METERS
+parsed_lengths = {}
+
+def tokenize_length(text):
+    """ Splits a typed length into ('NUMBER',float), ('FRACTION',float), 
+        ('UNIT',meters) and ('OP',str) tokens
+    """
+    tokens = []
+    text = text.strip()
+    pos = 0
+    while pos < len(text):
+        match = LENGTH_TOKEN.match(text,pos)
+        if not match or match.end() == pos:
+            raise ValueError("Invalid length: " + text)
+        number, unit_name, op = match.groups()
+        if number is not None:
+            if "/" in number:
+                numerator, denominator = number.split("/")
+                if float(denominator) == 0:
+                    raise ValueError("Division by zero: " + text)
+                tokens.append(('FRACTION',float(numerator) / float(denominator)))
+            else:
+                tokens.append(('NUMBER',float(number)))
+        elif unit_name is not None:
+            tokens.append(('UNIT',LENGTH_UNITS[unit_name]))
+        else:
+            tokens.append(('OP',op))
+        pos = match.end()
+    return tokens
+
+class LengthParser(object):
+    """
+    Recursive descent parser for typed lengths. Values are stored as
+    (value, is_length). Numbers without a unit are plain numbers until 
+    they are added to a length or returned, then the default unit is used.
+    """
+    
+    def __init__(self,tokens,default_unit):
+        self.tokens = tokens
+        self.pos = 0
+        self.default_unit = default_unit
+    
+    def peek(self,offset=0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return (None,None)
+    
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+    
+    def to_length(self,value):
+        return value[0] if value[1] else value[0] * self.default_unit
+    
+    def parse(self):
+        value = self.expression()
+        if self.pos != len(self.tokens):
+            raise ValueError("Unexpected token")
+        return self.to_length(value)
+    
+    def expression(self):
+        value = self.term()
+        while self.peek() in (('OP','+'),('OP','-')):
+            op = self.next()[1]
+            right = self.term()
+            if value[1] or right[1]:
+                left_length = self.to_length(value)
+                right_length = self.to_length(right)
+                value = (left_length + right_length if op == '+' else left_length - right_length,True)
+            else:
+                value = (value[0] + right[0] if op == '+' else value[0] - right[0],False)
+        return value
+    
+    def term(self):
+        value = self.factor()
+        while self.peek() in (('OP','*'),('OP','/')):
+            op = self.next()[1]
+            right = self.factor()
+            if op == '*':
+                if value[1] and right[1]:
+                    raise ValueError("Can't multiply two lengths")
+                value = (value[0] * right[0],value[1] or right[1])
+            else:
+                if right[0] == 0:
+                    raise ValueError("Division by zero")
+                if right[1] and not value[1]:
+                    raise ValueError("Can't divide a number by a length")
+                # A LENGTH DIVIDED BY A LENGTH IS A PLAIN NUMBER
+                value = (value[0] / right[0],value[1] and not right[1])
+        return value
+    
+    def factor(self):
+        kind, token = self.peek()
+        if (kind, token) in (('OP','-'),('OP','+')):
+            self.next()
+            value = self.factor()
+            return (-value[0],value[1]) if token == '-' else value
+        if (kind, token) == ('OP','('):
+            self.next()
+            value = self.expression()
+            if self.next() != ('OP',')'):
+                raise ValueError("Missing )")
+            return self.apply_unit(value)
+        if kind in ('NUMBER','FRACTION'):
+            return self.quantity()
+        raise ValueError("Expected a number")
+    
+    def apply_unit(self,value):
+        if self.peek()[0] == 'UNIT':
+            if value[1]:
+                raise ValueError("Unit used twice")
+            return (value[0] * self.next()[1],True)
+        return value
+    
+    def quantity(self):
+        """ Reads numbers that are written next to each other
+            ex. 10'6 1/2" = 10 feet + 6 1/2 inches
+            A - between feet and inches is a separator so 10'-6" is 10'6".
+            Only inches can follow feet.
+        """
+        length = 0.0
+        bare_unit = None
+        while True:
+            kind, number = self.next()
+            if kind == 'NUMBER' and self.peek()[0] == 'FRACTION':
+                # MIXED FRACTION ex. 6 1/2
+                number += self.next()[1]
+            if self.peek()[0] == 'UNIT':
+                unit_length = self.next()[1]
+                if bare_unit and unit_length != bare_unit:
+                    raise ValueError("Only inches can follow feet")
+            elif bare_unit:
+                unit_length = bare_unit
+            else:
+                return (number,False)
+            length += number * unit_length
+            # NUMBERS AFTER FEET ARE INCHES
+            bare_unit = LENGTH_UNITS['"'] if unit_length == LENGTH_UNITS["'"] else None
+            if bare_unit and self.peek() == ('OP','-') and self.peek(1)[0] in ('NUMBER','FRACTION'):
+                # FEET AND INCHES SEPARATOR ex. 10'-6"
+                self.next()
+            if bare_unit is None or self.peek()[0] not in ('NUMBER','FRACTION'):
+                return (length,True)
+
+def parse_length(text,unit_system='IMPERIAL'):
+    """ Converts a typed length to meters without using eval.
+        Supports feet and inches (10'6" or 10'-6"), fractions (6 1/2), metric units (mm, cm, m)
+        and + - * / with parentheses. Numbers without a unit are inches 
+        for the imperial system and millimeters for the metric system.
+        Raises ValueError if the text is not a valid length.
+    """
+    key = (text,unit_system)
+    if key in parsed_lengths:
+        return parsed_lengths[key]
+    
+    default_unit = LENGTH_UNITS["mm"] if unit_system == 'METRIC' else LENGTH_UNITS['"']
+    meters = LengthParser(tokenize_length(text),default_unit).parse()
+    
+    if len(parsed_lengths) > 1000:
+        parsed_lengths.clear()
+    parsed_lengths[key] = meters
+    return meters
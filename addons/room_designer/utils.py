@@ -3,6 +3,7 @@ Utility Functions
 '''
 
 import bpy
+import ast
 import bmesh
 import inspect
 import math
@@ -12,6 +13,7 @@ import sys
 import bgl
 import blf
 from bpy_extras import view3d_utils, object_utils
+from bpy.app.handlers import persistent
 from . import unit
 import bpy_extras.image_utils as img_utils
 import time
@@ -19,6 +21,10 @@ from decimal import *
 
 LIBRARY_PATH_FILENAME = "fd_paths.xml"
 
+#OBJECT POINTER -> (OBJECT NAME, INPUTS THE OBJECT WAS LAST INITIALIZED WITH)
+#THIS IS ONLY KEPT WHILE BLENDER IS RUNNING SO IT IS NEVER SAVED INTO A LIBRARY
+init_signatures = {}
+
 #-------OBJECT FUNCTIONS
 
 def create_cube_mesh(name,size):
@@ -114,6 +120,7 @@ def delete_obj_list(obj_list):
     """ This function deletes every object in the list
     """
     bpy.ops.object.select_all(action='DESELECT')
+    remove_from_driver_index(obj_list)
     for obj in obj_list:
         if obj.animation_data:
             for driver in obj.animation_data.drivers:
@@ -132,15 +139,24 @@ def delete_obj_list(obj_list):
 #   HOPEFULLY THE do_unlink PARAMETER WORKS
     for obj in obj_list:
         bpy.data.objects.remove(obj,do_unlink=True)
+    
+    set_driver_index_object_count()
         
 def delete_object_and_children(obj_bp):
     """ Deletes a object and all it's children
+        Returns: List of (Object, FCurve) - Drivers outside of obj_bp that 
+                 used the deleted objects and are now broken
     """
+    broken_drivers = get_external_driver_dependents(get_child_objects(obj_bp))
+    delete_children(obj_bp)
+    return broken_drivers
+
+def delete_children(obj_bp):
     obj_list = []
     obj_list.append(obj_bp)
     for child in obj_bp.children:
         if len(child.children) > 0:
-            delete_object_and_children(child)
+            delete_children(child)
         else:
             obj_list.append(child)
     delete_obj_list(obj_list)
@@ -189,46 +205,118 @@ def set_object_name(obj):
     else:
         obj.name = counter + '.' + obj.type + '.' + obj.mv.name_object
 
-def assign_materials_from_pointers(obj):
-    library = bpy.context.scene.mv
-    spec_group = library.spec_groups[obj.cabinetlib.spec_group_index]
+class MaterialCache:
+    """ Stores spec group pointer lookups and resolved materials so assigning
+        materials to a whole product only resolves each material once.
+        Pass the same instance to assign_materials_from_pointers for every object.
+    """
+    
+    def __init__(self):
+        self.pointer_tables = {}
+        self.table_signatures = {}
+        self.materials = {}
+    
+    def get_pointer_table(self,spec_group_index):
+        """ Returns: Dictionary - The pointers in the spec group stored in python dictionaries
+            cutparts: Name -> (core, top, bottom)
+            edgeparts: Name -> material pointer name
+            materials: Name -> (library name, category name, item name)
+        """
+        if spec_group_index in self.pointer_tables:
+            return self.pointer_tables[spec_group_index]
+        
+        spec_group = bpy.context.scene.mv.spec_groups[spec_group_index]
+        table = None
+        if spec_group:
+            table = {'cutparts':{},'edgeparts':{},'materials':{}}
+            for cutpart in spec_group.cutparts:
+                table['cutparts'][cutpart.name] = (cutpart.core,cutpart.top,cutpart.bottom)
+            for edgepart in spec_group.edgeparts:
+                table['edgeparts'][edgepart.name] = edgepart.material
+            for pointer in spec_group.materials:
+                table['materials'][pointer.name] = (pointer.library_name,pointer.category_name,pointer.item_name)
+        self.pointer_tables[spec_group_index] = table
+        return table
+    
+    def get_table_signature(self,spec_group_index):
+        """ Returns: String - A repr of the pointer table that changes when any
+            pointer in the spec group changes
+        """
+        if spec_group_index not in self.table_signatures:
+            table = self.get_pointer_table(spec_group_index)
+            if table:
+                self.table_signatures[spec_group_index] = repr([sorted(table[key].items()) for key in ('cutparts','edgeparts','materials')])
+            else:
+                self.table_signatures[spec_group_index] = ""
+        return self.table_signatures[spec_group_index]
+    
+    def get_material(self,library_name,category_name,item_name):
+        """ Returns: bpy.types.Material or None
+            Only calls get_material the first time a material is requested
+        """
+        key = (library_name,category_name,item_name)
+        if key in self.materials:
+            mat_name = self.materials[key]
+            if mat_name is None:
+                return None
+            if mat_name in bpy.data.materials:
+                return bpy.data.materials[mat_name]
+        
+        material = get_material((library_name,category_name),item_name)
+        self.materials[key] = material.name if material else None
+        return material
+
+def set_slot_pointer(slot,pointer_name,table):
+    """ Sets the pointer name on a cabinetlib material slot and copies the
+        material location from the pointer table.
+    """
+    if slot.pointer_name != pointer_name:
+        slot.pointer_name = pointer_name
+    if pointer_name in table['materials']:
+        library_name, category_name, item_name = table['materials'][pointer_name]
+        if slot.library_name != library_name:
+            slot.library_name = library_name
+        if slot.category_name != category_name:
+            slot.category_name = category_name
+        if slot.item_name != item_name:
+            slot.item_name = item_name
+
+def assign_materials_from_pointers(obj,material_cache=None):
+    """ Assigns the materials to the object from the spec group pointers.
+        When assigning materials to many objects pass in a MaterialCache
+        so the pointers and materials are only looked up once.
+        Returns: Boolean - True if a material was found for every slot
+    """
+    if material_cache is None:
+        material_cache = MaterialCache()
+    table = material_cache.get_pointer_table(obj.cabinetlib.spec_group_index)
     #ASSIGN POINTERS TO MESH BASED ON MESH TYPE
     if obj.cabinetlib.type_mesh == 'CUTPART':
         
-        if spec_group:
-            if obj.cabinetlib.cutpart_name in spec_group.cutparts:
-                cutpart = spec_group.cutparts[obj.cabinetlib.cutpart_name]
+        if table:
+            if obj.cabinetlib.cutpart_name in table['cutparts']:
+                core, top, bottom = table['cutparts'][obj.cabinetlib.cutpart_name]
+                edge_material = table['edgeparts'].get(obj.cabinetlib.edgepart_name)
                 for index, slot in enumerate(obj.cabinetlib.material_slots):
                     if slot.name == 'Core':
-                        slot.pointer_name = cutpart.core
+                        pointer_name = core
                     elif slot.name in {'Top','Exterior'}:
-                        slot.pointer_name = cutpart.top
+                        pointer_name = top
                     elif slot.name in {'Bottom','Interior'}:
-                        slot.pointer_name = cutpart.bottom
+                        pointer_name = bottom
+                    elif edge_material is not None:
+                        pointer_name = edge_material
                     else:
-                        if obj.cabinetlib.edgepart_name in spec_group.edgeparts:
-                            edgepart = spec_group.edgeparts[obj.cabinetlib.edgepart_name]
-                            slot.pointer_name = edgepart.material
-
-                    if slot.pointer_name in spec_group.materials:
-                        material_pointer = spec_group.materials[slot.pointer_name]
-                        slot.library_name = material_pointer.library_name
-                        slot.category_name = material_pointer.category_name
-                        slot.item_name = material_pointer.item_name
+                        pointer_name = slot.pointer_name
+                    set_slot_pointer(slot,pointer_name,table)
 
     elif obj.cabinetlib.type_mesh == 'EDGEBANDING':
         obj.show_bounds = False
-        if spec_group:
-            if obj.cabinetlib.edgepart_name in spec_group.edgeparts:
-                edgepart = spec_group.edgeparts[obj.cabinetlib.edgepart_name]
+        if table:
+            if obj.cabinetlib.edgepart_name in table['edgeparts']:
+                edge_material = table['edgeparts'][obj.cabinetlib.edgepart_name]
                 for index, slot in enumerate(obj.cabinetlib.material_slots):
-                    slot.pointer_name = edgepart.material
-
-                    if slot.pointer_name in spec_group.materials:
-                        material_pointer = spec_group.materials[slot.pointer_name]
-                        slot.library_name = material_pointer.library_name
-                        slot.category_name = material_pointer.category_name
-                        slot.item_name = material_pointer.item_name
+                    set_slot_pointer(slot,edge_material,table)
 
     elif obj.cabinetlib.type_mesh == 'MACHINING':
         # MAKE A SIMPLE BLACK MATERIAL FOR MACHINING
@@ -238,21 +326,19 @@ def assign_materials_from_pointers(obj):
             slot.item_name = "Gloss Black Plastic"
             
     else:
-        if spec_group:
+        if table:
             for index, slot in enumerate(obj.cabinetlib.material_slots):
-                if slot.pointer_name in spec_group.materials:
-                    material_pointer = spec_group.materials[slot.pointer_name]
-                    slot.library_name = material_pointer.library_name
-                    slot.category_name = material_pointer.category_name
-                    slot.item_name = material_pointer.item_name
+                set_slot_pointer(slot,slot.pointer_name,table)
 
     #RETRIEVE MATERIAL FROM CATEGORY NAME AND ITEM NAME AND ASSIGN TO SLOT
+    found_all = True
     for index, slot in enumerate(obj.cabinetlib.material_slots):
-        material = get_material((slot.library_name,slot.category_name),slot.item_name)
+        material = material_cache.get_material(slot.library_name,slot.category_name,slot.item_name)
         if material:
-            obj.material_slots[index].material = material
+            if obj.material_slots[index].material != material:
+                obj.material_slots[index].material = material
         else:
-            pass
+            found_all = False
 #             print("MATERIAL NOT FOUND",slot.library_name,slot.category_name,slot.item_name,obj.mv.name_object)
 
     #MAKE SURE OBJECT IS TEXTURED
@@ -260,6 +346,7 @@ def assign_materials_from_pointers(obj):
         obj.draw_type = 'WIRE'
     else:
         obj.draw_type = 'TEXTURED'
+    return found_all
 
 def get_child_objects(obj,obj_list=None):
     """ Returns: List of Objects
@@ -427,14 +514,19 @@ def get_selection_point(context, event, ray_max=10000.0,objects=None,floor=None)
                         
     return best_hit, best_obj
 
-def get_material_name(obj):
+def get_material_name(obj,thickness=None):
+    """ Returns the name of the material used for the cutlist.
+        Pass in the part thickness if it is already known so it isn't looked up again.
+    """
     if obj.cabinetlib.type_mesh in {'CUTPART','EDGEBANDING'}:
         #IF mv.cutpart_material_name IS SET THEN RETURN THAT VALUE
         #THIS IS USED FOR USERS WHO WANT TO CONTROL THE NAME
         #OF THE MATERIAL THAT GETS EXPORTED 
         if obj.mv.cutpart_material_name != "":
             return obj.mv.cutpart_material_name
-        thickness = str(round(unit.meter_to_active_unit(get_part_thickness(obj)),4))
+        if thickness is None:
+            thickness = get_part_thickness(obj)
+        thickness = str(round(unit.meter_to_active_unit(thickness),4))
         core = ""
         exterior = ""
         interior = ""
@@ -463,28 +555,60 @@ def get_material_name(obj):
 #         thickness = str(round(unit.meter_to_active_unit(get_part_thickness(obj)),4))
 #         return thickness + " " + obj.mv.solid_stock
 
+#ASSEMBLY POINTER -> VPDIMZ CHILD
+#THE POINTER DOESN'T CHANGE WHEN THE ASSEMBLY IS RENAMED
+assembly_z_dim_cache = {}
+
+def get_assembly_z_dim(obj_bp):
+    """ Returns: The VPDIMZ child of an assembly or None
+        The children are only searched the first time an assembly is used.
+        The cached child is checked every time so a child that was removed,
+        moved to another assembly or replaced is found again.
+    """
+    pointer = obj_bp.as_pointer()
+    child = assembly_z_dim_cache.get(pointer)
+    if child is not None:
+        try:
+            if child.parent == obj_bp and child.mv.type == 'VPDIMZ':
+                return child
+        except ReferenceError:
+            pass
+        del assembly_z_dim_cache[pointer]
+    for child in obj_bp.children:
+        if child.mv.type == 'VPDIMZ':
+            assembly_z_dim_cache[pointer] = child
+            return child
+
 def get_part_thickness(obj):
+    """ Returns the thickness of a cutpart, edgebanding, solid stock or buyout part.
+        The thickness is read every time so it is never out of date. Only the 
+        search for the VPDIMZ child of the assembly is cached.
+    """
     if obj.cabinetlib.type_mesh == 'CUTPART':
         spec_group = bpy.context.scene.mv.spec_groups[obj.cabinetlib.spec_group_index]
         if obj.cabinetlib.cutpart_name in spec_group.cutparts:
             return spec_group.cutparts[obj.cabinetlib.cutpart_name].thickness
         else:
             if obj.parent:
-                for child in obj.parent.children:
-                    if child.mv.type == 'VPDIMZ':
-                        return math.fabs(child.location.z)
+                obj_z = get_assembly_z_dim(obj.parent)
+                if obj_z:
+                    return math.fabs(obj_z.location.z)
                     
     if obj.cabinetlib.type_mesh in {'SOLIDSTOCK','BUYOUT'}:
         if obj.parent:
-            for child in obj.parent.children:
-                if child.mv.type == 'VPDIMZ':
-                    return math.fabs(child.location.z)
+            obj_z = get_assembly_z_dim(obj.parent)
+            if obj_z:
+                return math.fabs(obj_z.location.z)
                 
     if obj.cabinetlib.type_mesh == 'EDGEBANDING':
         for mod in obj.modifiers:
             if mod.type == 'SOLIDIFY':
                 return mod.thickness
 
+@persistent
+def part_thickness_load_post(dummy):
+    assembly_z_dim_cache.clear()
+
 def format_material_name(thickness,core,exterior,interior):
     if core == exterior:
         exterior = "-"
@@ -573,6 +697,27 @@ def get_library_dir(lib_type = ""):
     else:
         return os.path.join(root_path,lib_type)
 
+#(LIBRARY, CATEGORY, ITEM) -> (SEARCH DIRECTORY, MODIFIED TIME) FOR MATERIALS THAT WERE NOT FOUND
+missing_materials = {}
+
+def get_modified_time(path):
+    """ Returns the modified time of a file or directory or None if it doesn't exist
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def get_missing_materials():
+    """ Returns: List of (library, category, item) for the materials that couldn't be found
+    """
+    return sorted(missing_materials.keys())
+
+def clear_missing_materials():
+    """ Forgets every material that wasn't found so they are searched for again
+    """
+    missing_materials.clear()
+
 def get_material(folders,material_name):
     if material_name in bpy.data.materials:
         return bpy.data.materials[material_name]
@@ -586,6 +731,13 @@ def get_material(folders,material_name):
     for folder in folders:
         search_directory = os.path.join(search_directory,folder)
 
+    # Don't search again for a material that wasn't found unless files 
+    # have been added, removed or renamed in the search directory
+    key = tuple(folders) + (material_name,)
+    search_state = (search_directory,get_modified_time(search_directory))
+    if missing_materials.get(key) == search_state:
+        return None
+
     if os.path.isdir(search_directory):
         files = os.listdir(search_directory)
         possible_files = []
@@ -606,8 +758,13 @@ def get_material(folders,material_name):
                         break
       
             for mat in data_to.materials:
+                missing_materials.pop(key,None)
                 return mat
 
+    if key not in missing_materials:
+        print("MATERIAL NOT FOUND",*key)
+    missing_materials[key] = search_state
+
 def get_library_scripts_dir(context):
     """ Returns: List of Strings (FolderPath) 
     Gets all of the directories to the fluid designer library packages
@@ -774,15 +931,17 @@ def get_insert_class_name(class_name):
     name = class_name.replace("INSERT_","")
     return name.replace("_"," ")
 
-def set_wireframe(obj,make_wire=True):
+def set_wireframe(obj,make_wire=True,material_cache=None):
+    if material_cache is None:
+        material_cache = MaterialCache()
     obj.show_x_ray = make_wire
     if make_wire:
         obj.draw_type = 'WIRE'
     else:
         obj.draw_type = 'TEXTURED'
-        assign_materials_from_pointers(obj)
+        assign_materials_from_pointers(obj,material_cache)
     for child in obj.children:
-        set_wireframe(child, make_wire)
+        set_wireframe(child, make_wire, material_cache)
 
 #-------MATH FUNCTIONS
 def calc_distance(point1,point2):
@@ -925,41 +1084,134 @@ def get_insert_bp_list(obj_bp,insert_list):
         insert_list.sort(key=lambda obj: obj.location.z, reverse=True)
     return insert_list
 
-def init_objects(obj_bp):
+def get_init_signature(obj,material_cache):
+    """ Returns: Tuple - Everything init_objects reads from the object.
+        If this doesn't change the object doesn't need to be initialized again.
+        The values that init_objects writes are not read, only the name is 
+        checked so an object that was renamed is initialized again.
+    """
+    mv = obj.mv
+    signature = (obj.type,mv.type,mv.type_group,mv.name_object,mv.item_number,mv.use_as_bool_obj,
+                 obj.cabinetlib.type_mesh,obj.parent.mv.name_object if obj.parent else None)
+    if obj.type == 'MESH':
+        cabinetlib = obj.cabinetlib
+        signature += (cabinetlib.spec_group_index,cabinetlib.cutpart_name,cabinetlib.edgepart_name,
+                      material_cache.get_table_signature(cabinetlib.spec_group_index),
+                      tuple((slot.name,slot.pointer_name,slot.library_name,slot.category_name,slot.item_name) for slot in cabinetlib.material_slots))
+    return signature
+
+def is_initialized(obj,signature):
+    """ Returns: Boolean - True if the object was initialized with the same inputs, 
+        hasn't been renamed and still has a material in every slot.
+        Objects are only marked as initialized when every material was found
+        so an object with a missing material is always initialized again.
+    """
+    entry = init_signatures.get(obj.as_pointer())
+    if entry is None or entry[0] != obj.name or entry[1] != signature:
+        return False
+    if obj.type == 'MESH':
+        material_slots = obj.material_slots
+        for index in range(min(len(obj.cabinetlib.material_slots),len(material_slots))):
+            if material_slots[index].material is None:
+                return False
+    return True
+
+def set_initialized(obj,signature):
+    init_signatures[obj.as_pointer()] = (obj.name,signature)
+
+@persistent
+def init_signatures_load_post(dummy):
+    """ Clears the init signatures when the objects are reloaded because the pointers change
+    """
+    init_signatures.clear()
+
+def set_init_display(obj):
+    """ Hides the empties and dimensions and sets the draw type of boolean objects.
+        This is done for every object, even the ones that are skipped, so an
+        object that was shown by hand is hidden again. Only values that are 
+        different are written.
+    """
+    if obj.type == 'EMPTY' or obj.mv.type in {'VISDIM_A','BPASSEMBLY'}:
+        if not obj.hide:
+            obj.hide = True
+
+    if obj.mv.type == 'VISDIM_A':
+        for dim_child in obj.children:
+            if not dim_child.hide:
+                dim_child.hide = True
+
+    if obj.mv.use_as_bool_obj and obj.draw_type != 'WIRE':
+        obj.draw_type = 'WIRE'
+
+def init_object(obj,material_cache,force=False):
+    """ Initializes one object if it is new or has changed since it was last initialized
+        Returns: int - 1 if the object was initialized 0 if it was skipped
+    """
+    signature = get_init_signature(obj,material_cache)
+    if not force and is_initialized(obj,signature):
+        set_init_display(obj)
+        return 0
+    
+    set_object_name(obj)
+
+    found_all = True
+    if obj.type == 'MESH':
+        found_all = assign_materials_from_pointers(obj,material_cache)
+        #THE SLOT POINTERS ARE SET FROM THE SPEC GROUP SO THEY ARE READ AGAIN.
+        #OBJECTS THAT ARE SKIPPED ONLY READ THE SIGNATURE ONCE.
+        signature = get_init_signature(obj,material_cache)
+
+    set_init_display(obj)
+    
+    if found_all:
+        set_initialized(obj,signature)
+    else:
+        init_signatures.pop(obj.as_pointer(),None)
+    return 1
+
+def init_objects(obj_bp,material_cache=None,force=False):
     """ This Function is used to init all of the objects in a smart group
             -Sets the names of the children
             -Hides all of the empties
             -Deletes the cage objects
             -Sets the materials
+        The material_cache is shared with all of the sub assemblies so 
+        each material is only resolved once for the whole product.
+        Objects that haven't changed since they were last initialized are skipped
+        so calling this again after a small edit only updates the changed parts.
+        Objects that had a missing material are never skipped, so they get 
+        their material as soon as it is added to the library.
+        Returns: int - Number of objects that were initialized
+    """
+    if material_cache is None:
+        material_cache = MaterialCache()
+    count = 0
+    signature = get_init_signature(obj_bp,material_cache)
+    if force or not is_initialized(obj_bp,signature):
+        set_object_name(obj_bp)
+        set_initialized(obj_bp,signature)
+        count += 1
+    return count + init_children(obj_bp,material_cache,force)
+
+def init_children(obj_bp,material_cache,force=False):
+    """ Initializes the children of an assembly and recurses into the sub assemblies
+        Returns: int - Number of objects that were initialized
     """
     obj_cages = []
-    set_object_name(obj_bp)
+    count = 0
     for child in obj_bp.children:
-        set_object_name(child)
-
-        if child.type == 'EMPTY':
-            child.hide = True
-            
         if child.mv.type == 'CAGE':
             obj_cages.append(child)
-            
-        if child.type == 'MESH':
-            assign_materials_from_pointers(child)
-
-        if child.mv.type == 'VISDIM_A':
-            child.hide = True
-            for dim_child in child.children:
-                dim_child.hide = True
+            continue
+        
+        count += init_object(child,material_cache,force)
 
         if child.mv.type == 'BPASSEMBLY':
-            init_objects(child)
-            child.hide = True
-         
-        if child.mv.use_as_bool_obj:
-            child.draw_type = 'WIRE'
+            count += init_children(child,material_cache,force)
          
     if len(obj_cages) > 0:
         delete_obj_list(obj_cages)
+    return count
 
 def save_assembly(assembly,path):
     for obj in bpy.data.objects:
@@ -1028,28 +1280,28 @@ def replace_assembly(old_assembly,new_assembly):
     new_assembly.obj_bp.location = old_assembly.obj_bp.location
     new_assembly.obj_bp.rotation_euler = old_assembly.obj_bp.rotation_euler    
     
-    copy_drivers(old_assembly.obj_bp,new_assembly.obj_bp)
-    copy_prompt_drivers(old_assembly.obj_bp,new_assembly.obj_bp)
-    copy_drivers(old_assembly.obj_x,new_assembly.obj_x)
-    copy_drivers(old_assembly.obj_y,new_assembly.obj_y)
-    copy_drivers(old_assembly.obj_z,new_assembly.obj_z)
-    # Go though all siblings and check if the assembly 
-    # is being referenced in any other drivers. 
-    search_obj = old_assembly.obj_bp.parent if old_assembly.obj_bp.parent else None
-    if search_obj:
-        for obj in search_obj.children:
-            if obj.animation_data:
-                for driver in obj.animation_data.drivers:
-                    for var in driver.driver.variables:
-                        for target in var.targets:
-                            if target.id.name == old_assembly.obj_bp.name:
-                                target.id = new_assembly.obj_bp
-                            if target.id.name == old_assembly.obj_x.name:
-                                target.id = new_assembly.obj_x
-                            if target.id.name == old_assembly.obj_y.name:
-                                target.id = new_assembly.obj_y
-                            if target.id.name == old_assembly.obj_z.name:
-                                target.id = new_assembly.obj_z
+    id_map = get_assembly_id_map(old_assembly,new_assembly)
+    snapshot = get_driver_snapshot(old_assembly.obj_bp)
+    apply_driver_snapshot(new_assembly.obj_bp,snapshot,id_map)
+    for attr in ('obj_x','obj_y','obj_z'):
+        snapshot = get_driver_snapshot(getattr(old_assembly,attr),prompt_drivers=False)
+        apply_driver_snapshot(getattr(new_assembly,attr),snapshot,id_map)
+        
+    # Point every driver that references the old assembly 
+    # to the new assembly. 
+    owners = set()
+    for (id_type, name), new_obj in id_map.items():
+        old_obj = bpy.data.objects.get(name)
+        if old_obj is None:
+            continue
+        for owner, driver in get_driver_dependents(old_obj):
+            for var in driver.driver.variables:
+                for target in var.targets:
+                    if target.id and (target.id_type,target.id.name) in id_map:
+                        target.id = id_map[(target.id_type,target.id.name)]
+            owners.add(owner)
+    for owner in owners:
+        update_driver_index(owner)
 
 #-------INTERFACE FUNCTIONS
 
@@ -1452,70 +1704,366 @@ def copy_drivers(obj,obj_target):
     """ This Function copies all drivers from obj
         To obj_target. This doesn't include prompt drivers
     """
-    if obj.animation_data:
-        for driver in obj.animation_data.drivers:
-            if 'mv.PromptPage' not in driver.data_path:
-                newdriver = None
-                try:
-                    newdriver = obj_target.driver_add(driver.data_path,driver.array_index)
-                except Exception:
-                    try:
-                        newdriver = obj_target.driver_add(driver.data_path)
-                    except Exception:
-                        print("Unable to Copy Prompt Driver", driver.data_path)
-                if newdriver:
-                    newdriver.driver.expression = driver.driver.expression
-                    newdriver.driver.type = driver.driver.type
-                    for var in driver.driver.variables:
-                        if var.name not in newdriver.driver.variables:
-                            newvar = newdriver.driver.variables.new()
-                            newvar.name = var.name
-                            newvar.type = var.type
-                            for index, target in enumerate(var.targets):
-                                newtarget = newvar.targets[index]
-                                if target.id is obj:
-                                    newtarget.id = obj_target #CHECK SELF REFERENCE FOR PROMPTS
-                                else:
-                                    newtarget.id = target.id
-                                newtarget.transform_space = target.transform_space
-                                newtarget.transform_type = target.transform_type
-                                newtarget.data_path = target.data_path
+    snapshot = get_driver_snapshot(obj,prompt_drivers=False)
+    apply_driver_snapshot(obj_target,snapshot,{('OBJECT',obj.name):obj_target})
 
 def copy_prompt_drivers(obj,obj_target):
     """ This Function copies all drivers that are 
         assigned to prompts from obj to obj_target.
     """
-    if obj.animation_data:
-        for driver in obj.animation_data.drivers:
-            if 'mv.PromptPage' in driver.data_path:
-                for prompt in obj_target.mv.PromptPage.COL_Prompt:
-                    newdriver = None
-                    if prompt.name in driver.data_path:
-                        newdriver = None
-                        try:
-                            newdriver = obj_target.driver_add(driver.data_path,driver.array_index)
-                        except Exception:
-                            try:
-                                newdriver = obj_target.driver_add(driver.data_path)
-                            except Exception:
-                                print("Unable to Copy Prompt Driver", driver.data_path)
-                    if newdriver:
-                        newdriver.driver.expression = driver.driver.expression
-                        newdriver.driver.type = driver.driver.type
-                        for var in driver.driver.variables:
-                            if var.name not in newdriver.driver.variables:
-                                newvar = newdriver.driver.variables.new()
-                                newvar.name = var.name
-                                newvar.type = var.type
-                                for index, target in enumerate(var.targets):
-                                    newtarget = newvar.targets[index]
-                                    if target.id is obj:
-                                        newtarget.id = obj_target #CHECK SELF REFERENCE FOR PROMPTS
-                                    else:
-                                        newtarget.id = target.id
-                                    newtarget.transform_space = target.transform_space
-                                    newtarget.transform_type = target.transform_type
-                                    newtarget.data_path = target.data_path
+    snapshot = get_driver_snapshot(obj,prompt_drivers=True)
+    apply_driver_snapshot(obj_target,snapshot,{('OBJECT',obj.name):obj_target})
+
+#ID TYPES THAT CAN BE USED AS DRIVER TARGETS AND THE bpy.data COLLECTION THEY LIVE IN
+DRIVER_ID_COLLECTIONS = {'OBJECT':'objects',
+                         'SCENE':'scenes',
+                         'MESH':'meshes',
+                         'MATERIAL':'materials',
+                         'TEXTURE':'textures',
+                         'IMAGE':'images',
+                         'WORLD':'worlds',
+                         'LAMP':'lamps',
+                         'CAMERA':'cameras',
+                         'CURVE':'curves',
+                         'KEY':'shape_keys',
+                         'GROUP':'groups',
+                         'ARMATURE':'armatures',
+                         'LATTICE':'lattices',
+                         'TEXT':'texts'}
+
+def driver_uses_index(obj,data_path):
+    """ Returns True if the property at data_path is an array so the
+        driver has to be added with an array index. Returns None if the
+        path can't be resolved.
+    """
+    try:
+        value = obj.path_resolve(data_path)
+    except ValueError:
+        return None
+    return hasattr(value,'__len__') and not isinstance(value,str)
+
+def get_driver_snapshot(obj,prompt_drivers=None):
+    """ Returns: List of Dictionaries
+        Takes a compact description of the drivers on obj that only
+        contains strings and numbers so it can be stored or sent to
+        apply_driver_snapshot for any number of targets.
+        Par1: obj - Object to read the drivers from
+        Par2: prompt_drivers - None = all drivers, True = only prompt drivers, 
+                               False = skip prompt drivers
+    """
+    snapshot = []
+    if not obj.animation_data:
+        return snapshot
+    
+    for driver in obj.animation_data.drivers:
+        is_prompt = 'mv.PromptPage' in driver.data_path
+        if prompt_drivers is not None and is_prompt != prompt_drivers:
+            continue
+        variables = []
+        for var in driver.driver.variables:
+            targets = []
+            for target in var.targets:
+                targets.append({'id_type':target.id_type,
+                                'id_name':target.id.name if target.id else "",
+                                'data_path':target.data_path,
+                                'transform_space':target.transform_space,
+                                'transform_type':target.transform_type})
+            variables.append({'name':var.name,
+                              'type':var.type,
+                              'targets':targets})
+        snapshot.append({'data_path':driver.data_path,
+                         'array_index':driver.array_index,
+                         'use_index':driver_uses_index(obj,driver.data_path),
+                         'is_prompt':is_prompt,
+                         'expression':driver.driver.expression,
+                         'type':driver.driver.type,
+                         'variables':variables})
+    return snapshot
+
+def resolve_driver_id(id_type,id_name,id_map):
+    """ Returns the ID a driver target should point to. id_map is
+        checked first so old assembly objects can be swapped for new ones.
+    """
+    if id_name == "":
+        return None
+    if (id_type,id_name) in id_map:
+        return id_map[(id_type,id_name)]
+    collection = getattr(bpy.data,DRIVER_ID_COLLECTIONS.get(id_type,'objects'))
+    return collection.get(id_name)
+
+def apply_driver_snapshot(obj_target,snapshot,id_map=None):
+    """ Rebuilds the drivers described in snapshot on obj_target in a single pass.
+        Par1: obj_target - Object to add the drivers to
+        Par2: snapshot - List created with get_driver_snapshot
+        Par3: id_map - Dictionary of (old ID type, old ID name) to the new ID to use in targets
+    """
+    if len(snapshot) == 0:
+        return
+    if id_map is None:
+        id_map = {}
+    
+    prompt_names = []
+    if any(dr['is_prompt'] for dr in snapshot):
+        prompt_names = [prompt.name for prompt in obj_target.mv.PromptPage.COL_Prompt]
+    
+    for dr in snapshot:
+        if dr['is_prompt']:
+            # ONLY ADD PROMPT DRIVERS IF THE TARGET HAS THE PROMPT
+            if not any(name in dr['data_path'] for name in prompt_names):
+                continue
+        
+        newdriver = None
+        try:
+            if dr['use_index'] is False:
+                newdriver = obj_target.driver_add(dr['data_path'])
+            else:
+                newdriver = obj_target.driver_add(dr['data_path'],dr['array_index'])
+        except Exception:
+            if dr['use_index'] is None:
+                try:
+                    newdriver = obj_target.driver_add(dr['data_path'])
+                except Exception:
+                    pass
+        if not newdriver:
+            print("Unable to Copy Driver", dr['data_path'])
+            continue
+        
+        # THE COPY IS LEFT EXACTLY AS IT WAS CAPTURED SO THE EXPRESSION IS NOT SIMPLIFIED
+        newdriver.driver.expression = dr['expression']
+        newdriver.driver.type = dr['type']
+        variables = newdriver.driver.variables
+        existing_names = {var.name for var in variables}
+        for var in dr['variables']:
+            if var['name'] in existing_names:
+                continue
+            newvar = variables.new()
+            newvar.name = var['name']
+            newvar.type = var['type']
+            for index, target in enumerate(var['targets']):
+                newtarget = newvar.targets[index]
+                if var['type'] == 'SINGLE_PROP' and newtarget.id_type != target['id_type']:
+                    newtarget.id_type = target['id_type']
+                newtarget.id = resolve_driver_id(target['id_type'],target['id_name'],id_map)
+                newtarget.transform_space = target['transform_space']
+                newtarget.transform_type = target['transform_type']
+                newtarget.data_path = target['data_path']
+    update_driver_index(obj_target)
+
+def get_assembly_id_map(old_assembly,new_assembly):
+    """ Returns: Dictionary of ('OBJECT', old object name) to new object
+        This is used to point drivers at the new assembly
+    """
+    id_map = {}
+    for attr in ('obj_bp','obj_x','obj_y','obj_z'):
+        old_obj = getattr(old_assembly,attr)
+        new_obj = getattr(new_assembly,attr)
+        if old_obj and new_obj:
+            id_map[('OBJECT',old_obj.name)] = new_obj
+    return id_map
+
+#DRIVER TARGET NAME -> {OWNER NAME: [(DRIVER INDEX, DATA PATH, ARRAY INDEX)]}
+#THIS IS BUILT THE FIRST TIME IT IS NEEDED AND THEN KEPT UP TO DATE ONE OBJECT AT A TIME
+driver_index = {}
+#OWNER NAME -> SET OF TARGET NAMES SO THE DRIVERS OF ONE OBJECT CAN BE REINDEXED
+driver_index_owners = {}
+#OBJECT POINTER -> OBJECT NAME WHEN IT WAS INDEXED. USED TO FIND RENAMED OBJECTS
+driver_index_names = {}
+driver_index_object_count = -1
+driver_index_is_valid = False
+
+def invalidate_driver_index():
+    """ Clears the driver dependency index so it is rebuilt on the next query.
+    """
+    global driver_index_is_valid, driver_index_object_count
+    driver_index.clear()
+    driver_index_owners.clear()
+    driver_index_names.clear()
+    driver_index_object_count = -1
+    driver_index_is_valid = False
+
+def unindex_object_drivers(name):
+    """ Removes the entries in the driver index for the drivers owned by the object called name
+    """
+    for target_name in driver_index_owners.pop(name,()):
+        owners = driver_index.get(target_name)
+        if owners:
+            owners.pop(name,None)
+
+def unindex_object(name,pointer):
+    """ Removes an object that was deleted or renamed from the driver index.
+        The drivers it owned and the drivers that point at it are both removed.
+    """
+    unindex_object_drivers(name)
+    driver_index.pop(name,None)
+    if driver_index_names.get(pointer) == name:
+        del driver_index_names[pointer]
+
+def rename_indexed_object(old_name,name):
+    """ Moves the drivers that point at a renamed object to its new name
+    """
+    owners = driver_index.pop(old_name,None)
+    if not owners:
+        return
+    driver_index.setdefault(name,{}).update(owners)
+    for owner_name in owners:
+        target_names = driver_index_owners.get(owner_name)
+        if target_names is not None:
+            target_names.discard(old_name)
+            target_names.add(name)
+
+def index_object_drivers(obj):
+    """ Replaces the entries in the driver index for the drivers on obj
+    """
+    pointer = obj.as_pointer()
+    old_name = driver_index_names.get(pointer)
+    if old_name is not None and old_name != obj.name:
+        unindex_object_drivers(old_name)
+        rename_indexed_object(old_name,obj.name)
+    unindex_object_drivers(obj.name)
+    driver_index_names[pointer] = obj.name
+    if not obj.animation_data:
+        return
+    target_names = set()
+    for index, driver in enumerate(obj.animation_data.drivers):
+        key = (index,driver.data_path,driver.array_index)
+        for var in driver.driver.variables:
+            for target in var.targets:
+                if target.id:
+                    driver_index.setdefault(target.id.name,{}).setdefault(obj.name,[]).append(key)
+                    target_names.add(target.id.name)
+    if target_names:
+        driver_index_owners[obj.name] = target_names
+
+def build_driver_index():
+    """ Builds the reverse lookup of driver targets to the drivers that use them.
+    """
+    global driver_index_is_valid, driver_index_object_count
+    invalidate_driver_index()
+    for obj in bpy.data.objects:
+        index_object_drivers(obj)
+    driver_index_object_count = len(bpy.data.objects)
+    driver_index_is_valid = True
+
+def set_driver_index_object_count():
+    global driver_index_object_count
+    if driver_index_is_valid:
+        driver_index_object_count = len(bpy.data.objects)
+
+def sync_driver_index():
+    """ Indexes the objects that were added and removes the objects that were deleted 
+        or renamed since the index was built. Only the drivers of those objects are read.
+    """
+    pointers = {obj.as_pointer(): obj for obj in bpy.data.objects}
+    for pointer, name in list(driver_index_names.items()):
+        if pointer not in pointers:
+            unindex_object(name,pointer)
+    for pointer, obj in pointers.items():
+        if driver_index_names.get(pointer) != obj.name:
+            index_object_drivers(obj)
+    set_driver_index_object_count()
+
+def remove_from_driver_index(obj_list):
+    """ Removes the objects from the driver index before they are deleted
+    """
+    if driver_index_is_valid:
+        for obj in obj_list:
+            unindex_object(obj.name,obj.as_pointer())
+
+def update_driver_index(obj):
+    """ Reindexes the drivers on one object after they were added or changed.
+        Does nothing if the index hasn't been built yet.
+    """
+    if driver_index_is_valid:
+        index_object_drivers(obj)
+
+def is_indexed(obj):
+    """ Returns True if obj had the same name when it was indexed
+    """
+    return driver_index_names.get(obj.as_pointer()) == obj.name
+
+def driver_uses_target(driver,obj):
+    for var in driver.driver.variables:
+        for target in var.targets:
+            if target.id == obj:
+                return True
+    return False
+
+def get_driver_dependents(obj,is_synced=False):
+    """ Returns: List of (Object, FCurve)
+        Gets every driver in the scene that has a variable targeting obj.
+        Only the drivers that use obj are visited. Objects that were added,
+        deleted or renamed since the index was built are synced first.
+    """
+    if not driver_index_is_valid:
+        build_driver_index()
+        is_synced = True
+    elif len(bpy.data.objects) != driver_index_object_count or not is_indexed(obj):
+        sync_driver_index()
+        is_synced = True
+    
+    dependents = []
+    for owner_name, keys in driver_index.get(obj.name,{}).items():
+        owner = bpy.data.objects.get(owner_name)
+        if owner is None or not is_indexed(owner):
+            #THE OWNER WAS RENAMED OR DELETED SO THE INDEX IS OUT OF DATE
+            if not is_synced:
+                sync_driver_index()
+                return get_driver_dependents(obj,is_synced=True)
+            continue
+        if owner.animation_data is None:
+            continue
+        drivers = owner.animation_data.drivers
+        for index, data_path, array_index in keys:
+            driver = drivers[index] if index < len(drivers) else None
+            if driver is None or driver.data_path != data_path or driver.array_index != array_index:
+                driver = get_driver(owner,data_path,array_index)
+            if driver and driver_uses_target(driver,obj):
+                dependents.append((owner,driver))
+    return dependents
+
+def get_dependent_objects(obj):
+    """ Returns: List of Objects
+        Gets all of the objects that have a driver that depends on obj
+        ex. What depends on this wall?
+    """
+    objects = []
+    for owner, driver in get_driver_dependents(obj):
+        if owner not in objects:
+            objects.append(owner)
+    return objects
+
+def get_external_driver_dependents(obj_list):
+    """ Returns: List of (Object, FCurve)
+        Gets the drivers that will be broken if all of the objects in obj_list
+        are deleted. Drivers on the objects being deleted are ignored.
+    """
+    names = {obj.name for obj in obj_list}
+    dependents = []
+    for obj in obj_list:
+        for owner, driver in get_driver_dependents(obj):
+            if owner.name not in names and (owner,driver) not in dependents:
+                dependents.append((owner,driver))
+    return dependents
+
+@persistent
+def driver_index_scene_update(scene):
+    """ Scene update handler that keeps the driver index up to date.
+        New and deleted objects are synced when the number of objects changes.
+        Blender marks the owner of a driver as updated when the driver is 
+        edited so only the drivers of the updated objects are read again.
+    """
+    if not driver_index_is_valid:
+        return
+    if len(bpy.data.objects) != driver_index_object_count:
+        sync_driver_index()
+    if bpy.data.objects.is_updated:
+        for obj in bpy.data.objects:
+            if obj.is_updated:
+                index_object_drivers(obj)
+
+@persistent
+def driver_index_load_post(dummy):
+    invalidate_driver_index()
 
 def add_variables_to_driver(driver,driver_vars):
     """ This function adds the driver_vars to the driver
@@ -1529,6 +2077,206 @@ def add_variables_to_driver(driver,driver_vars):
         if var.var_type == 'TRANSFORMS':
             new_var.targets[0].transform_space = var.transform_space
             new_var.targets[0].transform_type = var.transform_type
+    update_driver_index(driver.id_data)
+
+#FUNCTIONS AND CONSTANTS BLENDER CAN EVALUATE IN A DRIVER WITHOUT PYTHON
+SIMPLE_EXPRESSION_FUNCTIONS = {'min','max','abs','fabs','floor','ceil','trunc','int',
+                               'sin','cos','tan','asin','acos','atan','atan2',
+                               'exp','log','sqrt','pow','fmod','radians','degrees'}
+SIMPLE_EXPRESSION_CONSTANTS = {'pi','True','False','frame'}
+DRIVER_TYPE_FUNCTIONS = {'min':'MIN','max':'MAX'}
+
+#(EXPRESSION, VARIABLE NAMES) -> (EXPRESSION, DRIVER TYPE, IS SIMPLE)
+driver_expression_cache = {}
+
+class ExpressionNotSimple(Exception):
+    pass
+
+def _is_number(node):
+    if hasattr(ast,'Constant') and isinstance(node,ast.Constant):
+        return isinstance(node.value,(int,float)) and not isinstance(node.value,bool)
+    return isinstance(node,getattr(ast,'Num',()))
+
+def _number_value(node):
+    return node.value if hasattr(ast,'Constant') and isinstance(node,ast.Constant) else node.n
+
+def _name_constant(node):
+    """ Returns True or False for a boolean literal otherwise None
+    """
+    if hasattr(ast,'Constant') and isinstance(node,ast.Constant) and isinstance(node.value,bool):
+        return str(node.value)
+    if isinstance(node,getattr(ast,'NameConstant',())) and isinstance(node.value,bool):
+        return str(node.value)
+
+BINARY_OPERATORS = {ast.Add:'+',ast.Sub:'-',ast.Mult:'*',ast.Div:'/'}
+COMPARE_OPERATORS = {ast.Eq:'==',ast.NotEq:'!=',ast.Lt:'<',ast.LtE:'<=',ast.Gt:'>',ast.GtE:'>='}
+
+def _simple_expression(node,var_names):
+    """ Converts an ast node back to a string using only the simple 
+        expression subset. Raises ExpressionNotSimple if that isn't possible.
+    """
+    def wrap(child):
+        text = _simple_expression(child,var_names)
+        if isinstance(child,(ast.BinOp,ast.BoolOp,ast.Compare,ast.IfExp,ast.UnaryOp)):
+            return "(" + text + ")"
+        return text
+    
+    if _is_number(node):
+        return repr(_number_value(node))
+    if _name_constant(node):
+        return _name_constant(node)
+    if isinstance(node,ast.Name):
+        if node.id in var_names or node.id in SIMPLE_EXPRESSION_CONSTANTS:
+            return node.id
+        raise ExpressionNotSimple("Unknown name: " + node.id)
+    if isinstance(node,ast.Attribute):
+        # math.pi -> pi
+        if isinstance(node.value,ast.Name) and node.value.id == 'math' and node.attr == 'pi':
+            return 'pi'
+        raise ExpressionNotSimple("Attribute access")
+    if isinstance(node,ast.UnaryOp):
+        if isinstance(node.op,ast.USub):
+            return "-" + wrap(node.operand)
+        if isinstance(node.op,ast.UAdd):
+            return wrap(node.operand)
+        if isinstance(node.op,ast.Not):
+            return "not " + wrap(node.operand)
+        raise ExpressionNotSimple("Unsupported unary operator")
+    if isinstance(node,ast.BinOp):
+        if isinstance(node.op,ast.Pow):
+            # a**b -> pow(a,b)
+            return "pow(" + _simple_expression(node.left,var_names) + "," + _simple_expression(node.right,var_names) + ")"
+        if type(node.op) not in BINARY_OPERATORS:
+            raise ExpressionNotSimple("Unsupported operator")
+        return wrap(node.left) + BINARY_OPERATORS[type(node.op)] + wrap(node.right)
+    if isinstance(node,ast.BoolOp):
+        op = " and " if isinstance(node.op,ast.And) else " or "
+        return op.join(wrap(value) for value in node.values)
+    if isinstance(node,ast.Compare):
+        text = wrap(node.left)
+        for op, comparator in zip(node.ops,node.comparators):
+            if type(op) not in COMPARE_OPERATORS:
+                raise ExpressionNotSimple("Unsupported comparison")
+            text += COMPARE_OPERATORS[type(op)] + wrap(comparator)
+        return text
+    if isinstance(node,ast.IfExp):
+        return wrap(node.body) + " if " + wrap(node.test) + " else " + wrap(node.orelse)
+    if isinstance(node,ast.Call):
+        func = node.func
+        # math.floor(a) -> floor(a)
+        if isinstance(func,ast.Attribute) and isinstance(func.value,ast.Name) and func.value.id == 'math':
+            name = func.attr
+        elif isinstance(func,ast.Name):
+            name = func.id
+        else:
+            raise ExpressionNotSimple("Unsupported function call")
+        if name not in SIMPLE_EXPRESSION_FUNCTIONS or node.keywords:
+            raise ExpressionNotSimple("Unsupported function: " + name)
+        if getattr(node,'starargs',None) or getattr(node,'kwargs',None):
+            raise ExpressionNotSimple("Unsupported function arguments")
+        return name + "(" + ",".join(_simple_expression(arg,var_names) for arg in node.args) + ")"
+    raise ExpressionNotSimple("Unsupported syntax")
+
+def _get_driver_type(tree,var_names):
+    """ Returns the built in driver type that matches the expression.
+        The built in types don't need python but they use every variable once.
+    """
+    if isinstance(tree,ast.Name) and [tree.id] == list(var_names):
+        return 'AVERAGE'
+    
+    names = []
+    if isinstance(tree,ast.Call) and isinstance(tree.func,ast.Name) and tree.func.id in DRIVER_TYPE_FUNCTIONS:
+        if all(isinstance(arg,ast.Name) for arg in tree.args) and not tree.keywords:
+            names = [arg.id for arg in tree.args]
+            if sorted(names) == sorted(var_names):
+                return DRIVER_TYPE_FUNCTIONS[tree.func.id]
+        return 'SCRIPTED'
+    
+    node = tree
+    while isinstance(node,ast.BinOp) and isinstance(node.op,ast.Add):
+        if not isinstance(node.right,ast.Name):
+            return 'SCRIPTED'
+        names.append(node.right.id)
+        node = node.left
+    if isinstance(node,ast.Name) and names:
+        names.append(node.id)
+        if sorted(names) == sorted(var_names):
+            return 'SUM'
+    return 'SCRIPTED'
+
+def simplify_driver_expression(expression,var_names):
+    """ Returns: (String, String, Boolean) - Expression, Driver Type, Is Simple
+        Rewrites a driver expression into the subset of python that blender
+        can evaluate without the python interpreter. The driver type is
+        SUM, AVERAGE, MIN or MAX if the expression can be replaced by one 
+        of the built in driver types. Is Simple is False if the expression 
+        still has to be evaluated by python.
+        Par1: expression - The driver expression
+        Par2: var_names - List of the variable names on the driver
+    """
+    key = (expression,tuple(var_names))
+    if key in driver_expression_cache:
+        return driver_expression_cache[key]
+    
+    try:
+        tree = ast.parse(expression.strip(),mode='eval').body
+        result = (_simple_expression(tree,set(var_names)),_get_driver_type(tree,var_names),True)
+    except (SyntaxError,ExpressionNotSimple):
+        result = (expression,'SCRIPTED',False)
+    
+    driver_expression_cache[key] = result
+    return result
+
+def set_driver_expression(driver,expression):
+    """ Returns: Boolean - True if the driver can be evaluated without python
+        Sets the expression on a driver. This should be called after the variables
+        are added to the driver with add_variables_to_driver.
+    """
+    var_names = [var.name for var in driver.driver.variables]
+    new_expression, driver_type, is_simple = simplify_driver_expression(expression,var_names)
+    driver.driver.expression = new_expression
+    if bpy.app.version >= (2,80,0):
+        # BLENDER EVALUATES SIMPLE SCRIPTED EXPRESSIONS WITHOUT PYTHON
+        driver.driver.type = 'SCRIPTED'
+        return is_simple
+    driver.driver.type = driver_type
+    return driver_type != 'SCRIPTED'
+
+def driver_uses_python(driver):
+    """ Returns True if blender has to use python to evaluate the driver
+    """
+    if driver.driver.type != 'SCRIPTED':
+        return False
+    if bpy.app.version >= (2,80,0):
+        is_simple = getattr(driver.driver,'is_simple_expression',None)
+        if is_simple is not None:
+            return not is_simple
+        var_names = [var.name for var in driver.driver.variables]
+        return not simplify_driver_expression(driver.driver.expression,var_names)[2]
+    return True
+
+def get_python_driver_report(obj_bp,report=None):
+    """ Returns: Dictionary - Assembly Name: (Total Drivers, Python Drivers, [Expressions])
+        Counts how many drivers in every assembly still need python to evaluate.
+        The expressions that can't be rewritten are listed so they can be fixed.
+    """
+    if report is None:
+        report = {}
+    total = 0
+    python = 0
+    expressions = []
+    for obj in [obj_bp] + list(obj_bp.children):
+        if obj is not obj_bp and obj.mv.type == 'BPASSEMBLY':
+            get_python_driver_report(obj,report)
+            continue
+        if obj.animation_data:
+            for driver in obj.animation_data.drivers:
+                total += 1
+                if driver_uses_python(driver):
+                    python += 1
+                    expressions.append(driver.driver.expression)
+    report[obj_bp.name] = (total,python,expressions)
+    return report
 
 def copy_assembly_drivers(template_assembly,copy_assembly):
     copy_drivers(template_assembly.obj_bp,copy_assembly.obj_bp)
@@ -0,0 +1,102 @@
+"""
+This module hides and shows the wall helper empties in batches.
+
+The base points and dimension empties of the walls are collected once
+and only the hide flags that change are written. Toggling the show
+props only marks the visibility as pending, so several toggles made in one
+UI interaction are applied together in the next scene update.
+
+"""
+
+import bpy
+from bpy.app.handlers import persistent
+
+ISWALL = "ISWALL"
+
+HELPER_TAGS = (("ISXDIM",'show_wall_obj_x'),
+               ("ISYDIM",'show_wall_obj_y'),
+               ("ISZDIM",'show_wall_obj_z'))
+
+#PROP NAME -> LIST OF OBJECT NAMES
+wall_helpers = {}
+wall_helpers_object_count = -1
+update_is_pending = False
+
+def invalidate_wall_helpers():
+    global wall_helpers_object_count
+    wall_helpers.clear()
+    wall_helpers_object_count = -1
+
+def get_wall_helpers():
+    """ Returns: Dictionary of the show prop name -> list of wall helper objects
+        The lists are rebuilt when objects are added or removed.
+    """
+    global wall_helpers_object_count
+    if wall_helpers_object_count != len(bpy.data.objects):
+        wall_helpers.clear()
+        wall_helpers['show_wall_obj_bp'] = []
+        for tag, prop_name in HELPER_TAGS:
+            wall_helpers[prop_name] = []
+        for obj in bpy.data.objects:
+            if ISWALL in obj and obj.parent and "ISBP" in obj.parent:
+                wall_helpers['show_wall_obj_bp'].append(obj.parent.name)
+                for child in obj.parent.children:
+                    for tag, prop_name in HELPER_TAGS:
+                        if tag in child:
+                            wall_helpers[prop_name].append(child.name)
+        wall_helpers_object_count = len(bpy.data.objects)
+
+    helpers = {}
+    for prop_name, names in wall_helpers.items():
+        objects = [bpy.data.objects.get(name) for name in names]
+        if None in objects:
+            invalidate_wall_helpers()
+            return get_wall_helpers()
+        helpers[prop_name] = objects
+    return helpers
+
+def request_update():
+    """ Marks the wall helpers to be updated in the next scene update
+    """
+    global update_is_pending
+    update_is_pending = True
+
+def apply_visibility(props):
+    """
+    hides and shows every wall helper. Only the helpers that change are written.
+
+    **Parameters:**
+
+    * **props** (PROPS_Room_Builder) - Room builder scene props
+
+    **Returns:** int - Number of objects that changed
+    """
+    global update_is_pending
+    update_is_pending = False
+    helpers = get_wall_helpers()
+
+    changed = 0
+    for prop_name, objects in helpers.items():
+        hide_value = not getattr(props,prop_name)
+        for obj in objects:
+            if obj.hide != hide_value:
+                obj.hide = hide_value
+                changed += 1
+
+    if changed:
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type in {'VIEW_3D','OUTLINER'}:
+                    area.tag_redraw()
+    return changed
+
+@persistent
+def visibility_scene_update(scene):
+    """ Scene update handler that applies the pending visibility toggles
+    """
+    if update_is_pending and hasattr(scene,'room_builder'):
+        apply_visibility(scene.room_builder)
+
+@persistent
+def visibility_load_post(dummy):
+    invalidate_wall_helpers()
@@ -0,0 +1,248 @@
+"""
+This module contains the baked wall layout.
+
+Normally each wall follows the end of the previous wall with a
+COPY_LOCATION constraint. A long run of walls makes a long chain of
+constraints that are evaluated one after another.
+
+When the layout is baked the constraints are removed and the previous
+wall is stored in a custom property. The start of every wall in a run
+is then solved in one pass from the wall lengths and rotations
+whenever a wall in the run changes.
+
+"""
+
+import bpy
+import numpy
+from bpy.app.handlers import persistent
+
+ISWALL = "ISWALL"
+LAYOUT_PREVIOUS = "LAYOUT_PREVIOUS"
+
+#LOCATIONS CLOSER THAN THIS ARE NOT WRITTEN SO SOLVING DOESN'T CAUSE ANOTHER SCENE UPDATE
+TOLERANCE = 1e-6
+
+#ONE Wall_Layout FOR EACH BAKED RUN OF WALLS
+layout_cache = []
+layout_cache_is_valid = False
+
+def get_wall_objects(obj_bp):
+    """ Returns: (X Dimension, Mesh) of a wall base point
+    """
+    obj_x = None
+    obj_mesh = None
+    for child in obj_bp.children:
+        if "ISXDIM" in child:
+            obj_x = child
+        if ISWALL in child:
+            obj_mesh = child
+    return obj_x, obj_mesh
+
+def get_wall_bps():
+    wall_bps = []
+    for obj in bpy.data.objects:
+        if ISWALL in obj and obj.parent and "ISBP" in obj.parent:
+            wall_bps.append(obj.parent)
+    return wall_bps
+
+def get_copy_location_constraint(obj_bp):
+    for con in obj_bp.constraints:
+        if con.type == 'COPY_LOCATION' and con.target and "ISXDIM" in con.target:
+            return con
+
+def get_previous_wall_bp(obj_bp):
+    """
+    returns the base point of the wall that this wall is connected to.
+    This works for walls that are connected with a constraint and walls that are baked.
+
+    **Parameters:**
+
+    * **obj_bp** (bpy.types.Object) - Wall base point
+
+    **Returns:** bpy.types.Object or None
+    """
+    if LAYOUT_PREVIOUS in obj_bp:
+        return bpy.data.objects.get(obj_bp[LAYOUT_PREVIOUS])
+    con = get_copy_location_constraint(obj_bp)
+    if con:
+        return con.target.parent
+
+class Wall_Layout(object):
+    """
+    A run of connected walls. The names are stored so the layout
+    can be used after undo.
+    """
+
+    def __init__(self,wall_bps):
+        self.bp_names = [obj_bp.name for obj_bp in wall_bps]
+        self.x_names = []
+        for obj_bp in wall_bps:
+            obj_x, obj_mesh = get_wall_objects(obj_bp)
+            self.x_names.append(obj_x.name if obj_x else "")
+
+    def get_objects(self):
+        """ Returns: (List of Base Points, List of X Dimensions) or None if a wall was deleted
+        """
+        bps = [bpy.data.objects.get(name) for name in self.bp_names]
+        xs = [bpy.data.objects.get(name) for name in self.x_names]
+        if None in bps or None in xs:
+            return None
+        return bps, xs
+
+    def solve(self,objects=None):
+        """
+        sets the location of every wall in the run from the
+        location of the first wall and the length and rotation of the walls before it.
+
+        **Parameters:**
+
+        * **objects** (tuple, (optional)) - The objects from get_objects if they were already looked up
+
+        **Returns:** int - Number of walls that moved
+        """
+        if objects is None:
+            objects = self.get_objects()
+        if objects is None:
+            return 0
+        bps, xs = objects
+        count = len(bps)
+        angles = numpy.fromiter((obj_bp.rotation_euler.z for obj_bp in bps),dtype=numpy.float64,count=count)
+        lengths = numpy.fromiter((obj_x.location.x for obj_x in xs),dtype=numpy.float64,count=count)
+        starts = numpy.zeros((count,2))
+        starts[1:,0] = numpy.cumsum(lengths[:-1] * numpy.cos(angles[:-1]))
+        starts[1:,1] = numpy.cumsum(lengths[:-1] * numpy.sin(angles[:-1]))
+        starts += tuple(bps[0].location)[:2]
+        z = bps[0].location.z
+
+        moved = 0
+        for obj_bp, (x, y) in zip(bps[1:],starts[1:]):
+            location = obj_bp.location
+            if abs(location.x - x) > TOLERANCE or abs(location.y - y) > TOLERANCE or abs(location.z - z) > TOLERANCE:
+                obj_bp.location = (x,y,z)
+                moved += 1
+        return moved
+
+def get_wall_runs(wall_bps):
+    """
+    groups walls into runs of connected walls.
+    Each run starts with a wall that isn't connected to a previous wall.
+
+    **Parameters:**
+
+    * **wall_bps** (list of bpy.types.Object) - Wall base points
+
+    **Returns:** list of lists of wall base points in the order they are connected
+    """
+    next_walls = {}
+    first_walls = []
+    names = {obj_bp.name for obj_bp in wall_bps}
+    for obj_bp in wall_bps:
+        previous = get_previous_wall_bp(obj_bp)
+        if previous and previous.name in names:
+            next_walls.setdefault(previous.name,[]).append(obj_bp)
+        else:
+            first_walls.append(obj_bp)
+
+    runs = []
+    for obj_bp in first_walls:
+        run = [obj_bp]
+        visited = {obj_bp.name}
+        while run[-1].name in next_walls:
+            next_bp = next_walls[run[-1].name][0]
+            if next_bp.name in visited:
+                break
+            visited.add(next_bp.name)
+            run.append(next_bp)
+        runs.append(run)
+    return runs
+
+def invalidate_layout_cache():
+    global layout_cache_is_valid
+    layout_cache.clear()
+    layout_cache_is_valid = False
+
+def get_layouts():
+    """ Returns: List of Wall_Layout for the baked runs of walls
+    """
+    global layout_cache_is_valid
+    if not layout_cache_is_valid:
+        layout_cache.clear()
+        baked_bps = [obj_bp for obj_bp in get_wall_bps() if get_copy_location_constraint(obj_bp) is None]
+        for run in get_wall_runs(baked_bps):
+            if len(run) > 1:
+                layout_cache.append(Wall_Layout(run))
+        layout_cache_is_valid = True
+    return layout_cache
+
+def solve_layouts():
+    """ Solves every baked run. Returns the number of walls that moved
+    """
+    moved = 0
+    for layout in get_layouts():
+        moved += layout.solve()
+    return moved
+
+def bake_layout():
+    """
+    removes the COPY_LOCATION constraints between walls and
+    stores the previous wall so the walls can be solved in one pass.
+    """
+    for obj_bp in get_wall_bps():
+        con = get_copy_location_constraint(obj_bp)
+        if con:
+            location = obj_bp.matrix_world.to_translation()
+            obj_bp[LAYOUT_PREVIOUS] = con.target.parent.name
+            obj_bp.constraints.remove(con)
+            obj_bp.location = location
+    invalidate_layout_cache()
+    solve_layouts()
+
+def unbake_layout():
+    """
+    connects the baked walls with COPY_LOCATION constraints again
+    """
+    for obj_bp in get_wall_bps():
+        if LAYOUT_PREVIOUS in obj_bp:
+            previous = bpy.data.objects.get(obj_bp[LAYOUT_PREVIOUS])
+            del obj_bp[LAYOUT_PREVIOUS]
+            obj_x, obj_mesh = get_wall_objects(previous) if previous else (None,None)
+            if obj_x:
+                connect_wall(obj_bp,obj_x)
+    invalidate_layout_cache()
+
+def connect_wall(obj_bp,obj_x):
+    """ Connects the start of a wall to the end of the previous wall with a constraint
+    """
+    constraint = obj_bp.constraints.new('COPY_LOCATION')
+    constraint.target = obj_x
+    constraint.use_x = True
+    constraint.use_y = True
+    constraint.use_z = True
+
+def update_use_baked_layout(self,context):
+    if self.use_baked_layout:
+        bake_layout()
+    else:
+        unbake_layout()
+
+@persistent
+def layout_scene_update(scene):
+    """ Scene update handler that solves the baked runs that have a wall that changed
+    """
+    if not bpy.data.objects.is_updated:
+        return
+    if not hasattr(scene,'room_builder') or not scene.room_builder.use_baked_layout:
+        return
+    for layout in list(get_layouts()):
+        objects = layout.get_objects()
+        if objects is None:
+            invalidate_layout_cache()
+            continue
+        for obj in objects[0] + objects[1]:
+            if obj.is_updated:
+                layout.solve(objects)
+                break
+
+@persistent
+def layout_load_post(dummy):
+    invalidate_layout_cache()
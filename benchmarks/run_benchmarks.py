@@ -0,0 +1,338 @@
+"""
+Benchmarks for the room designer hot paths.
+
+This script runs inside of blender in background mode and writes the 
+results to a JSON file so the numbers can be compared between releases.
+
+    blender --background --python benchmarks/run_benchmarks.py -- --output results.json
+    blender --background --python benchmarks/run_benchmarks.py -- --output new.json --compare old.json
+
+Arguments after -- :
+    --output    Path to the JSON file to write the results to
+    --compare   Path to a previous results file to compare against
+    --repeat    Number of times each benchmark is run (default 3)
+    --sizes     Comma separated scene sizes used for picking (default 100,1000,10000)
+    --only      Comma separated benchmark names to run
+    --rooms     Comma separated room counts for the scaling benchmarks (default 10,40,160)
+"""
+
+import bpy
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from mathutils import Vector
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "addons"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import room_designer
+from room_designer import utils, snapping, visibility
+from room_designer import room_designer as rd
+from room_designer.assembly import Assembly, AssemblyArray
+from scene_generator import Scene_Generator
+
+RESULTS = {}
+
+def get_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Room Designer Benchmarks")
+    parser.add_argument("--output", default=os.path.join(os.getcwd(), "room_designer_benchmarks.json"))
+    parser.add_argument("--compare", default="")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--only", default="")
+    parser.add_argument("--rooms", default="10,40,160")
+    return parser.parse_args(argv)
+
+def register_addon():
+    if not hasattr(bpy.types.Scene, "room_builder"):
+        room_designer.register()
+
+def clear_scene():
+    """ Removes every object and mesh so each benchmark starts from an empty file
+    """
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+    utils.invalidate_driver_index()
+    utils.init_signatures.clear()
+
+def record(name, times, **params):
+    RESULTS[name] = {"params": params,
+                     "times": times,
+                     "min": min(times),
+                     "mean": sum(times) / len(times),
+                     "max": max(times)}
+    print("%-45s min %10.4fs  mean %10.4fs" % (name, RESULTS[name]["min"], RESULTS[name]["mean"]))
+
+def benchmark(name, func, setup=None, repeat=3, **params):
+    """ Runs setup (untimed) and func (timed) repeat times and records the times
+    """
+    times = []
+    for i in range(repeat):
+        clear_scene()
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - start)
+    clear_scene()
+    record(name, times, **params)
+
+#-------SCENE SETUP
+
+def create_mesh_grid(count):
+    """ Creates count cube objects in a grid that all share one mesh
+    """
+    obj_cube = utils.create_cube_mesh("Bench Cube", (1, 1, 1))
+    mesh = obj_cube.data
+    columns = int(math.ceil(math.sqrt(count)))
+    objects = [obj_cube]
+    for i in range(1, count):
+        obj = bpy.data.objects.new("Bench Cube", mesh)
+        obj.location = ((i % columns) * 2, (i // columns) * 2, 0)
+        bpy.context.scene.objects.link(obj)
+        objects.append(obj)
+    bpy.context.scene.update()
+    return objects
+
+def create_walls(count):
+    props = rd.get_roombuilder_props(bpy.context)
+    walls = []
+    previous_wall = None
+    for i in range(count):
+        wall = rd.create_wall_assembly(props, (0, 0, 0), previous_wall, wall_number=i + 1)
+        wall.obj_x.location.x = 3
+        wall.obj_bp.rotation_euler.z = math.radians(90 * (i % 4))
+        previous_wall = wall
+        walls.append(wall)
+    bpy.context.scene.update()
+    return walls
+
+def create_thumbnail_folder(count, size=64):
+    path = tempfile.mkdtemp(prefix="rd_bench_thumbs_")
+    for i in range(count):
+        image = bpy.data.images.new("Thumb " + str(i), size, size)
+        image.filepath_raw = os.path.join(path, "Thumb " + str(i) + ".png")
+        image.file_format = 'PNG'
+        image.save()
+        bpy.data.images.remove(image)
+    return path
+
+#-------BENCHMARKS
+
+def bench_create_assembly(repeat):
+    count = 100
+    def run(state):
+        for i in range(count):
+            assembly = Assembly()
+            assembly.create_assembly()
+            assembly.obj_x.location.x = 1
+            assembly.obj_y.location.y = 1
+            assembly.obj_z.location.z = 1
+            assembly.add_mesh("Bench Mesh")
+    benchmark("assembly.create_assembly+add_mesh", run, repeat=repeat, count=count)
+
+def bench_create_wall(repeat):
+    count = 100
+    benchmark("room_designer.create_wall", lambda state: create_walls(count), repeat=repeat, count=count)
+
+def bench_ray_hit(repeat, sizes):
+    for size in sizes:
+        def setup(size=size):
+            create_mesh_grid(size)
+        def run(state):
+            ray_origin = Vector((1.5, 1.5, 100))
+            ray_target = Vector((1.5, 1.5, 99))
+            for i in range(10):
+                rd.get_ray_hit(bpy.context, ray_origin, ray_target)
+        benchmark("room_designer.get_selection_point." + str(size), run, setup, repeat=repeat, objects=size, rays=10)
+
+def bench_delete_object_and_children(repeat):
+    count = 100
+    def run(walls):
+        for wall in walls:
+            utils.delete_object_and_children(wall.obj_bp)
+    benchmark("utils.delete_object_and_children", run, lambda: create_walls(count), repeat=repeat, count=count)
+
+def bench_image_enum_previews(repeat):
+    import bpy.utils.previews
+    for count in (50, 500):
+        path = create_thumbnail_folder(count)
+        try:
+            times = []
+            for i in range(repeat):
+                pcoll = rd.create_image_preview_collection()
+                start = time.perf_counter()
+                rd.get_image_enum_previews(path, pcoll)
+                times.append(time.perf_counter() - start)
+                bpy.utils.previews.remove(pcoll)
+            record("room_designer.get_image_enum_previews." + str(count), times, images=count)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+def bench_wall_dimensions(repeat):
+    count = 500
+    def run(state):
+        for i in range(10):
+            rd.get_wall_dimension_objects(bpy.context)
+    benchmark("room_designer.draw_wall_dimensions.prep", run, lambda: create_walls(count), repeat=repeat, walls=count, redraws=10)
+
+def bench_wall_height(repeat):
+    """ Changes the height of 1000 walls one at a time and with an AssemblyArray
+    """
+    count = 1000
+    def run_single(walls):
+        for wall in walls:
+            wall.z_dim(value=3)
+    def run_array(walls):
+        AssemblyArray([wall.obj_bp for wall in walls]).set_dimensions(z=3)
+    benchmark("wall_height.z_dim", run_single, lambda: create_walls(count), repeat=repeat, walls=count)
+    benchmark("wall_height.assembly_array", run_array, lambda: create_walls(count), repeat=repeat, walls=count)
+
+def create_product(count):
+    """ Creates a product assembly with count cutparts in sub assemblies of 10 parts
+    """
+    scene = bpy.context.scene
+    if len(scene.mv.spec_groups) == 0:
+        scene.mv.spec_groups.add()
+    product = Assembly()
+    product.create_assembly()
+    product.obj_bp.mv.type_group = 'PRODUCT'
+    product.obj_bp.mv.name_object = "Bench Product"
+    insert = None
+    for i in range(count):
+        if i % 10 == 0:
+            insert = Assembly()
+            insert.create_assembly()
+            insert.obj_bp.parent = product.obj_bp
+            insert.obj_bp.mv.type_group = 'INSERT'
+            insert.obj_bp.mv.name_object = "Bench Insert " + str(i // 10)
+        obj_mesh = insert.add_mesh("Bench Part")
+        obj_mesh.cabinetlib.type_mesh = 'CUTPART'
+        obj_mesh.mv.name_object = "Bench Part " + str(i)
+    bpy.context.scene.update()
+    return product
+
+def bench_init_objects(repeat):
+    """ Times init_objects on a new product, on the same product when nothing
+        changed and with force=True so the time the init signatures save is recorded
+    """
+    count = 1000
+    def setup_initialized():
+        product = create_product(count)
+        utils.init_objects(product.obj_bp)
+        return product
+    def run(product):
+        utils.init_objects(product.obj_bp)
+    def run_force(product):
+        utils.init_objects(product.obj_bp, force=True)
+    benchmark("utils.init_objects.new", run, lambda: create_product(count), repeat=repeat, parts=count)
+    benchmark("utils.init_objects.unchanged", run, setup_initialized, repeat=repeat, parts=count)
+    benchmark("utils.init_objects.force", run_force, setup_initialized, repeat=repeat, parts=count)
+
+def bench_snapping(repeat, sizes):
+    """ Times 1000 snap lookups against indexes of 3 points per wall
+    """
+    for size in sizes:
+        def setup(size=size):
+            snap_index = snapping.Wall_Snap_Index()
+            for i in range(size):
+                start = Vector(((i % 100) * 3, (i // 100) * 3, 0))
+                snap_index.add_wall(start, start + Vector((3, 0, 0)))
+            snap_index.balance()
+            return snap_index
+        def run(snap_index):
+            for i in range(1000):
+                snap_index.find(Vector(((i % 100) * 3 + .05, (i // 100) * 3, 0)), .15)
+        benchmark("snapping.find.walls_" + str(size), run, setup, repeat=repeat, walls=size, lookups=1000)
+
+def bench_scaling(repeat, room_counts):
+    """ Times the functions that run over every wall on generated scenes
+        of increasing size to find where they stop scaling.
+    """
+    for rooms in room_counts:
+        settings = {"rooms": rooms, "walls_per_room": 6, "furniture": rooms * 25}
+        def setup():
+            Scene_Generator(**settings).generate()
+            return rd.get_roombuilder_props(bpy.context)
+        
+        def run_empties(props):
+            props.show_wall_obj_x = not props.show_wall_obj_x
+            visibility.apply_visibility(props)
+        
+        def run_picking(props):
+            ray_origin = Vector((1, 1, 100))
+            ray_target = Vector((1, 1, 99))
+            for i in range(10):
+                rd.get_ray_hit(bpy.context, ray_origin, ray_target)
+        
+        def run_dimensions(props):
+            for i in range(10):
+                rd.get_wall_dimension_objects(bpy.context)
+        
+        name = ".rooms_" + str(rooms)
+        benchmark("scaling.update_show_wall_empties" + name, run_empties, setup, repeat=repeat, **settings)
+        benchmark("scaling.get_selection_point" + name, run_picking, setup, repeat=repeat, rays=10, **settings)
+        benchmark("scaling.draw_wall_dimensions.prep" + name, run_dimensions, setup, repeat=repeat, redraws=10, **settings)
+
+#-------OUTPUT
+
+def write_results(path):
+    data = {"blender_version": bpy.app.version_string,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "platform": sys.platform,
+            "results": RESULTS}
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+    print("Results written to: " + path)
+
+def compare_results(path):
+    with open(path) as file:
+        old_results = json.load(file)["results"]
+    print()
+    print("%-45s %12s %12s %8s" % ("Benchmark", "Old (min)", "New (min)", "Ratio"))
+    for name in sorted(RESULTS):
+        new_time = RESULTS[name]["min"]
+        if name in old_results:
+            old_time = old_results[name]["min"]
+            ratio = new_time / old_time if old_time > 0 else 0
+            print("%-45s %12.4f %12.4f %7.2fx" % (name, old_time, new_time, ratio))
+        else:
+            print("%-45s %12s %12.4f" % (name, "-", new_time))
+
+def main():
+    args = get_args()
+    register_addon()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    room_counts = [int(rooms) for rooms in args.rooms.split(",") if rooms]
+    only = {name for name in args.only.split(",") if name}
+    
+    benchmarks = [("create_assembly", lambda: bench_create_assembly(args.repeat)),
+                  ("create_wall", lambda: bench_create_wall(args.repeat)),
+                  ("get_selection_point", lambda: bench_ray_hit(args.repeat, sizes)),
+                  ("delete_object_and_children", lambda: bench_delete_object_and_children(args.repeat)),
+                  ("get_image_enum_previews", lambda: bench_image_enum_previews(args.repeat)),
+                  ("draw_wall_dimensions", lambda: bench_wall_dimensions(args.repeat)),
+                  ("snapping", lambda: bench_snapping(args.repeat, sizes)),
+                  ("wall_height", lambda: bench_wall_height(args.repeat)),
+                  ("init_objects", lambda: bench_init_objects(args.repeat)),
+                  ("scaling", lambda: bench_scaling(args.repeat, room_counts))]
+    
+    for name, run in benchmarks:
+        if not only or name in only:
+            run()
+    
+    write_results(args.output)
+    if args.compare:
+        compare_results(args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Synthetic large scene generator for stress testing the room designer.
+
+Builds rooms through the same wall assemblies OPS_draw_walls creates,
+scatters furniture placeholder assemblies in the rooms and adds drivers
+and material slots like real product assemblies have. This can be imported
+from other scripts (see run_benchmarks.py) or run by itself in background mode.
+
+    blender --background --python benchmarks/scene_generator.py -- --rooms 40 --walls 6 --furniture 2000 --save big_scene.blend
+
+Arguments after -- :
+    --rooms         Number of rooms
+    --walls         Number of walls in each room
+    --wall-length   Length of each wall in meters
+    --furniture     Number of furniture placeholders scattered in the rooms
+    --drivers       Number of drivers on each placeholder (0-3)
+    --materials     Number of material slots on each placeholder mesh
+    --hooks         Add hook modifiers to the placeholder meshes (slower to build)
+    --seed          Random seed
+    --save          Path to save the generated scene to
+"""
+
+import bpy
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "addons"))
+
+import room_designer
+from room_designer import utils
+from room_designer import room_designer as rd
+from room_designer.assembly import Assembly
+
+ROOM_SPACING = 2.0 # EXTRA SPACE BETWEEN ROOMS IN METERS
+DIMENSION_PATHS = (("obj_x", "location", 0), ("obj_y", "location", 1), ("obj_z", "location", 2))
+
+class Scene_Generator:
+    """
+    Creates a synthetic scene. All of the settings can be changed
+    before calling generate.
+    """
+    rooms = 10
+    walls_per_room = 4
+    wall_length = 4.0
+    furniture = 100
+    drivers_per_furniture = 2
+    materials_per_furniture = 2
+    use_hooks = False
+    seed = 0
+    
+    def __init__(self, **settings):
+        for key, value in settings.items():
+            if not hasattr(self, key):
+                raise AttributeError("Unknown setting: " + key)
+            setattr(self, key, value)
+        self.walls = []
+        self.room_walls = []
+        self.products = []
+        self.materials = []
+    
+    def get_room_radius(self):
+        """ Radius of the regular polygon the walls of a room make
+        """
+        return self.wall_length / (2 * math.sin(math.pi / self.walls_per_room))
+    
+    def get_room_origin(self, room_index):
+        columns = int(math.ceil(math.sqrt(self.rooms)))
+        size = self.get_room_radius() * 2 + ROOM_SPACING
+        return ((room_index % columns) * size, (room_index // columns) * size, 0)
+    
+    def create_room(self, room_index, props):
+        """ Creates a closed loop of walls that make a regular polygon
+        """
+        origin = self.get_room_origin(room_index)
+        radius = self.get_room_radius()
+        step = 2 * math.pi / self.walls_per_room
+        start_angle = -math.pi / 2 - step / 2
+        starting_point = (origin[0] + radius * math.cos(start_angle),
+                          origin[1] + radius * math.sin(start_angle),
+                          0)
+        walls = []
+        previous_wall = None
+        for i in range(self.walls_per_room):
+            wall = rd.create_wall_assembly(props, starting_point, previous_wall, wall_number=len(self.walls) + 1)
+            wall.obj_x.location.x = self.wall_length
+            wall.obj_bp.rotation_euler.z = i * step
+            previous_wall = wall
+            walls.append(wall)
+            self.walls.append(wall)
+        self.room_walls.append(walls)
+        return walls
+    
+    def create_materials(self):
+        for i in range(max(self.materials_per_furniture, 1) * 4):
+            mat = bpy.data.materials.new("Bench Material " + str(i))
+            mat.diffuse_color = (random.random(), random.random(), random.random())
+            self.materials.append(mat)
+    
+    def add_dimension_drivers(self, product, wall):
+        """ Drives the product size from the wall size like a product 
+            placed against a wall
+        """
+        for attr, data_path, index in DIMENSION_PATHS[:self.drivers_per_furniture]:
+            obj = getattr(product, attr)
+            driver = obj.driver_add(data_path, index)
+            var = driver.driver.variables.new()
+            var.name = "wall_dim"
+            var.type = 'SINGLE_PROP'
+            var.targets[0].id = getattr(wall, attr)
+            var.targets[0].data_path = data_path + "." + "xyz"[index]
+            utils.set_driver_expression(driver, "wall_dim*" + str(round(random.uniform(.1, .3), 3)))
+    
+    def create_furniture(self, room_index, props):
+        origin = self.get_room_origin(room_index)
+        radius = self.get_room_radius() * .5
+        product = Assembly()
+        product.create_assembly()
+        product.obj_bp.name = "Furniture Placeholder"
+        product.obj_x.location.x = random.uniform(.3, 1.5)
+        product.obj_y.location.y = random.uniform(.3, 1)
+        product.obj_z.location.z = random.uniform(.3, 2)
+        obj_mesh = product.add_mesh("Furniture Placeholder", include_hooks=self.use_hooks)
+        for i in range(self.materials_per_furniture):
+            obj_mesh.data.materials.append(random.choice(self.materials))
+        product.obj_bp.location = (origin[0] + random.uniform(-radius, radius),
+                                   origin[1] + random.uniform(-radius, radius),
+                                   0)
+        product.obj_bp.rotation_euler.z = random.choice((0, math.pi / 2, math.pi, -math.pi / 2))
+        if self.drivers_per_furniture > 0:
+            self.add_dimension_drivers(product, random.choice(self.room_walls[room_index]))
+        self.products.append(product)
+        return product
+    
+    def generate(self):
+        """ Builds the scene and returns the time it took in seconds
+        """
+        start = time.perf_counter()
+        random.seed(self.seed)
+        props = rd.get_roombuilder_props(bpy.context)
+        self.create_materials()
+        for room_index in range(self.rooms):
+            self.create_room(room_index, props)
+        for i in range(self.furniture):
+            self.create_furniture(i % self.rooms, props)
+        bpy.context.scene.update()
+        return time.perf_counter() - start
+
+def get_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Room Designer Scene Generator")
+    parser.add_argument("--rooms", type=int, default=Scene_Generator.rooms)
+    parser.add_argument("--walls", type=int, default=Scene_Generator.walls_per_room)
+    parser.add_argument("--wall-length", type=float, default=Scene_Generator.wall_length)
+    parser.add_argument("--furniture", type=int, default=Scene_Generator.furniture)
+    parser.add_argument("--drivers", type=int, default=Scene_Generator.drivers_per_furniture, choices=range(4))
+    parser.add_argument("--materials", type=int, default=Scene_Generator.materials_per_furniture)
+    parser.add_argument("--hooks", action="store_true")
+    parser.add_argument("--seed", type=int, default=Scene_Generator.seed)
+    parser.add_argument("--save", default="")
+    return parser.parse_args(argv)
+
+def main():
+    args = get_args()
+    if not hasattr(bpy.types.Scene, "room_builder"):
+        room_designer.register()
+    generator = Scene_Generator(rooms=args.rooms,
+                                walls_per_room=args.walls,
+                                wall_length=args.wall_length,
+                                furniture=args.furniture,
+                                drivers_per_furniture=args.drivers,
+                                materials_per_furniture=args.materials,
+                                use_hooks=args.hooks,
+                                seed=args.seed)
+    seconds = generator.generate()
+    print("Generated %d walls and %d furniture placeholders (%d objects) in %.2fs" % 
+          (len(generator.walls), len(generator.products), len(bpy.data.objects), seconds))
+    if args.save:
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.save))
+
+if __name__ == "__main__":
+    main()